@@ -1,22 +1,79 @@
 from .BaseController import BaseController
 from models.db_schemes import Project, DataChunk
 from stores.llm.LLMEnums import DocumentTypeEnum
+from stores.vectordb.MMRSelector import MMRSelector
+from stores.llm.PromptPacker import PromptPacker
+from models import ResponseSignal
+from utils.metrics import LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS_PER_SECOND, \
+    LLM_PROMPT_TOKENS, LLM_COMPLETION_TOKENS, RAG_CHUNKS_DROPPED
 from typing import List
+import numpy as np
+import logging
 import json
+import time
 
 class NLPController(BaseController):
 
     def __init__(self, vectordb_client, generation_client, 
-                 embedding_client, template_parser):
+                 embedding_client, template_parser, retrieval_cache=None,
+                 embedding_cache=None, answer_cache=None, request_coalescer=None):
         super().__init__()
 
         self.vectordb_client = vectordb_client
         self.generation_client = generation_client
         self.embedding_client = embedding_client
         self.template_parser = template_parser
+        self.retrieval_cache = retrieval_cache
+        self.embedding_cache = embedding_cache
+        self.answer_cache = answer_cache
+        self.request_coalescer = request_coalescer
+
+        self.logger = logging.getLogger('uvicorn')
+
+        self.mmr_selector = MMRSelector(
+            lambda_mult=self.app_settings.VECTOR_DB_MMR_LAMBDA,
+            duplicate_threshold=self.app_settings.VECTOR_DB_MMR_DUPLICATE_THRESHOLD,
+        )
+
+        self.prompt_packer = PromptPacker(
+            max_input_tokens=self.get_max_input_tokens(),
+            encoding_name=self.app_settings.PROMPT_TOKENIZER_ENCODING,
+            min_chunk_tokens=self.app_settings.PROMPT_MIN_CHUNK_TOKENS,
+        )
+
+    def get_max_input_tokens(self):
+        model_id = getattr(self.generation_client, "generation_model_id", None)
+        model_budgets = self.app_settings.GENERATION_MODEL_MAX_INPUT_TOKENS or {}
+
+        return model_budgets.get(model_id, self.app_settings.GENERATION_MAX_INPUT_TOKENS)
+
+    def get_generation_model_id(self):
+        return getattr(self.generation_client, "generation_model_id", None) or "unknown"
 
     def create_collection_name(self, project_id: str):
-        return f"collection_{self.vectordb_client.default_vector_size}_{project_id}".strip()
+        # the effective dimension is part of the name, so truncated and full size vectors never share a collection
+        vector_size = self.app_settings.EMBEDDING_TRUNCATE_DIM or self.vectordb_client.default_vector_size
+        return f"collection_{vector_size}_{project_id}".strip()
+
+    def get_embedding_size(self):
+        return self.app_settings.EMBEDDING_TRUNCATE_DIM or self.embedding_client.embedding_size
+
+    def postprocess_vectors(self, vectors: list):
+
+        truncate_dim = self.app_settings.EMBEDDING_TRUNCATE_DIM
+        if not vectors or (not truncate_dim and not self.app_settings.EMBEDDING_NORMALIZE):
+            return vectors
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+
+        # matryoshka models keep most of the quality in the leading dimensions
+        if truncate_dim:
+            matrix = matrix[:, :truncate_dim]
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        return matrix.tolist()
     
     async def reset_vector_db_collection(self, project: Project):
         collection_name = self.create_collection_name(project_id=project.project_id)
@@ -30,6 +87,59 @@ class NLPController(BaseController):
             json.dumps(collection_info, default=lambda x: x.__dict__)
         )
     
+    def get_embedding_cache_model_id(self):
+        # the same model id served by two backends does not give the same vectors
+        return f"{self.app_settings.EMBEDDING_BACKEND}:{self.embedding_client.embedding_model_id}"
+
+    def get_embedding_prefix(self, document_type: str):
+        # instruction tuned models embed the prefixed text, a changed prefix is a different input
+        if document_type in (DocumentTypeEnum.QUERY, DocumentTypeEnum.QUERY.value):
+            return getattr(self.embedding_client, "query_prefix", "") or ""
+
+        return getattr(self.embedding_client, "document_prefix", "") or ""
+
+    async def embed_documents(self, texts: List[str], document_type: str):
+
+        if self.embedding_cache is None:
+            vectors = await self.embedding_client.aembed_text(text=texts, document_type=document_type)
+            return self.postprocess_vectors(vectors)
+
+        # unchanged chunks of a re-processed course are served from the cache,
+        # only the new or edited ones reach the embedding provider
+        embedding_model_id = self.get_embedding_cache_model_id()
+        text_prefix = self.get_embedding_prefix(document_type=document_type)
+        text_hashes = [
+            self.embedding_cache.hash_text(text_prefix + self.embedding_client.process_text(text))
+            for text in texts
+        ]
+
+        cached_vectors = await self.embedding_cache.get_embeddings(
+            embedding_model_id=embedding_model_id,
+            document_type=document_type,
+            text_hashes=text_hashes,
+        )
+
+        missing_idx = [ idx for idx, text_hash in enumerate(text_hashes) if text_hash not in cached_vectors ]
+        if len(missing_idx):
+            missing_vectors = await self.embedding_client.aembed_text(text=[ texts[idx] for idx in missing_idx ],
+                                                                      document_type=document_type)
+
+            if not missing_vectors or len(missing_vectors) != len(missing_idx):
+                return None
+
+            missing_hashes = [ text_hashes[idx] for idx in missing_idx ]
+            _ = await self.embedding_cache.insert_embeddings(
+                embedding_model_id=embedding_model_id,
+                document_type=document_type,
+                text_hashes=missing_hashes,
+                embeddings=missing_vectors,
+            )
+
+            cached_vectors.update(zip(missing_hashes, missing_vectors))
+
+        # the cache keeps the full provider vectors, so changing the dimension needs no re-embedding
+        return self.postprocess_vectors([ cached_vectors[text_hash] for text_hash in text_hashes ])
+
     async def index_into_vector_db(self, project: Project, chunks: List[DataChunk],
                                    chunks_ids: List[int], 
                                    do_reset: bool = False):
@@ -40,13 +150,16 @@ class NLPController(BaseController):
         # step2: manage items
         texts = [ c.chunk_text for c in chunks ]
         metadata = [ c.chunk_metadata for c in  chunks]
-        vectors = self.embedding_client.embed_text(text=texts, 
-                                                  document_type=DocumentTypeEnum.DOCUMENT.value)
+        vectors = await self.embed_documents(texts=texts,
+                                             document_type=DocumentTypeEnum.DOCUMENT.value)
+
+        if not vectors or len(vectors) != len(texts):
+            return False
 
         # step3: create collection if not exists
         _ = await self.vectordb_client.create_collection(
             collection_name=collection_name,
-            embedding_size=self.embedding_client.embedding_size,
+            embedding_size=self.get_embedding_size(),
             do_reset=do_reset,
         )
 
@@ -61,30 +174,129 @@ class NLPController(BaseController):
 
         return True
 
-    async def search_vector_db_collection(self, project: Project, text: str, limit: int = 10):
+    async def build_vector_db_index(self, project: Project):
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        return await self.vectordb_client.create_vector_index(collection_name=collection_name)
+
+    async def embed_query(self, text: str):
+
+        vectors = await self.embedding_client.aembed_text(text=text, 
+                                                          document_type=DocumentTypeEnum.QUERY.value)
+        vectors = self.postprocess_vectors(vectors)
+
+        if not vectors or len(vectors) == 0:
+            return None
+
+        return vectors[0]
+
+    async def search_vector_db_collection(self, project: Project, text: str, limit: int = 10,
+                                          ef_search: int = None, probes: int = None,
+                                          metadata_filter: dict = None, hybrid: bool = False,
+                                          mmr: bool = False, mmr_lambda: float = None):
+
+        results, _ = await self.retrieve_documents(project=project, text=text, limit=limit,
+                                                   ef_search=ef_search, probes=probes,
+                                                   metadata_filter=metadata_filter, hybrid=hybrid,
+                                                   mmr=mmr, mmr_lambda=mmr_lambda)
+
+        return results
+
+    async def retrieve_documents(self, project: Project, text: str, limit: int = 10,
+                                       ef_search: int = None, probes: int = None,
+                                       metadata_filter: dict = None, hybrid: bool = False,
+                                       mmr: bool = False, mmr_lambda: float = None):
+        """
+        Returns (results, query_vector); the query vector is cached with the results,
+        so the answer cache can match paraphrases without embedding the query again.
+        """
+
+        # step0: repeated questions are served without embedding or searching again
+        cache_key = None
+        if self.retrieval_cache is not None:
+            cache_key = self.retrieval_cache.build_key(
+                project_id=project.project_id, index_version=project.index_version,
+                text=text, limit=limit, ef_search=ef_search, probes=probes,
+                metadata_filter=metadata_filter, hybrid=hybrid, mmr=mmr, mmr_lambda=mmr_lambda,
+            )
+            cached_entry = self.retrieval_cache.get(cache_key)
+            if cached_entry is not None:
+                return cached_entry
 
         # step1: get collection name
-        query_vector = None
         collection_name = self.create_collection_name(project_id=project.project_id)
 
         # step2: get text embedding vector
-        vectors = self.embedding_client.embed_text(text=text, 
-                                                 document_type=DocumentTypeEnum.QUERY.value)
-
-        if not vectors or len(vectors) == 0:
-            return False
-        
-        if isinstance(vectors, list) and len(vectors) > 0:
-            query_vector = vectors[0]
+        query_vector = await self.embed_query(text=text)
 
         if not query_vector:
-            return False    
+            return False, None
+
+        # step3: do semantic search, fused with lexical search when hybrid;
+        # mmr needs a wider candidate set to pick the diverse top-k from
+        search_limit = limit
+        if mmr:
+            search_limit = limit * self.app_settings.VECTOR_DB_MMR_FETCH_FACTOR
+
+        if hybrid:
+            results = await self.vectordb_client.search_hybrid(
+                collection_name=collection_name,
+                text=text,
+                vector=query_vector,
+                limit=search_limit,
+                ef_search=ef_search,
+                probes=probes,
+                metadata_filter=metadata_filter,
+            )
+        else:
+            results = await self.vectordb_client.search_by_vector(
+                collection_name=collection_name,
+                vector=query_vector,
+                limit=search_limit,
+                ef_search=ef_search,
+                probes=probes,
+                metadata_filter=metadata_filter,
+            )
+
+        if not results:
+            return False, query_vector
+
+        # step4: drop the near-duplicate chunks
+        if mmr:
+            vectors = await self.vectordb_client.get_vectors(
+                collection_name=collection_name,
+                chunk_ids=[ doc.chunk_id for doc in results ],
+            )
+            results = self.mmr_selector.select(query_vector=query_vector, documents=results,
+                                               vectors=vectors, limit=limit, lambda_mult=mmr_lambda)
+
+        if cache_key is not None:
+            self.retrieval_cache.set(cache_key, (results, query_vector))
+
+        return results, query_vector
+    
+    async def search_many_vector_db_collection(self, project: Project, texts: List[str], limit: int = 10,
+                                               ef_search: int = None, probes: int = None,
+                                               metadata_filter: dict = None):
+
+        # step1: get collection name
+        collection_name = self.create_collection_name(project_id=project.project_id)
+
+        # step2: embed all the queries with a single provider call
+        vectors = await self.embedding_client.aembed_text(text=texts,
+                                                          document_type=DocumentTypeEnum.QUERY.value)
+        vectors = self.postprocess_vectors(vectors)
+
+        if not vectors or len(vectors) != len(texts):
+            return False
 
-        # step3: do semantic search
-        results = await self.vectordb_client.search_by_vector(
+        # step3: do semantic search for all the queries in one round trip
+        results = await self.vectordb_client.search_many(
             collection_name=collection_name,
-            vector=query_vector,
-            limit=limit
+            vectors=vectors,
+            limit=limit,
+            ef_search=ef_search,
+            probes=probes,
+            metadata_filter=metadata_filter,
         )
 
         if not results:
@@ -92,36 +304,32 @@ class NLPController(BaseController):
 
         return results
     
-    async def answer_rag_question(self, project: Project, query: str, limit: int = 10):
-        
-        answer, full_prompt, chat_history = None, None, None
+    def build_rag_prompt(self, query: str, retrieved_documents: list):
 
-        # step1: retrieve related documents
-        retrieved_documents = await self.search_vector_db_collection(
-            project=project,
-            text=query,
-            limit=limit,
-        )
-
-        if not retrieved_documents or len(retrieved_documents) == 0:
-            return answer, full_prompt, chat_history
-        
-        # step2: Construct LLM prompt
+        # step1: Construct LLM prompt
         system_prompt = self.template_parser.get("rag", "system_prompt")
 
-        documents_prompts = "\n".join([
-            self.template_parser.get("rag", "document_prompt", {
-                    "doc_num": idx + 1,
-                    "chunk_text": self.generation_client.process_text(doc.text),
-            })
-            for idx, doc in enumerate(retrieved_documents)
-        ])
-
         footer_prompt = self.template_parser.get("rag", "footer_prompt", {
             "query": query
         })
 
-        # step3: Construct Generation Client Prompts
+        # the documents come best first, the lowest ranked ones are dropped when the budget runs out
+        packed_prompt = self.prompt_packer.pack(
+            system_prompt=system_prompt,
+            footer_prompt=footer_prompt,
+            chunks=[ doc.text for doc in retrieved_documents ],
+            render_chunk=lambda doc_num, chunk_text: self.template_parser.get("rag", "document_prompt", {
+                    "doc_num": doc_num,
+                    "chunk_text": chunk_text,
+            }),
+        )
+
+        if packed_prompt.dropped_chunks:
+            RAG_CHUNKS_DROPPED.inc(packed_prompt.dropped_chunks)
+
+        documents_prompts = "\n".join(packed_prompt.documents_prompts)
+
+        # step2: Construct Generation Client Prompts
         chat_history = [
             self.generation_client.construct_prompt(
                 prompt=system_prompt,
@@ -131,11 +339,187 @@ class NLPController(BaseController):
 
         full_prompt = "\n\n".join([ documents_prompts,  footer_prompt])
 
+        return full_prompt, chat_history, packed_prompt.prompt_tokens
+
+    def observe_token_usage(self, prompt_tokens: int, answer: str):
+        model_id = self.get_generation_model_id()
+
+        LLM_PROMPT_TOKENS.labels(model=model_id).observe(prompt_tokens)
+        if answer:
+            LLM_COMPLETION_TOKENS.labels(model=model_id).observe(self.prompt_packer.count_tokens(answer))
+
+    async def answer_rag_question(self, project: Project, query: str, limit: int = 10,
+                                  ef_search: int = None, probes: int = None,
+                                  metadata_filter: dict = None, hybrid: bool = False,
+                                  mmr: bool = False, mmr_lambda: float = None):
+
+        search_params = {
+            "ef_search": ef_search,
+            "probes": probes,
+            "metadata_filter": metadata_filter,
+            "hybrid": hybrid,
+            "mmr": mmr,
+            "mmr_lambda": mmr_lambda,
+        }
+
+        if self.request_coalescer is None:
+            return await self.run_rag_question(project=project, query=query, limit=limit, **search_params)
+
+        # identical questions arriving together share one embedding, search and generation
+        key = self.request_coalescer.build_key(project_id=project.project_id,
+                                               index_version=project.index_version,
+                                               text=query, limit=limit,
+                                               model_id=self.get_generation_model_id(),
+                                               **search_params)
+
+        return await self.request_coalescer.run(
+            key, lambda: self.run_rag_question(project=project, query=query, limit=limit, **search_params)
+        )
+
+    async def run_rag_question(self, project: Project, query: str, limit: int = 10,
+                                     ef_search: int = None, probes: int = None,
+                                     metadata_filter: dict = None, hybrid: bool = False,
+                                     mmr: bool = False, mmr_lambda: float = None):
+        
+        answer, full_prompt, chat_history = None, None, None
+
+        # step1: retrieve related documents, the query vector is kept to match paraphrases in the answer cache
+        retrieved_documents, query_vector = await self.retrieve_documents(
+            project=project,
+            text=query,
+            limit=limit,
+            ef_search=ef_search,
+            probes=probes,
+            metadata_filter=metadata_filter,
+            hybrid=hybrid,
+            mmr=mmr,
+            mmr_lambda=mmr_lambda,
+        )
+
+        if not retrieved_documents or len(retrieved_documents) == 0:
+            return answer, full_prompt, chat_history
+        
+        # step2: Construct the prompts
+        full_prompt, chat_history, prompt_tokens = self.build_rag_prompt(query=query, retrieved_documents=retrieved_documents)
+
+        # step3: a paraphrase grounded on the same chunks reuses the cached answer
+        answer = self.get_cached_answer(project=project, query_vector=query_vector,
+                                        retrieved_documents=retrieved_documents)
+        if answer:
+            return answer, full_prompt, chat_history
+
         # step4: Retrieve the Answer
-        answer = self.generation_client.generate_text(
+        answer = await self.generation_client.agenerate_text(
             prompt=full_prompt,
             chat_history=chat_history
         )
 
+        self.observe_token_usage(prompt_tokens=prompt_tokens, answer=answer)
+
+        self.set_cached_answer(project=project, query_vector=query_vector,
+                               retrieved_documents=retrieved_documents, answer=answer)
+
         return answer, full_prompt, chat_history
 
+    def get_cached_answer(self, project: Project, query_vector: list, retrieved_documents: list):
+        if self.answer_cache is None or not query_vector:
+            return None
+
+        return self.answer_cache.get(project_id=project.project_id, index_version=project.index_version,
+                                     query_vector=query_vector,
+                                     chunk_ids=[ doc.chunk_id for doc in retrieved_documents ])
+
+    def set_cached_answer(self, project: Project, query_vector: list, retrieved_documents: list, answer: str):
+        if self.answer_cache is None or not query_vector:
+            return
+
+        self.answer_cache.set(project_id=project.project_id, index_version=project.index_version,
+                              query_vector=query_vector,
+                              chunk_ids=[ doc.chunk_id for doc in retrieved_documents ],
+                              answer=answer)
+
+    async def stream_rag_answer(self, project: Project, query: str, limit: int = 10,
+                                ef_search: int = None, probes: int = None,
+                                metadata_filter: dict = None, hybrid: bool = False,
+                                mmr: bool = False, mmr_lambda: float = None):
+        """
+        Yields (event, data) pairs: the retrieved sources first, then the answer
+        tokens as the generation provider produces them, then a done event.
+        """
+
+        # step1: retrieve related documents, the query vector is kept to match paraphrases in the answer cache
+        retrieved_documents, query_vector = await self.retrieve_documents(
+            project=project,
+            text=query,
+            limit=limit,
+            ef_search=ef_search,
+            probes=probes,
+            metadata_filter=metadata_filter,
+            hybrid=hybrid,
+            mmr=mmr,
+            mmr_lambda=mmr_lambda,
+        )
+
+        if not retrieved_documents or len(retrieved_documents) == 0:
+            yield "error", {"signal": ResponseSignal.RAG_ANSWER_ERROR.value}
+            return
+
+        yield "sources", {
+            "sources": [
+                {
+                    "chunk_id": doc.chunk_id,
+                    "score": doc.score,
+                    "source_file": doc.metadata.get("source_file", "Unknown"),
+                }
+                for doc in retrieved_documents
+            ]
+        }
+
+        # step2: a paraphrase grounded on the same chunks reuses the cached answer
+        cached_answer = self.get_cached_answer(project=project, query_vector=query_vector,
+                                               retrieved_documents=retrieved_documents)
+        if cached_answer:
+            yield "token", {"text": cached_answer}
+            yield "done", {"signal": ResponseSignal.RAG_ANSWER_SUCCESS.value, "cached": True}
+            return
+
+        full_prompt, chat_history, prompt_tokens = self.build_rag_prompt(query=query,
+                                                                          retrieved_documents=retrieved_documents)
+
+        # step3: Stream the Answer
+        answer_tokens = []
+        start_time = time.perf_counter()
+        first_token_time = None
+        tokens_count = 0
+
+        try:
+            async for token in self.generation_client.astream_text(prompt=full_prompt,
+                                                                   chat_history=chat_history):
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                    LLM_TIME_TO_FIRST_TOKEN.observe(first_token_time - start_time)
+
+                # the providers stream about one token per delta
+                tokens_count += 1
+                answer_tokens.append(token)
+                yield "token", {"text": token}
+        except Exception as e:
+            self.logger.error(f"Error while streaming the answer: {e}")
+            yield "error", {"signal": ResponseSignal.RAG_ANSWER_ERROR.value}
+            return
+
+        if first_token_time is None:
+            yield "error", {"signal": ResponseSignal.RAG_ANSWER_ERROR.value}
+            return
+
+        generation_duration = time.perf_counter() - first_token_time
+        if tokens_count > 1 and generation_duration > 0:
+            LLM_TOKENS_PER_SECOND.observe((tokens_count - 1) / generation_duration)
+
+        answer = "".join(answer_tokens)
+        self.observe_token_usage(prompt_tokens=prompt_tokens, answer=answer)
+
+        self.set_cached_answer(project=project, query_vector=query_vector,
+                               retrieved_documents=retrieved_documents, answer=answer)
+
+        yield "done", {"signal": ResponseSignal.RAG_ANSWER_SUCCESS.value}
@@ -28,6 +28,11 @@ class Settings(BaseSettings):
     
     # Ollama Configuration
     OLLAMA_API_URL: str = "http://localhost:11434"
+    OLLAMA_KEEP_ALIVE: str = "30m"
+
+    # Load the models and prime the system prompt prefix in the background at startup.
+    # Off by default: it sends a request to every configured backend, hosted ones included
+    LLM_WARM_UP_ON_STARTUP: bool = False
 
     # Model Configuration
     GENERATION_MODEL_ID_LITERAL: List[str] = None
@@ -44,18 +49,84 @@ class Settings(BaseSettings):
     # Ollama-specific embedding settings
     OLLAMA_EMBEDDING_MODEL_ID: str = "nomic-embed-text"
     OLLAMA_EMBEDDING_MODEL_SIZE: int = 768
+    OLLAMA_EMBEDDING_BATCH_SIZE: int = 64
+    OLLAMA_EMBEDDING_CONCURRENCY: int = 4
+    OLLAMA_GENERATION_CONCURRENCY: int = 16
+
+    # Local ONNX embedding settings
+    LOCAL_EMBEDDING_MODELS_DIR: str = "assets/models"
+    LOCAL_EMBEDDING_MODEL_ID: str = None
+    LOCAL_EMBEDDING_MODEL_SIZE: int = None
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 32
+    LOCAL_EMBEDDING_MAX_LENGTH: int = 512
+    LOCAL_EMBEDDING_THREADS: int = 4
+    LOCAL_EMBEDDING_QUERY_PREFIX: str = ""
+    LOCAL_EMBEDDING_DOCUMENT_PREFIX: str = ""
+
+    # Persistent embedding cache, consulted while indexing; needs the embedding_cache migration
+    EMBEDDING_CACHE_ENABLED: bool = False
+
+    # Embedding request batching, the token budget defaults to the provider limit
+    EMBEDDING_BATCH_MAX_TOKENS: int = None
+    EMBEDDING_BATCH_CONCURRENCY: int = 4
+    EMBEDDING_MAX_RETRIES: int = 5
+
+    # Matryoshka truncation, truncated vectors are always re-normalized
+    EMBEDDING_TRUNCATE_DIM: int = None
+    EMBEDDING_NORMALIZE: bool = False
 
     # Generation Settings
     INPUT_DAFAULT_MAX_CHARACTERS: int = None
     GENERATION_DAFAULT_MAX_TOKENS: int = None
     GENERATION_DAFAULT_TEMPERATURE: float = None
 
+    # Prompt token budget, per generation model id with a default for the others
+    GENERATION_MAX_INPUT_TOKENS: int = 4096
+    GENERATION_MODEL_MAX_INPUT_TOKENS: dict = None
+    PROMPT_TOKENIZER_ENCODING: str = "cl100k_base"
+    PROMPT_MIN_CHUNK_TOKENS: int = 64
+
+    # Identical concurrent answer requests share one in-flight pipeline
+    REQUEST_COALESCING_ENABLED: bool = True
+
     # Vector DB Configuration
     VECTOR_DB_BACKEND_LITERAL: List[str] = None
     VECTOR_DB_BACKEND: str
     VECTOR_DB_PATH: str
     VECTOR_DB_DISTANCE_METHOD: str = None
     VECTOR_DB_PGVEC_INDEX_THRESHOLD: int = 100
+    VECTOR_DB_PGVEC_SEARCH_MODE: str = "indexed"
+    VECTOR_DB_PGVEC_INSERT_MODE: str = "insert"
+    VECTOR_DB_PGVEC_IVFFLAT_THRESHOLD: int = 1000000
+    VECTOR_DB_PGVEC_MAINTENANCE_WORK_MEM: str = "512MB"
+    VECTOR_DB_PGVEC_STORAGE_TYPE: str = "vector"
+    VECTOR_DB_PGVEC_RERANK_FACTOR: int = 4
+    # only applied on pgvector >= 0.8, older servers search filtered queries without it
+    VECTOR_DB_PGVEC_ITERATIVE_SCAN: str = "strict_order"
+    VECTOR_DB_PGVEC_TEXT_SEARCH_CONFIG: str = "simple"
+    VECTOR_DB_HYBRID_RRF_K: int = 60
+    VECTOR_DB_PGVEC_LAYOUT: str = "table"
+    VECTOR_DB_QDRANT_URL: str = None
+    VECTOR_DB_QDRANT_API_KEY: str = None
+    VECTOR_DB_QDRANT_PREFER_GRPC: bool = False
+    VECTOR_DB_QDRANT_UPLOAD_PARALLEL: int = 4
+    VECTOR_DB_QDRANT_HNSW_M: int = None
+    VECTOR_DB_QDRANT_HNSW_EF_CONSTRUCT: int = None
+    VECTOR_DB_QDRANT_SCALAR_QUANTIZATION: bool = False
+    VECTOR_DB_QDRANT_ON_DISK: bool = False
+    VECTOR_DB_QDRANT_OVERSAMPLING: float = 2.0
+    VECTOR_DB_CATALOG_TTL: int = 60
+    VECTOR_DB_NUMPY_PATH: str = "numpy_db"
+    VECTOR_DB_MMR_LAMBDA: float = 0.7
+    VECTOR_DB_MMR_FETCH_FACTOR: int = 4
+    VECTOR_DB_MMR_DUPLICATE_THRESHOLD: float = 0.95
+    RETRIEVAL_CACHE_SIZE: int = 1024
+    RETRIEVAL_CACHE_TTL: int = 300
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_SIMILARITY: float = 0.95
+    ANSWER_CACHE_MIN_OVERLAP: float = 0.6
+    ANSWER_CACHE_MAX_ENTRIES: int = 256
+    ANSWER_CACHE_TTL: int = 3600
 
     # Language Settings
     PRIMARY_LANG: str = "en"
@@ -71,6 +142,8 @@ class Settings(BaseSettings):
             return self.COHERE_EMBEDDING_MODEL_ID or self.EMBEDDING_MODEL_ID
         elif self.EMBEDDING_BACKEND.upper() == "OLLAMA":
             return self.OLLAMA_EMBEDDING_MODEL_ID or self.EMBEDDING_MODEL_ID
+        elif self.EMBEDDING_BACKEND.upper() == "LOCAL":
+            return self.LOCAL_EMBEDDING_MODEL_ID or self.EMBEDDING_MODEL_ID
         else:
             return self.EMBEDDING_MODEL_ID
     
@@ -81,6 +154,8 @@ class Settings(BaseSettings):
             return self.COHERE_EMBEDDING_MODEL_SIZE or self.EMBEDDING_MODEL_SIZE
         elif self.EMBEDDING_BACKEND.upper() == "OLLAMA":
             return self.OLLAMA_EMBEDDING_MODEL_SIZE or self.EMBEDDING_MODEL_SIZE
+        elif self.EMBEDDING_BACKEND.upper() == "LOCAL":
+            return self.LOCAL_EMBEDDING_MODEL_SIZE or self.EMBEDDING_MODEL_SIZE
         else:
             return self.EMBEDDING_MODEL_SIZE
 
@@ -3,10 +3,15 @@ from routes import base, data, nlp
 from helpers.config import get_settings
 from stores.llm.LLMProviderFactory import LLMProviderFactory
 from stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
+from stores.vectordb.RetrievalCache import RetrievalCache
+from stores.llm.SemanticAnswerCache import SemanticAnswerCache
+from stores.llm.RequestCoalescer import RequestCoalescer
 from stores.llm.templates.template_parser import TemplateParser
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+import asyncio
 import logging
+import time
 
 # Import metrics setup
 from utils.metrics import setup_metrics
@@ -72,12 +77,34 @@ async def startup_span():
         await app.vectordb_client.connect()
         logger.info("Vector database connected")
 
+        app.retrieval_cache = RetrievalCache(
+            max_size=settings.RETRIEVAL_CACHE_SIZE,
+            ttl_seconds=settings.RETRIEVAL_CACHE_TTL,
+        )
+
+        # similarity matched answers are lossy, the cache is opt-in
+        app.answer_cache = None
+        if settings.ANSWER_CACHE_ENABLED:
+            app.answer_cache = SemanticAnswerCache(
+                similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+                min_overlap=settings.ANSWER_CACHE_MIN_OVERLAP,
+                max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.ANSWER_CACHE_TTL,
+            )
+
+        app.request_coalescer = RequestCoalescer() if settings.REQUEST_COALESCING_ENABLED else None
+
         app.template_parser = TemplateParser(
             language=settings.PRIMARY_LANG,
             default_language=settings.DEFAULT_LANG,
         )
         logger.info("Template parser initialized")
 
+        # a slow or absent model server must not hold up startup, the warm up runs in the background
+        app.warm_up_task = None
+        if settings.LLM_WARM_UP_ON_STARTUP:
+            app.warm_up_task = asyncio.create_task(warm_up_providers())
+
         # Test connectivity (optional but helpful for debugging)
         await test_providers_connectivity()
         
@@ -87,12 +114,26 @@ async def startup_span():
         logger.error(f"Failed to initialize application: {e}")
         raise
 
+async def warm_up_providers():
+    """Load the models and prime the shared system prompt before the first request"""
+    system_prompt = app.template_parser.get("rag", "system_prompt")
+
+    for client_name, client in (("embedding", app.embedding_client), ("generation", app.generation_client)):
+        try:
+            start_time = time.perf_counter()
+            if await client.awarm_up(system_prompt=system_prompt):
+                logger.info(f"Warmed up {client_name} client in {time.perf_counter() - start_time:.2f}s")
+            else:
+                logger.warning(f"Warm up of the {client_name} client failed")
+        except Exception as e:
+            logger.warning(f"Warm up of the {client_name} client failed: {e}")
+
 async def test_providers_connectivity():
     """Test if providers are working correctly"""
     try:
         # Test embedding client
         logger.info("Testing embedding client connectivity...")
-        test_embeddings = app.embedding_client.embed_text("test connectivity")
+        test_embeddings = await app.embedding_client.aembed_text("test connectivity")
         if test_embeddings:
             logger.info(f"Embedding test successful - got {len(test_embeddings[0])} dimensions")
         else:
@@ -100,7 +141,7 @@ async def test_providers_connectivity():
             
         # Test generation client
         logger.info("Testing generation client connectivity...")
-        test_generation = app.generation_client.generate_text("Say 'hello'", max_output_tokens=10)
+        test_generation = await app.generation_client.agenerate_text("Say 'hello'", max_output_tokens=10)
         if test_generation:
             logger.info(f"Generation test successful - response: {test_generation[:50]}...")
         else:
@@ -113,6 +154,9 @@ async def test_providers_connectivity():
 async def shutdown_span():
     try:
         logger.info("Shutting down application...")
+
+        if getattr(app, 'warm_up_task', None) is not None and not app.warm_up_task.done():
+            app.warm_up_task.cancel()
         
         if hasattr(app, 'db_engine'):
             await app.db_engine.dispose()
@@ -121,6 +165,11 @@ async def shutdown_span():
         if hasattr(app, 'vectordb_client'):
             await app.vectordb_client.disconnect()
             logger.info("Vector database disconnected")
+
+        for client_name in ('generation_client', 'embedding_client'):
+            if getattr(app, client_name, None) is not None:
+                await getattr(app, client_name).aclose()
+        logger.info("LLM provider connections closed")
             
         logger.info("Application shutdown completed")
         
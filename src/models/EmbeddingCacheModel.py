@@ -0,0 +1,63 @@
+from .BaseDataModel import BaseDataModel
+from .db_schemes import EmbeddingCache
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert
+import numpy as np
+import hashlib
+
+class EmbeddingCacheModel(BaseDataModel):
+
+    def __init__(self, db_client: object):
+        super().__init__(db_client=db_client)
+        self.db_client = db_client
+
+    @classmethod
+    async def create_instance(cls, db_client: object):
+        instance = cls(db_client)
+        return instance
+
+    def hash_text(self, text: str):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    async def get_embeddings(self, embedding_model_id: str, document_type: str, text_hashes: list):
+
+        if not text_hashes:
+            return {}
+
+        async with self.db_client() as session:
+            stmt = select(EmbeddingCache.text_hash, EmbeddingCache.embedding).where(
+                EmbeddingCache.embedding_model_id == embedding_model_id,
+                EmbeddingCache.document_type == document_type,
+                EmbeddingCache.text_hash.in_(list(set(text_hashes))),
+            )
+            result = await session.execute(stmt)
+            records = result.all()
+
+        return {
+            record.text_hash: np.frombuffer(record.embedding, dtype='<f4').tolist()
+            for record in records
+        }
+
+    async def insert_embeddings(self, embedding_model_id: str, document_type: str,
+                                      text_hashes: list, embeddings: list):
+
+        rows = {
+            text_hash: {
+                "embedding_model_id": embedding_model_id,
+                "document_type": document_type,
+                "text_hash": text_hash,
+                "embedding": np.asarray(embedding, dtype='<f4').tobytes(),
+            }
+            for text_hash, embedding in zip(text_hashes, embeddings)
+        }
+
+        if not rows:
+            return 0
+
+        async with self.db_client() as session:
+            async with session.begin():
+                # another worker may have cached the same text meanwhile
+                stmt = insert(EmbeddingCache).values(list(rows.values())).on_conflict_do_nothing()
+                await session.execute(stmt)
+
+        return len(rows)
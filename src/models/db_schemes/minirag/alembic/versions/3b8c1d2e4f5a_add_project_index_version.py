@@ -0,0 +1,26 @@
+"""Add project index version
+
+Revision ID: 3b8c1d2e4f5a
+Revises: fee4cd54bd38
+Create Date: 2026-10-18 10:12:41.215803
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8c1d2e4f5a'
+down_revision: Union[str, None] = 'fee4cd54bd38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('projects', sa.Column('index_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('projects', 'index_version')
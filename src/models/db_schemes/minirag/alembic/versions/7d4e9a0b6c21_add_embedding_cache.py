@@ -0,0 +1,33 @@
+"""Add embedding cache
+
+Revision ID: 7d4e9a0b6c21
+Revises: 3b8c1d2e4f5a
+Create Date: 2026-10-18 11:03:27.640119
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d4e9a0b6c21'
+down_revision: Union[str, None] = '3b8c1d2e4f5a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('embedding_cache',
+    sa.Column('embedding_model_id', sa.String(), nullable=False),
+    sa.Column('document_type', sa.String(), nullable=False),
+    sa.Column('text_hash', sa.String(length=64), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('embedding_model_id', 'document_type', 'text_hash')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('embedding_cache')
@@ -2,3 +2,4 @@ from .minirag_base import SQLAlchemyBase
 from .asset import Asset
 from .project import Project
 from .datachunk import DataChunk, RetrievedDocument
+from .embedding_cache import EmbeddingCache
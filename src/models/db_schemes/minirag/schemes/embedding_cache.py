@@ -0,0 +1,16 @@
+from .minirag_base import SQLAlchemyBase
+from sqlalchemy import Column, DateTime, func, String, LargeBinary
+
+class EmbeddingCache(SQLAlchemyBase):
+
+    __tablename__ = "embedding_cache"
+
+    # content addressed: the same text embedded by the same model never changes
+    embedding_model_id = Column(String, primary_key=True)
+    document_type = Column(String, primary_key=True)
+    text_hash = Column(String(64), primary_key=True)
+
+    # float32 little-endian bytes
+    embedding = Column(LargeBinary, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -11,6 +11,9 @@ class Project(SQLAlchemyBase):
     project_id = Column(Integer, primary_key=True, autoincrement=True)
     project_uuid = Column(UUID(as_uuid=True), default=uuid.uuid4, unique=True, nullable=False)
 
+    # bumped on every re-index, part of the retrieval cache key
+    index_version = Column(Integer, server_default="0", default=0, nullable=False)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
 
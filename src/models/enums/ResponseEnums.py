@@ -19,4 +19,5 @@ class ResponseSignal(Enum):
     VECTORDB_SEARCH_SUCCESS = "vectordb_search_success"
     RAG_ANSWER_ERROR = "rag_answer_error"
     RAG_ANSWER_SUCCESS = "rag_answer_success"
+    VECTORDB_MAINTENANCE_SUCCESS = "vectordb_maintenance_success"
     
\ No newline at end of file
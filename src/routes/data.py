@@ -174,6 +174,8 @@ async def process_endpoint(request: Request, project_id: int, process_request: P
             project_id=project.project_id
         )
 
+        _ = await project_model.bump_index_version(project_id=project.project_id)
+
     for asset_id, file_id in project_files_ids.items():
 
         file_content = process_controller.get_file_content(file_id=file_id)
@@ -1,13 +1,16 @@
 from fastapi import FastAPI, APIRouter, status, Request
-from fastapi.responses import JSONResponse
-from routes.schemes.nlp import PushRequest, SearchRequest
+from fastapi.responses import JSONResponse, StreamingResponse
+from routes.schemes.nlp import PushRequest, SearchRequest, BatchSearchRequest
 from models.ProjectModel import ProjectModel
 from models.ChunkModel import ChunkModel
+from models.EmbeddingCacheModel import EmbeddingCacheModel
 from controllers import NLPController
 from models import ResponseSignal
+from helpers.config import get_settings
 from tqdm.auto import tqdm
 
 import logging
+import json
 
 logger = logging.getLogger('uvicorn.error')
 
@@ -39,11 +42,18 @@ async def index_project(request: Request, project_id: int, push_request: PushReq
             }
         )
     
+    embedding_cache = None
+    if get_settings().EMBEDDING_CACHE_ENABLED:
+        embedding_cache = await EmbeddingCacheModel.create_instance(
+            db_client=request.app.db_client
+        )
+
     nlp_controller = NLPController(
         vectordb_client=request.app.vectordb_client,
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
         template_parser=request.app.template_parser,
+        embedding_cache=embedding_cache,
     )
 
     has_records = True
@@ -54,49 +64,63 @@ async def index_project(request: Request, project_id: int, push_request: PushReq
     # create collection if not exists
     collection_name = nlp_controller.create_collection_name(project_id=project.project_id)
 
-    _ = await request.app.vectordb_client.create_collection(
+    is_collection_created = await request.app.vectordb_client.create_collection(
         collection_name=collection_name,
-        embedding_size=request.app.embedding_client.embedding_size,
+        embedding_size=nlp_controller.get_embedding_size(),
         do_reset=push_request.do_reset,
     )
 
-    # setup batching
-    total_chunks_count = await chunk_model.get_total_chunks_count(project_id=project.project_id)
-    pbar = tqdm(total=total_chunks_count, desc="Vector Indexing", position=0)
+    # a reset or a partial load changes the collection as well, the cached results
+    # of the previous index version must not be served even when the push fails
+    is_collection_modified = bool(is_collection_created or push_request.do_reset)
 
-    while has_records:
-        page_chunks = await chunk_model.get_poject_chunks(project_id=project.project_id, page_no=page_no)
-        if len(page_chunks):
-            page_no += 1
-        
-        if not page_chunks or len(page_chunks) == 0:
-            has_records = False
-            break
+    try:
+        # setup batching
+        total_chunks_count = await chunk_model.get_total_chunks_count(project_id=project.project_id)
+        pbar = tqdm(total=total_chunks_count, desc="Vector Indexing", position=0)
 
-        chunks_ids =  [ c.chunk_id for c in page_chunks ]
-        idx += len(page_chunks)
+        while has_records:
+            page_chunks = await chunk_model.get_poject_chunks(project_id=project.project_id, page_no=page_no)
+            if len(page_chunks):
+                page_no += 1
         
-        is_inserted = await nlp_controller.index_into_vector_db(
-            project=project,
-            chunks=page_chunks,
-            chunks_ids=chunks_ids
-        )
+            if not page_chunks or len(page_chunks) == 0:
+                has_records = False
+                break
 
-        if not is_inserted:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={
-                    "signal": ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value
-                }
+            chunks_ids =  [ c.chunk_id for c in page_chunks ]
+            idx += len(page_chunks)
+        
+            is_collection_modified = True
+            is_inserted = await nlp_controller.index_into_vector_db(
+                project=project,
+                chunks=page_chunks,
+                chunks_ids=chunks_ids
             )
 
-        pbar.update(len(page_chunks))
-        inserted_items_count += len(page_chunks)
+            if not is_inserted:
+                return JSONResponse(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    content={
+                        "signal": ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value
+                    }
+                )
+
+            pbar.update(len(page_chunks))
+            inserted_items_count += len(page_chunks)
+
+        # build the vector index once, after all pages are loaded
+        index_report = await nlp_controller.build_vector_db_index(project=project)
+    finally:
+        # results cached against the previous index version are no longer served
+        if is_collection_modified:
+            _ = await project_model.bump_index_version(project_id=project.project_id)
         
     return JSONResponse(
         content={
             "signal": ResponseSignal.INSERT_INTO_VECTORDB_SUCCESS.value,
-            "inserted_items_count": inserted_items_count
+            "inserted_items_count": inserted_items_count,
+            "index": index_report,
         }
     )
 
@@ -127,6 +151,19 @@ async def get_project_index_info(request: Request, project_id: int):
         }
     )
 
+@nlp_router.post("/index/maintain")
+async def maintain_index(request: Request):
+
+    # vacuum/analyze all collections in bulk and prewarm their vector indexes
+    maintenance_report = await request.app.vectordb_client.maintain_collections()
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.VECTORDB_MAINTENANCE_SUCCESS.value,
+            "maintenance": maintenance_report,
+        }
+    )
+
 @nlp_router.post("/index/search/{project_id}")
 async def search_index(request: Request, project_id: int, search_request: SearchRequest):
     
@@ -143,10 +180,14 @@ async def search_index(request: Request, project_id: int, search_request: Search
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
         template_parser=request.app.template_parser,
+        retrieval_cache=request.app.retrieval_cache,
     )
 
     results = await nlp_controller.search_vector_db_collection(
-        project=project, text=search_request.text, limit=search_request.limit
+        project=project, text=search_request.text, limit=search_request.limit,
+        ef_search=search_request.ef_search, probes=search_request.probes,
+        metadata_filter=search_request.filter, hybrid=search_request.hybrid,
+        mmr=search_request.mmr, mmr_lambda=search_request.mmr_lambda,
     )
 
     if not results:
@@ -176,6 +217,64 @@ async def search_index(request: Request, project_id: int, search_request: Search
         }
     )
 
+@nlp_router.post("/index/search/batch/{project_id}")
+async def search_index_batch(request: Request, project_id: int, search_request: BatchSearchRequest):
+    
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+    )
+
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        generation_client=request.app.generation_client,
+        embedding_client=request.app.embedding_client,
+        template_parser=request.app.template_parser,
+    )
+
+    batch_results = await nlp_controller.search_many_vector_db_collection(
+        project=project, texts=search_request.texts, limit=search_request.limit,
+        ef_search=search_request.ef_search, probes=search_request.probes,
+        metadata_filter=search_request.filter,
+    )
+
+    if not batch_results:
+        return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "signal": ResponseSignal.VECTORDB_SEARCH_ERROR.value
+                }
+            )
+    
+    # Extract source_file from metadata, one entry per query text
+    batch_results_with_files = []
+    for text, results in zip(search_request.texts, batch_results):
+        results_with_files = []
+        file_names = set()
+
+        for result in results or []:
+            result_dict = result.dict()
+            source_file = result.metadata.get("source_file", "Unknown")
+            result_dict["source_file"] = source_file
+            file_names.add(source_file)
+            results_with_files.append(result_dict)
+
+        batch_results_with_files.append({
+            "text": text,
+            "results": results_with_files,
+            "file_names": list(file_names),
+        })
+    
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.VECTORDB_SEARCH_SUCCESS.value,
+            "batch_results": batch_results_with_files,
+        }
+    )
+
 @nlp_router.post("/index/answer/{project_id}")
 async def answer_rag(request: Request, project_id: int, search_request: SearchRequest):
     
@@ -192,12 +291,21 @@ async def answer_rag(request: Request, project_id: int, search_request: SearchRe
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
         template_parser=request.app.template_parser,
+        retrieval_cache=request.app.retrieval_cache,
+        answer_cache=request.app.answer_cache,
+        request_coalescer=request.app.request_coalescer,
     )
 
     answer, full_prompt, chat_history = await nlp_controller.answer_rag_question(
         project=project,
         query=search_request.text,
         limit=search_request.limit,
+        ef_search=search_request.ef_search,
+        probes=search_request.probes,
+        metadata_filter=search_request.filter,
+        hybrid=search_request.hybrid,
+        mmr=search_request.mmr,
+        mmr_lambda=search_request.mmr_lambda,
     )
 
     if not answer:
@@ -216,3 +324,47 @@ async def answer_rag(request: Request, project_id: int, search_request: SearchRe
             "chat_history": chat_history
         }
     )
+
+@nlp_router.post("/index/answer/stream/{project_id}")
+async def answer_rag_stream(request: Request, project_id: int, search_request: SearchRequest):
+    
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+    )
+
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        generation_client=request.app.generation_client,
+        embedding_client=request.app.embedding_client,
+        template_parser=request.app.template_parser,
+        retrieval_cache=request.app.retrieval_cache,
+        answer_cache=request.app.answer_cache,
+    )
+
+    async def event_stream():
+        async for event, data in nlp_controller.stream_rag_answer(
+            project=project,
+            query=search_request.text,
+            limit=search_request.limit,
+            ef_search=search_request.ef_search,
+            probes=search_request.probes,
+            metadata_filter=search_request.filter,
+            hybrid=search_request.hybrid,
+            mmr=search_request.mmr,
+            mmr_lambda=search_request.mmr_lambda,
+        ):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx must pass the events through instead of buffering the response
+            "X-Accel-Buffering": "no",
+        }
+    )
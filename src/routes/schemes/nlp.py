@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 class PushRequest(BaseModel):
     do_reset: Optional[int] = 0
@@ -7,3 +7,16 @@ class PushRequest(BaseModel):
 class SearchRequest(BaseModel):
     text: str
     limit: Optional[int] = 5
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    filter: Optional[dict] = None
+    hybrid: Optional[bool] = False
+    mmr: Optional[bool] = False
+    mmr_lambda: Optional[float] = None
+
+class BatchSearchRequest(BaseModel):
+    texts: List[str]
+    limit: Optional[int] = 5
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    filter: Optional[dict] = None
@@ -0,0 +1,132 @@
+from typing import List, Callable, Awaitable
+import asyncio
+import logging
+import random
+import re
+
+class EmbeddingBatcher:
+    """
+    Packs texts into provider sized embedding requests and runs them concurrently.
+    Batches are bounded by a text count and an estimated token budget; rate limited and
+    server failures are retried with jittered exponential backoff, and a batch rejected
+    as too large is split in half until it fits.
+    """
+
+    # ~4 characters per token holds well enough for budgeting english and arabic text
+    CHARS_PER_TOKEN = 4
+
+    RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+    # how openai, cohere and ollama word an input that exceeds the model or batch limits
+    SIZE_ERROR_PATTERN = re.compile(
+        r"context length|maximum context|too many tokens|too long|too large|"
+        r"max(imum)? (number of )?(tokens|inputs|texts)|exceeds|batch size"
+    )
+
+    def __init__(self, embed_batch: Callable[[List[str], str], Awaitable[list]],
+                       max_batch_texts: int = 96, max_batch_tokens: int = 8000,
+                       concurrency: int = 4, max_retries: int = 5, retry_base_delay: float = 0.5):
+
+        self.embed_batch = embed_batch
+        self.max_batch_texts = max(max_batch_texts, 1)
+        self.max_batch_tokens = max(max_batch_tokens, 1)
+        self.concurrency = max(concurrency, 1)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+
+        self.logger = logging.getLogger(__name__)
+
+    def estimate_tokens(self, text: str):
+        return len(text) // self.CHARS_PER_TOKEN + 1
+
+    def pack(self, texts: List[str]):
+        batches = []
+        batch, batch_tokens = [], 0
+
+        for text in texts:
+            tokens = self.estimate_tokens(text)
+            if batch and (len(batch) >= self.max_batch_texts or batch_tokens + tokens > self.max_batch_tokens):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+
+            batch.append(text)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def get_status_code(self, error: Exception):
+        # openai and cohere errors carry status_code, httpx keeps it on the response
+        status_code = getattr(error, "status_code", None)
+        if status_code is None and getattr(error, "response", None) is not None:
+            status_code = getattr(error.response, "status_code", None)
+
+        return status_code
+
+    def is_retryable(self, error: Exception):
+        status_code = self.get_status_code(error)
+        if status_code is None:
+            # no response at all: connection resets and timeouts of any of the client libraries
+            error_name = type(error).__name__.lower()
+            return isinstance(error, (ConnectionError, TimeoutError)) \
+                or "timeout" in error_name or "connect" in error_name
+
+        return status_code in self.RETRY_STATUS_CODES
+
+    def get_error_message(self, error: Exception):
+        response = getattr(error, "response", None)
+        try:
+            body = response.text if response is not None else ""
+        except Exception:
+            body = ""
+
+        return f"{error} {body or ''}".lower()
+
+    def is_size_error(self, error: Exception):
+        status_code = self.get_status_code(error)
+        if status_code == 413:
+            return True
+
+        # a 400 is also a malformed request or an unknown model, halving those only multiplies
+        # the failing calls; split only when the provider says the input is too large
+        return status_code == 400 and self.SIZE_ERROR_PATTERN.search(self.get_error_message(error)) is not None
+
+    async def embed_with_retry(self, texts: List[str], document_type: str = None,
+                                     semaphore: asyncio.Semaphore = None):
+
+        semaphore = semaphore or asyncio.Semaphore(self.concurrency)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                # the slot is held for the call only, never across a backoff or the split halves
+                async with semaphore:
+                    return await self.embed_batch(texts, document_type)
+            except Exception as e:
+                if self.is_size_error(e) and len(texts) > 1:
+                    self.logger.warning(f"Embedding batch of {len(texts)} texts was rejected, splitting it: {e}")
+                    middle = len(texts) // 2
+                    left, right = await asyncio.gather(
+                        self.embed_with_retry(texts[:middle], document_type, semaphore),
+                        self.embed_with_retry(texts[middle:], document_type, semaphore),
+                    )
+                    return left + right
+
+                if not self.is_retryable(e) or attempt == self.max_retries:
+                    raise
+
+                # full jitter keeps the concurrent batches from retrying in lockstep
+                delay = random.uniform(0, self.retry_base_delay * (2 ** attempt))
+                self.logger.warning(f"Embedding batch failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def embed(self, texts: List[str], document_type: str = None):
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        # gather keeps the batches in input order
+        batches_embeddings = await asyncio.gather(*[
+            self.embed_with_retry(batch, document_type, semaphore) for batch in self.pack(texts)
+        ])
+
+        return [ embedding for batch_embeddings in batches_embeddings for embedding in batch_embeddings ]
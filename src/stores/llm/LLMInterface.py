@@ -15,10 +15,32 @@ class LLMInterface(ABC):
                             temperature: float = None):
         pass
 
+    @abstractmethod
+    async def agenerate_text(self, prompt: str, chat_history: list=None, max_output_tokens: int=None,
+                                   temperature: float = None):
+        pass
+
+    @abstractmethod
+    async def astream_text(self, prompt: str, chat_history: list=None, max_output_tokens: int=None,
+                                 temperature: float = None):
+        pass
+
     @abstractmethod
     def embed_text(self, text: str, document_type: str = None):
         pass
 
+    @abstractmethod
+    async def aembed_text(self, text: str, document_type: str = None):
+        pass
+
+    @abstractmethod
+    async def awarm_up(self, system_prompt: str = None):
+        pass
+
     @abstractmethod
     def construct_prompt(self, prompt: str, role: str):
         pass
+
+    @abstractmethod
+    async def aclose(self):
+        pass
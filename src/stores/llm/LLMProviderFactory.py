@@ -1,5 +1,5 @@
 from .LLMEnums import LLMEnums
-from .providers import OpenAIProvider, CoHereProvider, OllamaProvider
+from .providers import OpenAIProvider, CoHereProvider, OllamaProvider, LocalProvider
 
 class LLMProviderFactory:
     def __init__(self, config: dict):
@@ -12,7 +12,10 @@ class LLMProviderFactory:
                 api_url = self.config.OPENAI_API_URL,
                 default_input_max_characters=self.config.INPUT_DAFAULT_MAX_CHARACTERS,
                 default_generation_max_output_tokens=self.config.GENERATION_DAFAULT_MAX_TOKENS,
-                default_generation_temperature=self.config.GENERATION_DAFAULT_TEMPERATURE
+                default_generation_temperature=self.config.GENERATION_DAFAULT_TEMPERATURE,
+                embedding_batch_max_tokens=self.config.EMBEDDING_BATCH_MAX_TOKENS,
+                embedding_concurrency=self.config.EMBEDDING_BATCH_CONCURRENCY,
+                embedding_max_retries=self.config.EMBEDDING_MAX_RETRIES,
             )
 
         if provider == LLMEnums.COHERE.value:
@@ -20,7 +23,10 @@ class LLMProviderFactory:
                 api_key = self.config.COHERE_API_KEY,
                 default_input_max_characters=self.config.INPUT_DAFAULT_MAX_CHARACTERS,
                 default_generation_max_output_tokens=self.config.GENERATION_DAFAULT_MAX_TOKENS,
-                default_generation_temperature=self.config.GENERATION_DAFAULT_TEMPERATURE
+                default_generation_temperature=self.config.GENERATION_DAFAULT_TEMPERATURE,
+                embedding_batch_max_tokens=self.config.EMBEDDING_BATCH_MAX_TOKENS,
+                embedding_concurrency=self.config.EMBEDDING_BATCH_CONCURRENCY,
+                embedding_max_retries=self.config.EMBEDDING_MAX_RETRIES,
             )
 
         if provider == LLMEnums.OLLAMA.value:
@@ -31,7 +37,24 @@ class LLMProviderFactory:
                 api_url = api_url,
                 default_input_max_characters=self.config.INPUT_DAFAULT_MAX_CHARACTERS,
                 default_generation_max_output_tokens=self.config.GENERATION_DAFAULT_MAX_TOKENS,
-                default_generation_temperature=self.config.GENERATION_DAFAULT_TEMPERATURE
+                default_generation_temperature=self.config.GENERATION_DAFAULT_TEMPERATURE,
+                embedding_batch_size=self.config.OLLAMA_EMBEDDING_BATCH_SIZE,
+                embedding_concurrency=self.config.OLLAMA_EMBEDDING_CONCURRENCY,
+                embedding_batch_max_tokens=self.config.EMBEDDING_BATCH_MAX_TOKENS,
+                embedding_max_retries=self.config.EMBEDDING_MAX_RETRIES,
+                generation_concurrency=self.config.OLLAMA_GENERATION_CONCURRENCY,
+                keep_alive=self.config.OLLAMA_KEEP_ALIVE,
+            )
+
+        if provider == LLMEnums.LOCAL.value:
+            return LocalProvider(
+                models_dir=self.config.LOCAL_EMBEDDING_MODELS_DIR,
+                default_input_max_characters=self.config.INPUT_DAFAULT_MAX_CHARACTERS,
+                embedding_batch_size=self.config.LOCAL_EMBEDDING_BATCH_SIZE,
+                embedding_max_length=self.config.LOCAL_EMBEDDING_MAX_LENGTH,
+                embedding_threads=self.config.LOCAL_EMBEDDING_THREADS,
+                query_prefix=self.config.LOCAL_EMBEDDING_QUERY_PREFIX,
+                document_prefix=self.config.LOCAL_EMBEDDING_DOCUMENT_PREFIX,
             )
 
         return None
\ No newline at end of file
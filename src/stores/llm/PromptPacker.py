@@ -0,0 +1,95 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Callable
+import tiktoken
+import logging
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str):
+    # the BPE files are fetched on first use, a missing one is remembered so offline
+    # workers do not retry the download on every request
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"Tokenizer {encoding_name} is not available, estimating tokens from characters: {e}")
+        return None
+
+@dataclass
+class PackedPrompt:
+    documents_prompts: List[str] = field(default_factory=list)
+    prompt_tokens: int = 0
+    packed_chunks: int = 0
+    dropped_chunks: int = 0
+
+class PromptPacker:
+    """
+    Fits a RAG prompt into the input token budget of the generation model.
+    The system prompt and the question are always kept; chunks are added in retrieval
+    order, best first, until the budget runs out. The first chunk that does not fit whole
+    is cut at a token boundary when enough room is left for it to be useful.
+    """
+
+    # fallback when no tokenizer is available, same estimate as the embedding batcher
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, max_input_tokens: int = None, encoding_name: str = "cl100k_base",
+                       min_chunk_tokens: int = 64):
+
+        self.max_input_tokens = max_input_tokens
+        self.min_chunk_tokens = max(min_chunk_tokens, 1)
+        self.encoding = get_encoding(encoding_name) if encoding_name else None
+
+    def count_tokens(self, text: str):
+        if not text:
+            return 0
+
+        if self.encoding is None:
+            return len(text) // self.CHARS_PER_TOKEN + 1
+
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int):
+        if self.encoding is None:
+            return text[:max_tokens * self.CHARS_PER_TOKEN]
+
+        return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+
+    def pack(self, system_prompt: str, footer_prompt: str, chunks: List[str],
+                   render_chunk: Callable[[int, str], str], separator: str = "\n") -> PackedPrompt:
+
+        separator_tokens = self.count_tokens(separator)
+        # the documents block is joined to the footer with a blank line
+        prompt_tokens = self.count_tokens(system_prompt) + self.count_tokens(footer_prompt) + 2 * separator_tokens
+
+        packed = PackedPrompt()
+
+        for chunk in chunks:
+            chunk_prompt = render_chunk(packed.packed_chunks + 1, chunk)
+            chunk_tokens = self.count_tokens(chunk_prompt) + separator_tokens
+
+            if self.max_input_tokens and prompt_tokens + chunk_tokens > self.max_input_tokens:
+                # room left for the chunk text once the template around it is paid for
+                room = self.max_input_tokens - prompt_tokens - (chunk_tokens - self.count_tokens(chunk))
+
+                # token counts are not additive across the cut, shrink until the chunk fits
+                while room >= self.min_chunk_tokens and prompt_tokens + chunk_tokens > self.max_input_tokens:
+                    chunk_prompt = render_chunk(packed.packed_chunks + 1, self.truncate(chunk, room))
+                    chunk_tokens = self.count_tokens(chunk_prompt) + separator_tokens
+                    room -= max(prompt_tokens + chunk_tokens - self.max_input_tokens, 1)
+
+                if prompt_tokens + chunk_tokens > self.max_input_tokens:
+                    break
+
+            packed.documents_prompts.append(chunk_prompt)
+            packed.packed_chunks += 1
+            prompt_tokens += chunk_tokens
+
+            if self.max_input_tokens and prompt_tokens >= self.max_input_tokens:
+                break
+
+        packed.dropped_chunks = len(chunks) - packed.packed_chunks
+        packed.prompt_tokens = prompt_tokens
+
+        return packed
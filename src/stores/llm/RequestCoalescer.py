@@ -0,0 +1,50 @@
+from utils.metrics import COALESCED_REQUESTS
+from typing import Callable, Awaitable
+import asyncio
+import json
+
+class RequestCoalescer:
+    """
+    Single-flight for identical concurrent requests within a worker.
+    The first caller starts the work as a task, every caller arriving with the same key
+    while it runs awaits that task instead of starting its own, and all get its result.
+    Nothing is kept once the task is done, caching is left to the answer caches.
+    """
+
+    def __init__(self):
+        self.in_flight = {}
+
+    def normalize_text(self, text: str):
+        return " ".join(text.casefold().split())
+
+    def build_key(self, project_id: int, index_version: int, text: str, limit: int,
+                        model_id: str, **params):
+        return (
+            project_id,
+            index_version,
+            self.normalize_text(text),
+            limit,
+            model_id,
+            json.dumps(params, sort_keys=True, default=str),
+        )
+
+    async def run(self, key: tuple, call: Callable[[], Awaitable]):
+
+        task = self.in_flight.get(key)
+        if task is not None:
+            COALESCED_REQUESTS.inc()
+        else:
+            task = asyncio.ensure_future(call())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done_task: self.release(key, done_task))
+
+        # shield keeps a disconnecting caller from cancelling the work the others wait on
+        return await asyncio.shield(task)
+
+    def release(self, key: tuple, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+
+        # every caller may have gone away, mark the error as seen so asyncio does not log it again
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,85 @@
+from dataclasses import dataclass, field
+from utils.metrics import ANSWER_CACHE_HITS, ANSWER_CACHE_MISSES
+import numpy as np
+import time
+
+@dataclass
+class CachedAnswer:
+    index_version: int
+    query_vector: np.ndarray
+    chunk_ids: frozenset
+    answer: str
+    stored_at: float = field(default_factory=time.monotonic)
+
+class SemanticAnswerCache:
+    """
+    Per project cache of generated answers, matched by query similarity rather than exact text.
+    A paraphrase is served the cached answer only when its embedding is close enough and it
+    retrieved mostly the same chunks, so the cached answer was grounded on the same context.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, min_overlap: float = 0.6,
+                       max_entries: int = 256, ttl_seconds: int = 3600):
+        self.similarity_threshold = similarity_threshold
+        self.min_overlap = min_overlap
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.projects = {}
+
+    def normalize(self, vector: list):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get_entries(self, project_id: int, index_version: int):
+        now = time.monotonic()
+
+        # entries of a previous index version, or too old, are dropped on access
+        entries = [
+            entry for entry in self.projects.get(project_id, [])
+            if entry.index_version == index_version
+            and (not self.ttl_seconds or now - entry.stored_at <= self.ttl_seconds)
+        ]
+        self.projects[project_id] = entries
+
+        return entries
+
+    def get(self, project_id: int, index_version: int, query_vector: list, chunk_ids: list):
+
+        entries = self.get_entries(project_id=project_id, index_version=index_version)
+        if not entries:
+            ANSWER_CACHE_MISSES.inc()
+            return None
+
+        similarities = np.stack([ entry.query_vector for entry in entries ]) @ self.normalize(query_vector)
+        chunk_ids = frozenset(chunk_ids)
+
+        for idx in np.argsort(-similarities):
+            if similarities[idx] < self.similarity_threshold:
+                break
+
+            entry = entries[idx]
+            overlap = len(entry.chunk_ids & chunk_ids) / max(len(entry.chunk_ids | chunk_ids), 1)
+            if overlap >= self.min_overlap:
+                ANSWER_CACHE_HITS.inc()
+                return entry.answer
+
+        ANSWER_CACHE_MISSES.inc()
+        return None
+
+    def set(self, project_id: int, index_version: int, query_vector: list, chunk_ids: list, answer: str):
+
+        if self.max_entries <= 0 or not answer:
+            return
+
+        entries = self.get_entries(project_id=project_id, index_version=index_version)
+        entries.append(CachedAnswer(
+            index_version=index_version,
+            query_vector=self.normalize(query_vector),
+            chunk_ids=frozenset(chunk_ids),
+            answer=answer,
+        ))
+
+        # oldest first, so the list head is the eviction candidate
+        del entries[:-self.max_entries]
@@ -1,6 +1,8 @@
 from ..LLMInterface import LLMInterface
 from ..LLMEnums import CoHereEnums, DocumentTypeEnum
+from ..EmbeddingBatcher import EmbeddingBatcher
 import cohere
+import httpx
 import logging
 from typing import List, Union
 
@@ -9,7 +11,10 @@ class CoHereProvider(LLMInterface):
     def __init__(self, api_key: str,
                        default_input_max_characters: int=1000,
                        default_generation_max_output_tokens: int=1000,
-                       default_generation_temperature: float=0.1):
+                       default_generation_temperature: float=0.1,
+                       embedding_batch_max_tokens: int=None,
+                       embedding_concurrency: int=4,
+                       embedding_max_retries: int=5):
         
         self.api_key = api_key
 
@@ -22,7 +27,21 @@ class CoHereProvider(LLMInterface):
         self.embedding_model_id = None
         self.embedding_size = None
 
-        self.client = cohere.Client(api_key=self.api_key)
+        # the http clients are owned here so the shutdown can close their connection pools
+        self.http_client = httpx.Client(timeout=300, follow_redirects=True)
+        self.async_http_client = httpx.AsyncClient(timeout=300, follow_redirects=True)
+
+        self.client = cohere.Client(api_key=self.api_key, httpx_client=self.http_client)
+        self.async_client = cohere.AsyncClient(api_key=self.api_key, httpx_client=self.async_http_client)
+
+        # the embed endpoint takes at most 96 texts per call
+        self.embedding_batcher = EmbeddingBatcher(
+            embed_batch=self.aembed_batch,
+            max_batch_texts=96,
+            max_batch_tokens=embedding_batch_max_tokens or 96 * 512,
+            concurrency=embedding_concurrency,
+            max_retries=embedding_max_retries,
+        )
 
         self.enums = CoHereEnums
         self.logger = logging.getLogger(__name__)
@@ -54,7 +73,7 @@ class CoHereProvider(LLMInterface):
         response = self.client.chat(
             model = self.generation_model_id,
             chat_history = chat_history,
-            message = self.process_text(prompt),
+            message = prompt,
             temperature = temperature,
             max_tokens = max_output_tokens
         )
@@ -64,6 +83,64 @@ class CoHereProvider(LLMInterface):
             return None
         
         return response.text
+
+    async def agenerate_text(self, prompt: str, chat_history: list=None, max_output_tokens: int=None,
+                                   temperature: float = None):
+
+        if not self.async_client:
+            self.logger.error("CoHere client was not set")
+            return None
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model for CoHere was not set")
+            return None
+
+        max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
+        temperature = temperature if temperature else self.default_generation_temperature
+
+        response = await self.async_client.chat(
+            model = self.generation_model_id,
+            chat_history = chat_history or [],
+            message = prompt,
+            temperature = temperature,
+            max_tokens = max_output_tokens
+        )
+
+        if not response or not response.text:
+            self.logger.error("Error while generating text with CoHere")
+            return None
+
+        return response.text
+
+    async def astream_text(self, prompt: str, chat_history: list=None, max_output_tokens: int=None,
+                                 temperature: float = None):
+
+        if not self.async_client:
+            self.logger.error("CoHere client was not set")
+            return
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model for CoHere was not set")
+            return
+
+        max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
+        temperature = temperature if temperature else self.default_generation_temperature
+
+        async for event in self.async_client.chat_stream(
+            model = self.generation_model_id,
+            chat_history = chat_history or [],
+            message = prompt,
+            temperature = temperature,
+            max_tokens = max_output_tokens
+        ):
+            if event.event_type == "text-generation" and event.text:
+                yield event.text
+
+    def get_input_type(self, document_type: str = None):
+        if document_type in (DocumentTypeEnum.QUERY, DocumentTypeEnum.QUERY.value):
+            return CoHereEnums.QUERY.value
+
+        return CoHereEnums.DOCUMENT.value
     
     def embed_text(self, text: Union[str, List[str]], document_type: str = None):
         if not self.client:
@@ -77,14 +154,10 @@ class CoHereProvider(LLMInterface):
             self.logger.error("Embedding model for CoHere was not set")
             return None
         
-        input_type = CoHereEnums.DOCUMENT
-        if document_type == DocumentTypeEnum.QUERY:
-            input_type = CoHereEnums.QUERY
-
         response = self.client.embed(
             model = self.embedding_model_id,
             texts = [ self.process_text(t) for t in text ],
-            input_type = input_type,
+            input_type = self.get_input_type(document_type),
             embedding_types=['float'],
         )
 
@@ -93,7 +166,47 @@ class CoHereProvider(LLMInterface):
             return None
         
         return [ f for f in response.embeddings.float ]
+
+    async def aembed_batch(self, texts: List[str], document_type: str = None):
+        response = await self.async_client.embed(
+            model = self.embedding_model_id,
+            texts = texts,
+            input_type = self.get_input_type(document_type),
+            embedding_types=['float'],
+        )
+
+        if not response or not response.embeddings or not response.embeddings.float:
+            raise ValueError("Unexpected embedding response from CoHere")
+
+        return [ f for f in response.embeddings.float ]
+
+    async def aembed_text(self, text: Union[str, List[str]], document_type: str = None):
+        if not self.async_client:
+            self.logger.error("CoHere client was not set")
+            return None
+
+        if isinstance(text, str):
+            text = [text]
+
+        if not self.embedding_model_id:
+            self.logger.error("Embedding model for CoHere was not set")
+            return None
+
+        try:
+            return await self.embedding_batcher.embed([ self.process_text(t) for t in text ],
+                                                      document_type=document_type)
+        except Exception as e:
+            self.logger.error(f"Error while embedding text with CoHere: {e}")
+            return None
     
+    async def aclose(self):
+        await self.async_http_client.aclose()
+        self.http_client.close()
+
+    async def awarm_up(self, system_prompt: str = None):
+        # hosted models are always loaded, nothing to warm up
+        return True
+
     def construct_prompt(self, prompt: str, role: str):
         return {
             "role": role,
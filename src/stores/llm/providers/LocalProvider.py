@@ -0,0 +1,186 @@
+from ..LLMInterface import LLMInterface
+from ..LLMEnums import DocumentTypeEnum
+from concurrent.futures import ThreadPoolExecutor
+from tokenizers import Tokenizer
+import onnxruntime as ort
+import numpy as np
+import asyncio
+import logging
+import os
+from typing import List, Union
+
+class LocalProvider(LLMInterface):
+    """
+    In-process sentence embeddings with ONNX Runtime, loaded from a local model directory
+    holding `model.onnx` and the `tokenizer.json` of the exported model. Embedding only.
+    """
+
+    def __init__(self, models_dir: str,
+                       default_input_max_characters: int = 1000,
+                       embedding_batch_size: int = 32,
+                       embedding_max_length: int = 512,
+                       embedding_threads: int = 4,
+                       query_prefix: str = "",
+                       document_prefix: str = ""):
+
+        self.models_dir = models_dir
+        self.default_input_max_characters = default_input_max_characters
+        self.embedding_batch_size = max(embedding_batch_size, 1)
+        self.embedding_max_length = embedding_max_length
+        self.embedding_threads = max(embedding_threads, 1)
+
+        # instruction tuned models (e5, nomic, bge) expect a prefix per document type
+        self.query_prefix = query_prefix or ""
+        self.document_prefix = document_prefix or ""
+
+        self.embedding_model_id = None
+        self.embedding_size = None
+
+        self.session = None
+        self.tokenizer = None
+
+        # batches run side by side on the pool, one core each, instead of oversubscribing
+        # the cores with intra-op threads of concurrent runs
+        self.executor = ThreadPoolExecutor(max_workers=self.embedding_threads,
+                                           thread_name_prefix="local-embedding")
+
+        self.logger = logging.getLogger(__name__)
+
+    def set_generation_model(self, model_id: str):
+        self.logger.error("Local provider does not support text generation")
+
+    def set_embedding_model(self, model_id: str, embedding_size: int):
+        model_dir = model_id if os.path.isabs(model_id) else os.path.join(self.models_dir, model_id)
+
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = 1
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(os.path.join(model_dir, "model.onnx"),
+                                            sess_options=session_options,
+                                            providers=["CPUExecutionProvider"])
+        self.session_inputs = { model_input.name for model_input in self.session.get_inputs() }
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.embedding_max_length)
+        self.tokenizer.enable_padding()
+
+        self.embedding_model_id = model_id
+        self.embedding_size = embedding_size
+
+    def process_text(self, text: str):
+        return text[:self.default_input_max_characters].strip()
+
+    def generate_text(self, prompt: str, chat_history: list = [], max_output_tokens: int = None,
+                            temperature: float = None):
+        self.logger.error("Local provider does not support text generation")
+        return None
+
+    async def agenerate_text(self, prompt: str, chat_history: list = None, max_output_tokens: int = None,
+                                   temperature: float = None):
+        return self.generate_text(prompt=prompt)
+
+    async def astream_text(self, prompt: str, chat_history: list = None, max_output_tokens: int = None,
+                                 temperature: float = None):
+        self.logger.error("Local provider does not support text generation")
+        # the bare yield keeps this an (empty) async generator for the callers
+        return
+        yield
+
+    def embed_batch(self, texts: List[str]):
+        encodings = self.tokenizer.encode_batch(texts)
+
+        input_ids = np.asarray([ e.ids for e in encodings ], dtype=np.int64)
+        attention_mask = np.asarray([ e.attention_mask for e in encodings ], dtype=np.int64)
+
+        inputs = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.asarray([ e.type_ids for e in encodings ], dtype=np.int64),
+        }
+        inputs = { name: value for name, value in inputs.items() if name in self.session_inputs }
+
+        outputs = self.session.run(None, inputs)[0]
+
+        if outputs.ndim == 3:
+            # token embeddings, mean pool over the non padding tokens
+            mask = attention_mask[..., None].astype(np.float32)
+            outputs = (outputs * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        norms = np.linalg.norm(outputs, axis=1, keepdims=True)
+        outputs = outputs / np.clip(norms, 1e-12, None)
+
+        return outputs.tolist()
+
+    def prepare_texts(self, text: Union[str, List[str]], document_type: str = None):
+        if isinstance(text, str):
+            text = [text]
+
+        prefix = self.document_prefix
+        if document_type in (DocumentTypeEnum.QUERY, DocumentTypeEnum.QUERY.value):
+            prefix = self.query_prefix
+
+        return [ prefix + self.process_text(t) for t in text ]
+
+    def split_batches(self, texts: List[str]):
+        # sorting by length keeps the padding of every batch small
+        order = sorted(range(len(texts)), key=lambda idx: len(texts[idx]))
+        return [
+            order[batch_start:batch_start + self.embedding_batch_size]
+            for batch_start in range(0, len(order), self.embedding_batch_size)
+        ]
+
+    def embed_text(self, text: Union[str, List[str]], document_type: str = None):
+        if not self.session:
+            self.logger.error("Embedding model for Local provider was not set")
+            return None
+
+        texts = self.prepare_texts(text, document_type=document_type)
+
+        embeddings = [None] * len(texts)
+        for batch in self.split_batches(texts):
+            for idx, embedding in zip(batch, self.embed_batch([ texts[i] for i in batch ])):
+                embeddings[idx] = embedding
+
+        return embeddings
+
+    async def aembed_text(self, text: Union[str, List[str]], document_type: str = None):
+        if not self.session:
+            self.logger.error("Embedding model for Local provider was not set")
+            return None
+
+        texts = self.prepare_texts(text, document_type=document_type)
+        batches = self.split_batches(texts)
+
+        # onnxruntime releases the GIL, so the batches really run in parallel off the event loop
+        loop = asyncio.get_running_loop()
+        batches_embeddings = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, self.embed_batch, [ texts[i] for i in batch ])
+            for batch in batches
+        ])
+
+        embeddings = [None] * len(texts)
+        for batch, batch_embeddings in zip(batches, batches_embeddings):
+            for idx, embedding in zip(batch, batch_embeddings):
+                embeddings[idx] = embedding
+
+        return embeddings
+
+    async def aclose(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def awarm_up(self, system_prompt: str = None):
+        if not self.session:
+            return False
+
+        # the first run allocates the onnxruntime arenas, keep that off the first request
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.embed_batch, [ "warm up" ])
+
+        return True
+
+    def construct_prompt(self, prompt: str, role: str):
+        return {
+            "role": role,
+            "content": prompt,
+        }
@@ -1,6 +1,10 @@
 from ..LLMInterface import LLMInterface
-from ..LLMEnums import DocumentTypeEnum
+from ..LLMEnums import DocumentTypeEnum, OllamaEnums
+from ..EmbeddingBatcher import EmbeddingBatcher
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import requests
+import httpx
 import logging
 from typing import List, Union
 import json
@@ -10,9 +14,47 @@ class OllamaProvider(LLMInterface):
     def __init__(self, api_url: str = "http://localhost:11434",
                        default_input_max_characters: int = 1000,
                        default_generation_max_output_tokens: int = 1000,
-                       default_generation_temperature: float = 0.1):
+                       default_generation_temperature: float = 0.1,
+                       embedding_batch_size: int = 64,
+                       embedding_concurrency: int = 4,
+                       embedding_batch_max_tokens: int = None,
+                       embedding_max_retries: int = 5,
+                       generation_concurrency: int = 16,
+                       keep_alive: str = None):
         
         self.api_url = api_url.rstrip('/')
+
+        # ollama unloads an idle model after 5 minutes, a negative value keeps it loaded.
+        # durations go as strings ("30m"), bare numbers are sent as numbers of seconds
+        self.keep_alive = keep_alive
+        if isinstance(keep_alive, str) and keep_alive.lstrip("-").isdigit():
+            self.keep_alive = int(keep_alive)
+
+        self.embedding_batch_size = max(embedding_batch_size, 1)
+        self.embedding_concurrency = max(embedding_concurrency, 1)
+        self.generation_concurrency = max(generation_concurrency, 1)
+
+        # keep-alive connections, enough of them for the concurrent embedding batches
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.embedding_concurrency + 1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        self.async_client = httpx.AsyncClient(
+            base_url=self.api_url,
+            headers={"Content-Type": "application/json"},
+            limits=httpx.Limits(max_connections=self.embedding_concurrency + 1),
+        )
+
+        # generations hold their connection for the whole answer, a pool of their own keeps
+        # concurrent answers from queueing behind each other and behind the embedding batches
+        self.generation_async_client = httpx.AsyncClient(
+            base_url=self.api_url,
+            headers={"Content-Type": "application/json"},
+            limits=httpx.Limits(max_connections=self.generation_concurrency,
+                                max_keepalive_connections=self.generation_concurrency),
+        )
         
         self.default_input_max_characters = default_input_max_characters
         self.default_generation_max_output_tokens = default_generation_max_output_tokens
@@ -22,6 +64,16 @@ class OllamaProvider(LLMInterface):
         self.embedding_model_id = None
         self.embedding_size = None
 
+        # the token budget keeps a batch within what the model server can hold at once
+        self.embedding_batcher = EmbeddingBatcher(
+            embed_batch=self.aembed_batch,
+            max_batch_texts=self.embedding_batch_size,
+            max_batch_tokens=embedding_batch_max_tokens or 32768,
+            concurrency=self.embedding_concurrency,
+            max_retries=embedding_max_retries,
+        )
+
+        self.enums = OllamaEnums
         self.logger = logging.getLogger(__name__)
 
     def set_generation_model(self, model_id: str):
@@ -41,24 +93,110 @@ class OllamaProvider(LLMInterface):
             self.logger.error("Generation model for Ollama was not set")
             return None
         
+        payload = self.build_chat_payload(prompt=prompt, chat_history=chat_history,
+                                          max_output_tokens=max_output_tokens, temperature=temperature)
+
+        try:
+            response = self.session.post(
+                f"{self.api_url}/api/chat",
+                json=payload,
+                timeout=120
+            )
+            response.raise_for_status()
+            
+            result = response.json()
+            if "message" in result and "content" in result["message"]:
+                return result["message"]["content"]
+            else:
+                self.logger.error("Unexpected response format from Ollama")
+                return None
+                
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Error while generating text with Ollama: {e}")
+            return None
+        except json.JSONDecodeError as e:
+            self.logger.error(f"Error parsing Ollama response: {e}")
+            return None
+
+    async def agenerate_text(self, prompt: str, chat_history: list = None, max_output_tokens: int = None,
+                                   temperature: float = None):
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model for Ollama was not set")
+            return None
+
+        payload = self.build_chat_payload(prompt=prompt, chat_history=chat_history or [],
+                                          max_output_tokens=max_output_tokens, temperature=temperature)
+
+        try:
+            response = await self.generation_async_client.post("/api/chat", json=payload, timeout=120)
+            response.raise_for_status()
+
+            result = response.json()
+            if "message" in result and "content" in result["message"]:
+                return result["message"]["content"]
+            else:
+                self.logger.error("Unexpected response format from Ollama")
+                return None
+
+        except httpx.HTTPError as e:
+            self.logger.error(f"Error while generating text with Ollama: {e}")
+            return None
+        except json.JSONDecodeError as e:
+            self.logger.error(f"Error parsing Ollama response: {e}")
+            return None
+
+    async def astream_text(self, prompt: str, chat_history: list = None, max_output_tokens: int = None,
+                                 temperature: float = None):
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model for Ollama was not set")
+            return
+
+        payload = self.build_chat_payload(prompt=prompt, chat_history=chat_history or [],
+                                          max_output_tokens=max_output_tokens, temperature=temperature,
+                                          stream=True)
+
+        # ollama streams one JSON object per line until "done"
+        async with self.generation_async_client.stream("POST", "/api/chat", json=payload, timeout=120) as response:
+            response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+
+                result = json.loads(line)
+                content = result.get("message", {}).get("content")
+                if content:
+                    yield content
+
+                if result.get("done"):
+                    break
+
+    def build_chat_payload(self, prompt: str, chat_history: list, max_output_tokens: int = None,
+                                 temperature: float = None, stream: bool = False):
+
         max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
         temperature = temperature if temperature else self.default_generation_temperature
 
-        # Convert chat_history to Ollama format
+        # Convert chat_history to Ollama format, the system prompt stays a system message so
+        # the static prefix is byte-identical across requests and its KV cache is reused
+        roles = { role.value for role in OllamaEnums }
         messages = []
         for chat in chat_history:
             if isinstance(chat, dict):
-                role = "user" if chat.get("role") == "user" else "assistant"
+                role = chat.get("role")
                 messages.append({
-                    "role": role,
+                    "role": role if role in roles else OllamaEnums.ASSISTANT.value,
                     "content": chat.get("text", chat.get("content", ""))
                 })
         
         # Add current prompt
-        messages.append({
-            "role": "user", 
-            "content": self.process_text(prompt)
-        })
+        if prompt is not None:
+            messages.append({
+                "role": OllamaEnums.USER.value,
+                "content": prompt
+            })
 
         payload = {
             "model": self.generation_model_id,
@@ -67,72 +205,135 @@ class OllamaProvider(LLMInterface):
                 "temperature": temperature,
                 "num_predict": max_output_tokens
             },
-            "stream": False
+            "stream": stream
+        }
+
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        return payload
+
+    def build_embed_payload(self, texts: List[str]):
+        payload = {
+            "model": self.embedding_model_id,
+            "input": [ self.process_text(t) for t in texts ],
         }
 
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        return payload
+
+    def parse_embed_response(self, result: dict, texts: List[str]):
+        embeddings = result.get("embeddings")
+        if not embeddings or len(embeddings) != len(texts):
+            self.logger.error("No embedding found in Ollama response")
+            return None
+
+        return embeddings
+
+    def split_batches(self, text: List[str]):
+        return [
+            text[batch_start:batch_start + self.embedding_batch_size]
+            for batch_start in range(0, len(text), self.embedding_batch_size)
+        ]
+    
+    def embed_batch(self, texts: List[str]):
+        response = self.session.post(
+            f"{self.api_url}/api/embed",
+            json=self.build_embed_payload(texts),
+            timeout=60
+        )
+        response.raise_for_status()
+
+        return self.parse_embed_response(response.json(), texts)
+
+    def embed_text(self, text: Union[str, List[str]], document_type: str = None):
+        if not self.embedding_model_id:
+            self.logger.error("Embedding model for Ollama was not set")
+            return None
+        
+        if isinstance(text, str):
+            text = [text]
+
+        batches = self.split_batches(text)
+
         try:
-            response = requests.post(
-                f"{self.api_url}/api/chat",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=120
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            if "message" in result and "content" in result["message"]:
-                return result["message"]["content"]
+            if len(batches) == 1:
+                batches_embeddings = [ self.embed_batch(batches[0]) ]
             else:
-                self.logger.error("Unexpected response format from Ollama")
-                return None
-                
+                # map keeps the batches in input order
+                with ThreadPoolExecutor(max_workers=self.embedding_concurrency) as executor:
+                    batches_embeddings = list(executor.map(self.embed_batch, batches))
         except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error while generating text with Ollama: {e}")
+            self.logger.error(f"Error while embedding text with Ollama: {e}")
             return None
         except json.JSONDecodeError as e:
-            self.logger.error(f"Error parsing Ollama response: {e}")
+            self.logger.error(f"Error parsing Ollama embedding response: {e}")
             return None
-    
-    def embed_text(self, text: Union[str, List[str]], document_type: str = None):
+
+        if any(batch_embeddings is None for batch_embeddings in batches_embeddings):
+            return None
+
+        return [ embedding for batch_embeddings in batches_embeddings for embedding in batch_embeddings ]
+
+    async def aembed_batch(self, texts: List[str], document_type: str = None):
+        response = await self.async_client.post("/api/embed", json=self.build_embed_payload(texts),
+                                                timeout=60)
+        response.raise_for_status()
+
+        embeddings = self.parse_embed_response(response.json(), texts)
+        if embeddings is None:
+            raise ValueError("Unexpected embedding response from Ollama")
+
+        return embeddings
+
+    async def aembed_text(self, text: Union[str, List[str]], document_type: str = None):
         if not self.embedding_model_id:
             self.logger.error("Embedding model for Ollama was not set")
             return None
-        
+
         if isinstance(text, str):
             text = [text]
-        
-        embeddings = []
-        for t in text:
-            payload = {
-                "model": self.embedding_model_id,
-                "prompt": self.process_text(t)
-            }
-            
-            try:
-                response = requests.post(
-                    f"{self.api_url}/api/embeddings",
-                    json=payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=60
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                if "embedding" in result:
-                    embeddings.append(result["embedding"])
-                else:
-                    self.logger.error("No embedding found in Ollama response")
-                    return None
-                    
-            except requests.exceptions.RequestException as e:
-                self.logger.error(f"Error while embedding text with Ollama: {e}")
-                return None
-            except json.JSONDecodeError as e:
-                self.logger.error(f"Error parsing Ollama embedding response: {e}")
-                return None
-        
-        return embeddings
+
+        try:
+            return await self.embedding_batcher.embed([ self.process_text(t) for t in text ],
+                                                      document_type=document_type)
+        except (httpx.HTTPError, ValueError) as e:
+            self.logger.error(f"Error while embedding text with Ollama: {e}")
+            return None
     
+    async def aclose(self):
+        await self.async_client.aclose()
+        await self.generation_async_client.aclose()
+        self.session.close()
+
+    async def awarm_up(self, system_prompt: str = None):
+
+        try:
+            if self.embedding_model_id:
+                await self.aembed_batch([ "warm up" ])
+
+            if self.generation_model_id:
+                # a one token completion over the system prompt alone loads the model and
+                # fills the KV cache of the prefix every RAG request starts with
+                chat_history = []
+                if system_prompt:
+                    chat_history.append(self.construct_prompt(prompt=system_prompt,
+                                                              role=OllamaEnums.SYSTEM.value))
+
+                # without a system prompt the empty message list only loads the model
+                payload = self.build_chat_payload(prompt=None, chat_history=chat_history,
+                                                  max_output_tokens=1)
+                response = await self.generation_async_client.post("/api/chat", json=payload, timeout=300)
+                response.raise_for_status()
+
+        except (httpx.HTTPError, ValueError) as e:
+            self.logger.error(f"Error while warming up Ollama models: {e}")
+            return False
+
+        return True
+
     def construct_prompt(self, prompt: str, role: str):
         return {
             "role": role,
@@ -1,6 +1,7 @@
 from ..LLMInterface import LLMInterface
 from ..LLMEnums import OpenAIEnums
-from openai import OpenAI
+from ..EmbeddingBatcher import EmbeddingBatcher
+from openai import OpenAI, AsyncOpenAI
 import logging
 from typing import List, Union
 
@@ -9,7 +10,10 @@ class OpenAIProvider(LLMInterface):
     def __init__(self, api_key: str, api_url: str=None,
                        default_input_max_characters: int=1000,
                        default_generation_max_output_tokens: int=1000,
-                       default_generation_temperature: float=0.1):
+                       default_generation_temperature: float=0.1,
+                       embedding_batch_max_tokens: int=None,
+                       embedding_concurrency: int=4,
+                       embedding_max_retries: int=5):
         
         self.api_key = api_key
         self.api_url = api_url
@@ -28,6 +32,20 @@ class OpenAIProvider(LLMInterface):
             base_url = self.api_url if self.api_url and len(self.api_url) else None
         )
 
+        self.async_client = AsyncOpenAI(
+            api_key = self.api_key,
+            base_url = self.api_url if self.api_url and len(self.api_url) else None
+        )
+
+        # the embeddings endpoint takes at most 2048 inputs and 300k tokens per request
+        self.embedding_batcher = EmbeddingBatcher(
+            embed_batch=self.aembed_batch,
+            max_batch_texts=2048,
+            max_batch_tokens=embedding_batch_max_tokens or 300000,
+            concurrency=embedding_concurrency,
+            max_retries=embedding_max_retries,
+        )
+
         self.enums = OpenAIEnums
         self.logger = logging.getLogger(__name__)
 
@@ -72,6 +90,72 @@ class OpenAIProvider(LLMInterface):
 
         return response.choices[0].message.content
 
+    async def agenerate_text(self, prompt: str, chat_history: list=None, max_output_tokens: int=None,
+                                   temperature: float = None):
+
+        if not self.async_client:
+            self.logger.error("OpenAI client was not set")
+            return None
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model for OpenAI was not set")
+            return None
+
+        max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
+        temperature = temperature if temperature else self.default_generation_temperature
+
+        if chat_history is None:
+            chat_history = []
+
+        chat_history.append(
+            self.construct_prompt(prompt=prompt, role=OpenAIEnums.USER.value)
+        )
+
+        response = await self.async_client.chat.completions.create(
+            model = self.generation_model_id,
+            messages = chat_history,
+            max_tokens = max_output_tokens,
+            temperature = temperature
+        )
+
+        if not response or not response.choices or len(response.choices) == 0 or not response.choices[0].message:
+            self.logger.error("Error while generating text with OpenAI")
+            return None
+
+        return response.choices[0].message.content
+
+    async def astream_text(self, prompt: str, chat_history: list=None, max_output_tokens: int=None,
+                                 temperature: float = None):
+
+        if not self.async_client:
+            self.logger.error("OpenAI client was not set")
+            return
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model for OpenAI was not set")
+            return
+
+        max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
+        temperature = temperature if temperature else self.default_generation_temperature
+
+        if chat_history is None:
+            chat_history = []
+
+        chat_history.append(
+            self.construct_prompt(prompt=prompt, role=OpenAIEnums.USER.value)
+        )
+
+        stream = await self.async_client.chat.completions.create(
+            model = self.generation_model_id,
+            messages = chat_history,
+            max_tokens = max_output_tokens,
+            temperature = temperature,
+            stream = True
+        )
+
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
 
     def embed_text(self, text: Union[str, List[str]], document_type: str = None):
         
@@ -97,6 +181,45 @@ class OpenAIProvider(LLMInterface):
 
         return [ rec.embedding for rec in response.data ]
 
+    async def aembed_batch(self, texts: List[str], document_type: str = None):
+        response = await self.async_client.embeddings.create(
+            model = self.embedding_model_id,
+            input = texts,
+        )
+
+        if not response or not response.data or len(response.data) != len(texts):
+            raise ValueError("Unexpected embedding response from OpenAI")
+
+        return [ rec.embedding for rec in response.data ]
+
+    async def aembed_text(self, text: Union[str, List[str]], document_type: str = None):
+
+        if not self.async_client:
+            self.logger.error("OpenAI client was not set")
+            return None
+
+        if isinstance(text, str):
+            text = [text]
+
+        if not self.embedding_model_id:
+            self.logger.error("Embedding model for OpenAI was not set")
+            return None
+
+        try:
+            return await self.embedding_batcher.embed([ self.process_text(t) for t in text ],
+                                                      document_type=document_type)
+        except Exception as e:
+            self.logger.error(f"Error while embedding text with OpenAI: {e}")
+            return None
+
+    async def aclose(self):
+        await self.async_client.close()
+        self.client.close()
+
+    async def awarm_up(self, system_prompt: str = None):
+        # hosted models are always loaded, the shared system prefix is cached by the API on its own
+        return True
+
     def construct_prompt(self, prompt: str, role: str):
         return {
             "role": role,
@@ -1,5 +1,6 @@
 from .OpenAIProvider import OpenAIProvider
 from .CoHereProvider import CoHereProvider
 from .OllamaProvider import OllamaProvider
+from .LocalProvider import LocalProvider
 
-__all__ = ['OpenAIProvider', 'CoHereProvider', 'OllamaProvider']
\ No newline at end of file
+__all__ = ['OpenAIProvider', 'CoHereProvider', 'OllamaProvider', 'LocalProvider']
\ No newline at end of file
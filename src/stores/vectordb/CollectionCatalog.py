@@ -0,0 +1,61 @@
+from dataclasses import dataclass, field
+import time
+
+@dataclass
+class CollectionStats:
+    existed: bool
+    embedding_size: int = None
+    record_count: int = 0
+    info: dict = None
+    loaded_at: float = field(default_factory=time.monotonic)
+
+class CollectionCatalog:
+    """
+    In-process cache of collection existence, dimension and approximate row counts,
+    so the hot paths (insert/search) do not have to probe the database catalog on every call.
+    Entries expire after `ttl_seconds` because other workers may drop or create collections.
+    Missing collections are never cached: another worker may create them at any moment,
+    and a stale "does not exist" answer would make inserts skip or recreate the table.
+    """
+
+    def __init__(self, ttl_seconds: int = 60):
+        self.ttl_seconds = ttl_seconds
+        self.collections = {}
+
+    def get(self, collection_name: str) -> CollectionStats:
+        stats = self.collections.get(collection_name)
+        if stats is None:
+            return None
+
+        if self.ttl_seconds and time.monotonic() - stats.loaded_at > self.ttl_seconds:
+            self.collections.pop(collection_name, None)
+            return None
+
+        return stats
+
+    def set(self, collection_name: str, existed: bool, embedding_size: int = None,
+                  record_count: int = 0, info: dict = None) -> CollectionStats:
+        stats = CollectionStats(
+            existed=existed,
+            embedding_size=embedding_size,
+            record_count=max(record_count or 0, 0),
+            info=info,
+        )
+        if not existed:
+            self.collections.pop(collection_name, None)
+            return stats
+
+        self.collections[collection_name] = stats
+        return stats
+
+    def add_records(self, collection_name: str, count: int):
+        stats = self.collections.get(collection_name)
+        if stats is not None:
+            stats.record_count += count
+
+    def invalidate(self, collection_name: str = None):
+        if collection_name is None:
+            self.collections = {}
+            return
+
+        self.collections.pop(collection_name, None)
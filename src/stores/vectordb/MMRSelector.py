@@ -0,0 +1,54 @@
+from typing import List
+from models.db_schemes import RetrievedDocument
+import numpy as np
+
+class MMRSelector:
+    """
+    Picks a diverse top-k out of a wider candidate set with maximal marginal relevance.
+    Overlapping chunks of the same passage score almost the same against the query,
+    so candidates too similar to an already selected one are dropped outright.
+    """
+
+    def __init__(self, lambda_mult: float = 0.7, duplicate_threshold: float = 0.95):
+        self.lambda_mult = lambda_mult
+        self.duplicate_threshold = duplicate_threshold
+
+    def normalize(self, matrix: np.ndarray):
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def select(self, query_vector: list, documents: List[RetrievedDocument], vectors: dict,
+                     limit: int, lambda_mult: float = None) -> List[RetrievedDocument]:
+
+        if lambda_mult is None:
+            lambda_mult = self.lambda_mult
+
+        # candidates whose vector could not be loaded can not be compared, keep the others
+        documents = [ doc for doc in documents if doc.chunk_id in vectors ]
+        if len(documents) <= 1:
+            return documents[:limit]
+
+        candidates = self.normalize(np.asarray([ vectors[doc.chunk_id] for doc in documents ],
+                                               dtype=np.float32))
+        query = self.normalize(np.asarray(query_vector, dtype=np.float32))
+
+        relevance = candidates @ query
+        similarity = candidates @ candidates.T
+
+        selected = []
+        # highest similarity of every candidate to the already selected ones
+        max_similarity = np.zeros(len(documents), dtype=np.float32)
+        available = np.ones(len(documents), dtype=bool)
+
+        while len(selected) < limit and available.any():
+            mmr_scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+            mmr_scores[~available] = -np.inf
+
+            best = int(np.argmax(mmr_scores))
+            selected.append(best)
+
+            max_similarity = np.maximum(max_similarity, similarity[best])
+            available[best] = False
+            available &= max_similarity < self.duplicate_threshold
+
+        return [ documents[idx] for idx in selected ]
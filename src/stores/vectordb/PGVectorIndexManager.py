@@ -0,0 +1,169 @@
+from .VectorDBEnums import PgVectorTableSchemeEnums, PgVectorIndexTypeEnums, PgVectorStorageTypeEnums
+from sqlalchemy.sql import text as sql_text
+import logging
+import math
+import time
+
+class PGVectorIndexManager:
+    """
+    Builds the vector index of a pgvector collection once, after the data is loaded.
+    The index type and its parameters are picked from the number of rows, and the build
+    runs with CREATE INDEX CONCURRENTLY so searches are not blocked while it runs.
+    """
+
+    def __init__(self, db_client, distance_method: str,
+                       ivfflat_threshold: int = 1000000,
+                       maintenance_work_mem: str = "512MB",
+                       storage_type: str = PgVectorStorageTypeEnums.VECTOR.value):
+
+        self.db_client = db_client
+        self.distance_method = distance_method
+        self.storage_type = storage_type
+        self.ivfflat_threshold = ivfflat_threshold
+        self.maintenance_work_mem = maintenance_work_mem
+
+        self.logger = logging.getLogger("uvicorn")
+
+    def default_index_name(self, collection_name: str):
+        return f"{collection_name}_vector_idx"
+
+    def metadata_index_name(self, collection_name: str):
+        return f"{collection_name}_metadata_idx"
+
+    def choose_index(self, records_count: int, index_type: str = None):
+
+        if not index_type:
+            index_type = PgVectorIndexTypeEnums.HNSW.value
+            if records_count >= self.ivfflat_threshold:
+                index_type = PgVectorIndexTypeEnums.IVFFLAT.value
+
+        if index_type == PgVectorIndexTypeEnums.IVFFLAT.value:
+            # pgvector guidance: rows / 1000 lists up to 1M rows, sqrt(rows) above
+            if records_count <= 1000000:
+                lists = max(records_count // 1000, 10)
+            else:
+                lists = int(math.sqrt(records_count))
+
+            return index_type, {"lists": lists}
+
+        # larger graphs need more neighbours to keep recall at the default ef_search
+        if records_count < 10000:
+            return index_type, {"m": 16, "ef_construction": 64}
+
+        if records_count < 100000:
+            return index_type, {"m": 16, "ef_construction": 128}
+
+        return index_type, {"m": 24, "ef_construction": 200}
+
+    def index_opclass(self):
+
+        if self.storage_type == PgVectorStorageTypeEnums.HALFVEC.value:
+            return self.distance_method.replace("vector_", "halfvec_", 1)
+
+        if self.storage_type == PgVectorStorageTypeEnums.BINARY.value:
+            return "bit_hamming_ops"
+
+        return self.distance_method
+
+    def index_expression(self, embedding_size: int):
+        vector_column = PgVectorTableSchemeEnums.VECTOR.value
+
+        if self.storage_type == PgVectorStorageTypeEnums.BINARY.value:
+            return f'(binary_quantize({vector_column})::bit({int(embedding_size)})) {self.index_opclass()}'
+
+        return f'{vector_column} {self.index_opclass()}'
+
+    def build_index_sql(self, collection_name: str, index_type: str, params: dict,
+                              embedding_size: int = None):
+        index_name = self.default_index_name(collection_name)
+        with_params = ", ".join([ f"{key} = {int(value)}" for key, value in params.items() ])
+
+        return sql_text(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {collection_name} '
+            f'USING {index_type} ({self.index_expression(embedding_size=embedding_size)}) '
+            f'WITH ({with_params})'
+        )
+
+    async def is_index_existed(self, collection_name: str) -> bool:
+        index_name = self.default_index_name(collection_name)
+        async with self.db_client() as session:
+            async with session.begin():
+                # an interrupted concurrent build leaves an INVALID index behind
+                check_sql = sql_text("""
+                                    SELECT i.indisvalid
+                                    FROM pg_indexes p
+                                    JOIN pg_class c ON c.relname = p.indexname
+                                    JOIN pg_index i ON i.indexrelid = c.oid
+                                    WHERE p.tablename = :collection_name
+                                    AND p.indexname = :index_name
+                                    """)
+                results = await session.execute(check_sql, {"index_name": index_name, "collection_name": collection_name})
+                is_valid = results.scalar_one_or_none()
+
+        if is_valid is False:
+            await self.drop_index(collection_name=collection_name)
+            return False
+
+        return bool(is_valid)
+
+    async def drop_index(self, collection_name: str):
+        index_name = self.default_index_name(collection_name)
+        async with self.db_client() as session:
+            connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+            await connection.execute(sql_text(f'DROP INDEX CONCURRENTLY IF EXISTS {index_name}'))
+
+        return True
+
+    async def build_metadata_index(self, collection_name: str):
+        index_name = self.metadata_index_name(collection_name)
+        async with self.db_client() as session:
+            connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+            # jsonb_path_ops serves the @> containment filters of search_by_vector
+            await connection.execute(sql_text(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {collection_name} '
+                f'USING gin ({PgVectorTableSchemeEnums.METADATA.value} jsonb_path_ops)'
+            ))
+
+        return True
+
+    async def build_index(self, collection_name: str, records_count: int, index_type: str = None,
+                                embedding_size: int = None):
+
+        index_type, params = self.choose_index(records_count=records_count, index_type=index_type)
+
+        self.logger.info(f"START: Creating {index_type} vector index for collection: {collection_name} "
+                         f"({records_count} records, params: {params})")
+
+        start_time = time.perf_counter()
+
+        async with self.db_client() as session:
+            # CREATE INDEX CONCURRENTLY can not run inside a transaction block
+            connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+            try:
+                await connection.execute(sql_text(f"SET maintenance_work_mem = '{self.maintenance_work_mem}'"))
+                await connection.execute(self.build_index_sql(collection_name=collection_name,
+                                                              index_type=index_type, params=params,
+                                                              embedding_size=embedding_size))
+            except Exception as e:
+                self.logger.error(f"Error while creating vector index for collection: {collection_name}: {e}")
+                await connection.execute(sql_text(
+                    f'DROP INDEX CONCURRENTLY IF EXISTS {self.default_index_name(collection_name)}'
+                ))
+                return None
+            finally:
+                # the connection goes back to the pool, do not leak the setting
+                await connection.execute(sql_text('RESET maintenance_work_mem'))
+
+        build_duration = time.perf_counter() - start_time
+
+        self.logger.info(f"END: Created vector index for collection: {collection_name} "
+                         f"in {build_duration:.2f}s")
+
+        return {
+            "index_name": self.default_index_name(collection_name),
+            "index_type": index_type,
+            "storage_type": self.storage_type,
+            "params": params,
+            "records_count": records_count,
+            "build_duration": round(build_duration, 3),
+        }
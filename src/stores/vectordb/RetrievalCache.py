@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from utils.metrics import RETRIEVAL_CACHE_HITS, RETRIEVAL_CACHE_MISSES
+import json
+import time
+
+class RetrievalCache:
+    """
+    LRU cache of search results with a per-entry TTL.
+    The project index version is part of the key, so a re-index makes the old entries
+    unreachable in every worker; they simply age out of the LRU.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: int = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+
+    def normalize_text(self, text: str):
+        return " ".join(text.casefold().split())
+
+    def build_key(self, project_id: int, index_version: int, text: str, limit: int, **search_params):
+        return (
+            project_id,
+            index_version,
+            self.normalize_text(text),
+            limit,
+            json.dumps(search_params, sort_keys=True, default=str),
+        )
+
+    def get(self, key: tuple):
+        entry = self.entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if not self.ttl_seconds or time.monotonic() - stored_at <= self.ttl_seconds:
+                self.entries.move_to_end(key)
+                RETRIEVAL_CACHE_HITS.inc()
+                return value
+
+            self.entries.pop(key, None)
+
+        RETRIEVAL_CACHE_MISSES.inc()
+        return None
+
+    def set(self, key: tuple, value):
+        if self.max_size <= 0:
+            return
+
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
@@ -3,6 +3,7 @@ from enum import Enum
 class VectorDBEnums(Enum):
     QDRANT = "QDRANT"
     PGVECTOR = "PGVECTOR"
+    NUMPY = "NUMPY"
 
 class DistanceMethodEnums(Enum):
     COSINE = "cosine"
@@ -14,12 +15,52 @@ class PgVectorTableSchemeEnums(Enum):
     VECTOR = 'vector'
     CHUNK_ID = 'chunk_id'
     METADATA = 'metadata'
+    TEXT_SEARCH = 'text_search'
+    PROJECT_ID = 'project_id'
     _PREFIX = 'pgvector'
 
 class PgVectorDistanceMethodEnums(Enum):
     COSINE = "vector_cosine_ops"
     DOT = "vector_l2_ops"
+    INNER_PRODUCT = "vector_ip_ops"
+
+class PgVectorDistanceOperatorEnums(Enum):
+    COSINE = "<=>"
+    DOT = "<->"
+    INNER_PRODUCT = "<#>"
 
 class PgVectorIndexTypeEnums(Enum):
     HNSW = "hnsw"
     IVFFLAT = "ivfflat"
+
+class PgVectorSearchModeEnums(Enum):
+    INDEXED = "indexed"
+    SCORED = "scored"
+
+class PgVectorInsertModeEnums(Enum):
+    INSERT = "insert"
+    COPY = "copy"
+
+class PgVectorStorageTypeEnums(Enum):
+    VECTOR = "vector"
+    HALFVEC = "halfvec"
+    BINARY = "binary"
+
+class PgVectorIterativeScanEnums(Enum):
+    OFF = "off"
+    STRICT_ORDER = "strict_order"
+    RELAXED_ORDER = "relaxed_order"
+
+class MetadataIndexedFieldEnums(Enum):
+    SOURCE_FILE = "source_file"
+    CONTENT_TYPE = "content_type"
+    PAGE_NUMBER = "page_number"
+
+class PgVectorLayoutEnums(Enum):
+    TABLE = "table"
+    PARTITIONED = "partitioned"
+
+class NumpyFileEnums(Enum):
+    INFO = "info.json"
+    VECTORS = "vectors.f32"
+    RECORDS = "records.jsonl"
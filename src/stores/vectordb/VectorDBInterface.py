@@ -47,6 +47,32 @@ class VectorDBInterface(ABC):
         pass
 
     @abstractmethod
-    def search_by_vector(self, collection_name: str, vector: list, limit: int) -> List[RetrievedDocument]:
+    def create_vector_index(self, collection_name: str, index_type: str = None):
+        pass
+
+    @abstractmethod
+    def maintain_collections(self, prewarm: bool = True):
+        pass
+
+    @abstractmethod
+    def search_by_vector(self, collection_name: str, vector: list, limit: int,
+                               ef_search: int = None, probes: int = None,
+                               metadata_filter: dict = None) -> List[RetrievedDocument]:
+        pass
+
+    @abstractmethod
+    def search_many(self, collection_name: str, vectors: list, limit: int,
+                          ef_search: int = None, probes: int = None,
+                          metadata_filter: dict = None) -> List[List[RetrievedDocument]]:
+        pass
+
+    @abstractmethod
+    def get_vectors(self, collection_name: str, chunk_ids: list) -> dict:
+        pass
+
+    @abstractmethod
+    def search_hybrid(self, collection_name: str, text: str, vector: list, limit: int,
+                            ef_search: int = None, probes: int = None,
+                            metadata_filter: dict = None) -> List[RetrievedDocument]:
         pass
     
\ No newline at end of file
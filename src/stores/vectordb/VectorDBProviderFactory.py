@@ -1,4 +1,4 @@
-from .providers import QdrantDBProvider, PGVectorProvider
+from .providers import QdrantDBProvider, PGVectorProvider, NumpyDBProvider
 from .VectorDBEnums import VectorDBEnums
 from controllers.BaseController import BaseController
 from sqlalchemy.orm import sessionmaker
@@ -11,13 +11,25 @@ class VectorDBProviderFactory:
 
     def create(self, provider: str):
         if provider == VectorDBEnums.QDRANT.value:
-            qdrant_db_client = self.base_controller.get_database_path(db_name=self.config.VECTOR_DB_PATH)
+            qdrant_db_client = None
+            if not self.config.VECTOR_DB_QDRANT_URL:
+                qdrant_db_client = self.base_controller.get_database_path(db_name=self.config.VECTOR_DB_PATH)
 
             return QdrantDBProvider(
                 db_client=qdrant_db_client,
+                url=self.config.VECTOR_DB_QDRANT_URL,
+                api_key=self.config.VECTOR_DB_QDRANT_API_KEY,
+                prefer_grpc=self.config.VECTOR_DB_QDRANT_PREFER_GRPC,
+                upload_parallel=self.config.VECTOR_DB_QDRANT_UPLOAD_PARALLEL,
+                hnsw_m=self.config.VECTOR_DB_QDRANT_HNSW_M,
+                hnsw_ef_construct=self.config.VECTOR_DB_QDRANT_HNSW_EF_CONSTRUCT,
+                scalar_quantization=self.config.VECTOR_DB_QDRANT_SCALAR_QUANTIZATION,
+                on_disk=self.config.VECTOR_DB_QDRANT_ON_DISK,
+                oversampling=self.config.VECTOR_DB_QDRANT_OVERSAMPLING,
                 distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
                 default_vector_size=self.config.EMBEDDING_MODEL_SIZE,
                 index_threshold=self.config.VECTOR_DB_PGVEC_INDEX_THRESHOLD,
+                catalog_ttl=self.config.VECTOR_DB_CATALOG_TTL,
             )
         
         if provider == VectorDBEnums.PGVECTOR.value:
@@ -26,6 +38,26 @@ class VectorDBProviderFactory:
                 distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
                 default_vector_size=self.config.EMBEDDING_MODEL_SIZE,
                 index_threshold=self.config.VECTOR_DB_PGVEC_INDEX_THRESHOLD,
+                search_mode=self.config.VECTOR_DB_PGVEC_SEARCH_MODE,
+                insert_mode=self.config.VECTOR_DB_PGVEC_INSERT_MODE,
+                ivfflat_threshold=self.config.VECTOR_DB_PGVEC_IVFFLAT_THRESHOLD,
+                maintenance_work_mem=self.config.VECTOR_DB_PGVEC_MAINTENANCE_WORK_MEM,
+                storage_type=self.config.VECTOR_DB_PGVEC_STORAGE_TYPE,
+                rerank_factor=self.config.VECTOR_DB_PGVEC_RERANK_FACTOR,
+                iterative_scan=self.config.VECTOR_DB_PGVEC_ITERATIVE_SCAN,
+                text_search_config=self.config.VECTOR_DB_PGVEC_TEXT_SEARCH_CONFIG,
+                rrf_k=self.config.VECTOR_DB_HYBRID_RRF_K,
+                layout=self.config.VECTOR_DB_PGVEC_LAYOUT,
+                normalized_vectors=self.config.EMBEDDING_NORMALIZE or bool(self.config.EMBEDDING_TRUNCATE_DIM),
+                catalog_ttl=self.config.VECTOR_DB_CATALOG_TTL,
+            )
+        
+        if provider == VectorDBEnums.NUMPY.value:
+            return NumpyDBProvider(
+                db_client=self.base_controller.get_database_path(db_name=self.config.VECTOR_DB_NUMPY_PATH),
+                distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
+                default_vector_size=self.config.EMBEDDING_MODEL_SIZE,
+                catalog_ttl=self.config.VECTOR_DB_CATALOG_TTL,
             )
         
         return None
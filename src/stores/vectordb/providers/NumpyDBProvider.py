@@ -0,0 +1,401 @@
+from ..VectorDBInterface import VectorDBInterface
+from ..CollectionCatalog import CollectionCatalog, CollectionStats
+from ..VectorDBEnums import DistanceMethodEnums, NumpyFileEnums
+import logging
+import asyncio
+import threading
+import fcntl
+import shutil
+import json
+import os
+from typing import List
+from models.db_schemes import RetrievedDocument
+import numpy as np
+
+class NumpyDBProvider(VectorDBInterface):
+    """
+    Exact search over memory-mapped float32 matrices, one directory per collection.
+    The vectors live in a flat row-major file that every uvicorn worker maps read-only,
+    so the page cache holds a single copy; texts and metadata are kept in a JSON lines side file.
+    """
+
+    def __init__(self, db_client: str, default_vector_size: int = 786,
+                                     distance_method: str = None, index_threshold: int=100,
+                                     catalog_ttl: int = 60):
+
+        self.db_client = db_client
+        self.default_vector_size = default_vector_size
+        self.distance_method = distance_method
+        self.catalog = CollectionCatalog(ttl_seconds=catalog_ttl)
+
+        # per collection mapped matrix and parsed side file, refreshed when the files grow.
+        # searches load them from worker threads, the lock keeps two loads from parsing the same tail
+        self.collections = {}
+        self.collections_lock = threading.Lock()
+
+        self.logger = logging.getLogger('uvicorn')
+
+    async def connect(self):
+        os.makedirs(self.db_client, exist_ok=True)
+
+    async def disconnect(self):
+        self.collections = {}
+        self.catalog.invalidate()
+
+    def collection_path(self, collection_name: str, file_name: str = None):
+        if file_name is None:
+            return os.path.join(self.db_client, collection_name)
+
+        return os.path.join(self.db_client, collection_name, file_name)
+
+    async def load_collection_stats(self, collection_name: str) -> CollectionStats:
+
+        stats = self.catalog.get(collection_name)
+        if stats is not None:
+            return stats
+
+        info_path = self.collection_path(collection_name, NumpyFileEnums.INFO.value)
+        if not os.path.exists(info_path):
+            return self.catalog.set(collection_name, existed=False)
+
+        with open(info_path, "r") as f:
+            info = json.load(f)
+
+        vectors_path = self.collection_path(collection_name, NumpyFileEnums.VECTORS.value)
+        row_size = info["embedding_size"] * np.dtype(np.float32).itemsize
+
+        return self.catalog.set(
+            collection_name,
+            existed=True,
+            embedding_size=info["embedding_size"],
+            record_count=os.path.getsize(vectors_path) // row_size,
+            info=info,
+        )
+
+    async def is_collection_existed(self, collection_name: str) -> bool:
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        return stats.existed
+
+    async def list_all_collections(self) -> List:
+        if not os.path.isdir(self.db_client):
+            return []
+
+        return [
+            collection_name for collection_name in os.listdir(self.db_client)
+            if os.path.exists(self.collection_path(collection_name, NumpyFileEnums.INFO.value))
+        ]
+
+    async def get_collection_info(self, collection_name: str) -> dict:
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        if not stats.existed:
+            return None
+
+        return {
+            "collection_info": stats.info,
+            "embedding_size": stats.embedding_size,
+            "record_count": stats.record_count,
+        }
+
+    async def delete_collection(self, collection_name: str):
+        if await self.is_collection_existed(collection_name):
+            self.logger.info(f"Deleting collection: {collection_name}")
+            shutil.rmtree(self.collection_path(collection_name), ignore_errors=True)
+            self.collections.pop(collection_name, None)
+            self.catalog.set(collection_name, existed=False)
+            return True
+
+        return False
+
+    async def create_collection(self, collection_name: str,
+                                embedding_size: int,
+                                do_reset: bool = False):
+        if do_reset:
+            _ = await self.delete_collection(collection_name=collection_name)
+
+        if not await self.is_collection_existed(collection_name):
+            self.logger.info(f"Creating new Numpy collection: {collection_name}")
+
+            os.makedirs(self.collection_path(collection_name), exist_ok=True)
+            for file_enum in (NumpyFileEnums.VECTORS, NumpyFileEnums.RECORDS):
+                open(self.collection_path(collection_name, file_enum.value), "ab").close()
+
+            # the info file is written last, its presence marks a complete collection
+            with open(self.collection_path(collection_name, NumpyFileEnums.INFO.value), "w") as f:
+                json.dump({
+                    "embedding_size": embedding_size,
+                    "distance_method": self.distance_method,
+                }, f)
+
+            self.catalog.invalidate(collection_name)
+
+            return True
+
+        return False
+
+    async def create_vector_index(self, collection_name: str, index_type: str = None):
+        # exact search, there is no index to build
+        return None
+
+    async def maintain_collections(self, prewarm: bool = True):
+        return None
+
+    def prepare_vectors(self, vectors: list):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+
+        # cosine is stored as unit vectors so a search is a plain dot product
+        if self.distance_method == DistanceMethodEnums.COSINE.value:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1, norms)
+
+        return np.ascontiguousarray(matrix, dtype=np.float32)
+
+    async def insert_one(self, collection_name: str, text: str, vector: list,
+                         metadata: dict = None,
+                         record_id: str = None):
+
+        return await self.insert_many(collection_name=collection_name, texts=[text],
+                                      vectors=[vector], metadata=[metadata],
+                                      record_ids=[record_id])
+
+    async def insert_many(self, collection_name: str, texts: list,
+                          vectors: list, metadata: list = None,
+                          record_ids: list = None, batch_size: int = 50):
+
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        if not stats.existed:
+            self.logger.error(f"Can not insert new record to non-existed collection: {collection_name}")
+            return False
+
+        if metadata is None:
+            metadata = [None] * len(texts)
+
+        if record_ids is None:
+            record_ids = [None] * len(texts)
+
+        matrix = self.prepare_vectors(vectors)
+        if matrix.shape[1] != stats.embedding_size:
+            self.logger.error(f"Vector size {matrix.shape[1]} does not match collection: {collection_name}")
+            return False
+
+        records = "".join([
+            json.dumps({"text": text, "chunk_id": record_id, "metadata": _metadata}) + "\n"
+            for text, _metadata, record_id in zip(texts, metadata, record_ids)
+        ])
+
+        try:
+            await asyncio.to_thread(self.append_records, collection_name, records, matrix)
+        except Exception as e:
+            self.logger.error(f"Error while inserting batch: {e}")
+            return False
+
+        self.catalog.add_records(collection_name, len(texts))
+
+        return True
+
+    def append_records(self, collection_name: str, records: str, matrix: np.ndarray):
+
+        # other workers may append to the same collection, serialize the writers on the info file.
+        # readers only serve rows that have a complete record line, so the vectors are written
+        # first and the side file append is what makes the new rows visible
+        vectors_path = self.collection_path(collection_name, NumpyFileEnums.VECTORS.value)
+        records_path = self.collection_path(collection_name, NumpyFileEnums.RECORDS.value)
+
+        with open(self.collection_path(collection_name, NumpyFileEnums.INFO.value), "r") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                vectors_size = os.path.getsize(vectors_path)
+                records_size = os.path.getsize(records_path)
+                try:
+                    with open(vectors_path, "ab") as f:
+                        matrix.tofile(f)
+
+                    with open(records_path, "ab") as f:
+                        f.write(records.encode("utf-8"))
+                except BaseException:
+                    # a partial write would shift every later row, cut both files back
+                    os.truncate(vectors_path, vectors_size)
+                    os.truncate(records_path, records_size)
+                    raise
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_generation(self, collection_name: str):
+        # the info file is written once per collection, so its inode and mtime change only when
+        # the collection is deleted and created again, possibly by another worker
+        info_stat = os.stat(self.collection_path(collection_name, NumpyFileEnums.INFO.value))
+        vectors_stat = os.stat(self.collection_path(collection_name, NumpyFileEnums.VECTORS.value))
+
+        return (info_stat.st_ino, info_stat.st_mtime_ns, vectors_stat.st_ino), vectors_stat.st_size
+
+    def load_collection(self, collection_name: str, embedding_size: int):
+        with self.collections_lock:
+            return self.refresh_collection(collection_name=collection_name, embedding_size=embedding_size)
+
+    def refresh_collection(self, collection_name: str, embedding_size: int):
+
+        vectors_path = self.collection_path(collection_name, NumpyFileEnums.VECTORS.value)
+
+        try:
+            generation, vectors_size = self.get_generation(collection_name=collection_name)
+        except FileNotFoundError:
+            # deleted under us, nothing to serve until it is created again
+            self.collections.pop(collection_name, None)
+            self.catalog.invalidate(collection_name)
+            return {"records": [], "vectors": np.empty((0, embedding_size), dtype=np.float32), "rows_count": 0}
+
+        rows_count = vectors_size // (embedding_size * np.dtype(np.float32).itemsize)
+
+        collection = self.collections.get(collection_name)
+        if collection is not None and collection["generation"] != generation:
+            # a recreated collection, the cached records and the memmap of the old file are stale
+            collection = None
+
+        if collection is not None and collection["rows_count"] == rows_count:
+            return collection
+
+        if collection is None:
+            collection = {"records": [], "records_offset": 0, "generation": generation}
+
+        # only the appended tail of the side file is parsed, complete lines only. the shared lock
+        # keeps the read out of an append that may still be rolled back
+        with open(self.collection_path(collection_name, NumpyFileEnums.INFO.value), "r") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            try:
+                with open(self.collection_path(collection_name, NumpyFileEnums.RECORDS.value), "rb") as f:
+                    f.seek(collection["records_offset"])
+                    tail = f.read()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        complete_tail = tail[:tail.rfind(b"\n") + 1]
+        collection["records"].extend([
+            json.loads(line) for line in complete_tail.decode("utf-8").splitlines() if line
+        ])
+        collection["records_offset"] += len(complete_tail)
+
+        rows_count = min(rows_count, len(collection["records"]))
+
+        vectors = np.empty((0, embedding_size), dtype=np.float32)
+        if rows_count > 0:
+            vectors = np.memmap(vectors_path, dtype=np.float32, mode="r",
+                                shape=(rows_count, embedding_size))
+
+        collection["vectors"] = vectors
+        collection["rows_count"] = rows_count
+        self.collections[collection_name] = collection
+
+        return collection
+
+    def build_filter_mask(self, records: list, metadata_filter: dict = None):
+
+        if not metadata_filter:
+            return None
+
+        def is_matched(record_metadata: dict):
+            record_metadata = record_metadata or {}
+            for key, value in metadata_filter.items():
+                if isinstance(value, list):
+                    if record_metadata.get(key) not in value:
+                        return False
+                elif record_metadata.get(key) != value:
+                    return False
+            return True
+
+        return np.fromiter((is_matched(record.get("metadata")) for record in records),
+                           dtype=bool, count=len(records))
+
+    def top_k(self, scores: np.ndarray, limit: int):
+        # argpartition finds the k best rows in linear time, only those get sorted
+        if limit < scores.shape[-1]:
+            candidates = np.argpartition(-scores, limit - 1, axis=-1)[..., :limit]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[-1]), scores.shape)
+
+        candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+        order = np.argsort(-candidate_scores, axis=-1)
+
+        return np.take_along_axis(candidates, order, axis=-1)
+
+    def exact_search(self, collection_name: str, embedding_size: int, vectors: list,
+                           limit: int, metadata_filter: dict = None):
+
+        collection = self.load_collection(collection_name=collection_name, embedding_size=embedding_size)
+        rows_count = collection["rows_count"]
+        records = collection["records"][:rows_count]
+
+        if rows_count == 0:
+            return [ [] for _ in vectors ]
+
+        queries = self.prepare_vectors(vectors)
+        scores = queries @ collection["vectors"].T
+
+        mask = self.build_filter_mask(records=records, metadata_filter=metadata_filter)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+
+        results = []
+        for query_scores, rows in zip(scores, self.top_k(scores, limit=limit)):
+            results.append([
+                RetrievedDocument(
+                    text=records[row]["text"],
+                    score=float(query_scores[row]),
+                    chunk_id=records[row]["chunk_id"],
+                    metadata=records[row]["metadata"] or {},
+                )
+                for row in rows
+                if np.isfinite(query_scores[row])
+            ])
+
+        return results
+
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int = 5,
+                                     ef_search: int = None, probes: int = None,
+                                     metadata_filter: dict = None):
+
+        results = await self.search_many(collection_name=collection_name, vectors=[vector], limit=limit,
+                                         metadata_filter=metadata_filter)
+
+        if not results or len(results[0]) == 0:
+            return None
+
+        return results[0]
+
+    async def search_many(self, collection_name: str, vectors: list, limit: int = 5,
+                                ef_search: int = None, probes: int = None,
+                                metadata_filter: dict = None):
+
+        # ef_search and probes are approximate index knobs, exact search ignores them
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        if not stats.existed:
+            self.logger.error(f"Can not search for records in a non-existed collection: {collection_name}")
+            return False
+
+        # parsing the side file and the matrix product both block, keep them off the event loop
+        return await asyncio.to_thread(self.exact_search, collection_name=collection_name,
+                                       embedding_size=stats.embedding_size, vectors=vectors,
+                                       limit=limit, metadata_filter=metadata_filter)
+
+    async def get_vectors(self, collection_name: str, chunk_ids: list) -> dict:
+
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        if not stats.existed or not chunk_ids:
+            return {}
+
+        collection = self.load_collection(collection_name=collection_name, embedding_size=stats.embedding_size)
+
+        chunk_ids = set(chunk_ids)
+        return {
+            record["chunk_id"]: collection["vectors"][row].tolist()
+            for row, record in enumerate(collection["records"][:collection["rows_count"]])
+            if record["chunk_id"] in chunk_ids
+        }
+
+    async def search_hybrid(self, collection_name: str, text: str, vector: list, limit: int = 5,
+                                  ef_search: int = None, probes: int = None,
+                                  metadata_filter: dict = None):
+        # the numpy collections carry no lexical index, so hybrid search is vector only
+        return await self.search_by_vector(collection_name=collection_name, vector=vector, limit=limit,
+                                           ef_search=ef_search, probes=probes,
+                                           metadata_filter=metadata_filter)
@@ -1,65 +1,225 @@
 from ..VectorDBInterface import VectorDBInterface
+from ..CollectionCatalog import CollectionCatalog, CollectionStats
+from ..PGVectorIndexManager import PGVectorIndexManager
 from ..VectorDBEnums import (DistanceMethodEnums, PgVectorTableSchemeEnums, 
-                             PgVectorDistanceMethodEnums, PgVectorIndexTypeEnums)
+                             PgVectorDistanceMethodEnums, PgVectorIndexTypeEnums,
+                             PgVectorDistanceOperatorEnums, PgVectorSearchModeEnums,
+                             PgVectorInsertModeEnums, PgVectorStorageTypeEnums,
+                             PgVectorIterativeScanEnums, PgVectorLayoutEnums)
 import logging
 from typing import List
 from models.db_schemes import RetrievedDocument
 from sqlalchemy.sql import text as sql_text
+from sqlalchemy import event
+import numpy as np
+import asyncio
+import struct
+import time
 import json
+import io
+import re
+
+# PGCOPY binary signature, flags field and header extension length
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
 
 class PGVectorProvider(VectorDBInterface):
 
+    # pgvector rejects a larger hnsw.ef_search
+    HNSW_MAX_EF_SEARCH = 1000
+
+    # first pgvector release with the hnsw/ivfflat iterative_scan settings
+    ITERATIVE_SCAN_MIN_VERSION = (0, 8)
+
     def __init__(self, db_client, default_vector_size: int = 786,
-                       distance_method: str = None, index_threshold: int=100):
+                       distance_method: str = None, index_threshold: int=100,
+                       search_mode: str = PgVectorSearchModeEnums.INDEXED.value,
+                       catalog_ttl: int = 60,
+                       insert_mode: str = PgVectorInsertModeEnums.INSERT.value,
+                       ivfflat_threshold: int = 1000000,
+                       maintenance_work_mem: str = "512MB",
+                       storage_type: str = PgVectorStorageTypeEnums.VECTOR.value,
+                       rerank_factor: int = 4,
+                       iterative_scan: str = PgVectorIterativeScanEnums.STRICT_ORDER.value,
+                       text_search_config: str = "simple",
+                       rrf_k: int = 60,
+                       layout: str = PgVectorLayoutEnums.TABLE.value,
+                       normalized_vectors: bool = False):
         
         self.db_client = db_client
+        self.layout = layout
+        self.text_search_config = text_search_config
+        self.rrf_k = rrf_k
+        self.iterative_scan = iterative_scan
+        # read from pg_extension on connect, unknown means the oldest supported release
+        self.extension_version = None
+        self.insert_mode = insert_mode
+        self.storage_type = storage_type
+        self.rerank_factor = rerank_factor
+        self.catalog = CollectionCatalog(ttl_seconds=catalog_ttl)
         self.default_vector_size = default_vector_size
         
         self.index_threshold = index_threshold
+        self.search_mode = search_mode
 
+        # the ORDER BY operator must match the index operator class,
+        # otherwise the planner can not use the vector index
+        distance_operator = PgVectorDistanceOperatorEnums.COSINE.value
         if distance_method == DistanceMethodEnums.COSINE.value:
             distance_method = PgVectorDistanceMethodEnums.COSINE.value
+            distance_operator = PgVectorDistanceOperatorEnums.COSINE.value
         elif distance_method == DistanceMethodEnums.DOT.value:
             distance_method = PgVectorDistanceMethodEnums.DOT.value
+            distance_operator = PgVectorDistanceOperatorEnums.DOT.value
+
+        # on unit vectors the cosine ranking equals the inner product ranking,
+        # which skips the norm computations; the 1 - cosine score stays valid
+        if normalized_vectors and distance_method == PgVectorDistanceMethodEnums.COSINE.value:
+            distance_method = PgVectorDistanceMethodEnums.INNER_PRODUCT.value
+            distance_operator = PgVectorDistanceOperatorEnums.INNER_PRODUCT.value
 
         self.pgvector_table_prefix = PgVectorTableSchemeEnums._PREFIX.value
         self.distance_method = distance_method
+        self.distance_operator = distance_operator
 
         self.logger = logging.getLogger("uvicorn")
-        self.default_index_name = lambda collection_name: f"{collection_name}_vector_idx"
 
+        self.index_manager = PGVectorIndexManager(
+            db_client=db_client,
+            distance_method=distance_method,
+            ivfflat_threshold=ivfflat_threshold,
+            maintenance_work_mem=maintenance_work_mem,
+            storage_type=storage_type,
+        )
+        self.default_index_name = self.index_manager.default_index_name
+
+        # a collection dropped by another worker shows up as an undefined-table error,
+        # its cached stats must go so the next call probes the database again
+        bind = getattr(db_client, "kw", {}).get("bind")
+        if bind is not None:
+            event.listen(bind.sync_engine, "handle_error", self.on_database_error)
+
+    def on_database_error(self, context):
+        error = context.original_exception
+        if getattr(error, "sqlstate", None) != "42P01":
+            return
+
+        match = re.search(r'relation "([^"]+)" does not exist', str(error))
+        if match:
+            self.logger.warning(f"Collection {match.group(1)} no longer exists, dropping its cached stats")
+            self.catalog.invalidate(match.group(1).split(".")[-1])
 
     async def connect(self):
+        version_sql = sql_text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+
         async with self.db_client() as session:
             try:
                 # Check if vector extension already exists
-                result = await session.execute(sql_text(
-                    "SELECT 1 FROM pg_extension WHERE extname = 'vector'"
-                ))
-                extension_exists = result.scalar_one_or_none()
+                result = await session.execute(version_sql)
+                extension_version = result.scalar_one_or_none()
                 
-                if not extension_exists:
+                if not extension_version:
                     # Only create if it doesn't exist
                     await session.execute(sql_text("CREATE EXTENSION vector"))
                     await session.commit()
+
+                    result = await session.execute(version_sql)
+                    extension_version = result.scalar_one_or_none()
+
+                self.extension_version = self.parse_extension_version(extension_version)
             except Exception as e:
                 # If extension already exists or any other error, just log and continue
                 self.logger.warning(f"Vector extension setup: {str(e)}")
                 await session.rollback()
 
+        if self.iterative_scan != PgVectorIterativeScanEnums.OFF.value and not self.supports_iterative_scan():
+            self.logger.warning(f"pgvector {self.extension_version} has no iterative index scans, "
+                                "filtered searches run without them")
+
+    def parse_extension_version(self, extension_version: str):
+        if not extension_version:
+            return None
+
+        try:
+            return tuple(int(part) for part in extension_version.split(".")[:2])
+        except ValueError:
+            return None
+
+    def supports_iterative_scan(self):
+        return self.extension_version is not None and self.extension_version >= self.ITERATIVE_SCAN_MIN_VERSION
+
     async def disconnect(self):
         pass
 
-    async def is_collection_existed(self, collection_name: str) -> bool:
+    async def load_collection_stats(self, collection_name: str) -> CollectionStats:
+
+        stats = self.catalog.get(collection_name)
+        if stats is not None:
+            return stats
 
-        record = None
         async with self.db_client() as session:
             async with session.begin():
-                list_tbl = sql_text(f'SELECT * FROM pg_tables WHERE tablename = :collection_name')
-                results = await session.execute(list_tbl, {"collection_name": collection_name})
-                record = results.scalar_one_or_none()
+                # reltuples is the planner estimate, it avoids a full COUNT(*) scan
+                stats_sql = sql_text(f'''
+                    SELECT t.schemaname, t.tablename, t.tableowner, t.tablespace, t.hasindexes,
+                           c.reltuples::bigint AS reltuples, a.atttypmod AS embedding_size,
+                           ts.attname IS NOT NULL AS has_text_search,
+                           vi.opcname AS index_opclass
+                    FROM pg_tables t
+                    JOIN pg_namespace n ON n.nspname = t.schemaname
+                    JOIN pg_class c ON c.relname = t.tablename AND c.relnamespace = n.oid
+                    LEFT JOIN pg_attribute a ON a.attrelid = c.oid
+                                            AND a.attname = '{PgVectorTableSchemeEnums.VECTOR.value}'
+                    LEFT JOIN pg_attribute ts ON ts.attrelid = c.oid
+                                             AND ts.attname = '{PgVectorTableSchemeEnums.TEXT_SEARCH.value}'
+                    LEFT JOIN LATERAL (
+                        SELECT oc.opcname
+                        FROM pg_class ic
+                        JOIN pg_index i ON i.indexrelid = ic.oid
+                        JOIN pg_opclass oc ON oc.oid = i.indclass[0]
+                        WHERE ic.relname = :index_name AND i.indrelid = c.oid
+                    ) vi ON TRUE
+                    WHERE t.tablename = :collection_name
+                ''')
+                results = await session.execute(stats_sql, {
+                    "collection_name": collection_name,
+                    "index_name": self.default_index_name(collection_name),
+                })
+                record = results.fetchone()
+
+        if not record:
+            return self.catalog.set(collection_name, existed=False)
+
+        return self.catalog.set(
+            collection_name,
+            existed=True,
+            embedding_size=record.embedding_size,
+            record_count=record.reltuples,
+            info={
+                "schemaname": record.schemaname,
+                "tablename": record.tablename,
+                "tableowner": record.tableowner,
+                "tablespace": record.tablespace,
+                "hasindexes": record.hasindexes,
+                "has_text_search": record.has_text_search,
+                "index_opclass": record.index_opclass,
+            },
+        )
+
+    def check_index_opclass(self, collection_name: str, stats: CollectionStats):
+
+        # an index built for another distance (e.g. cosine before EMBEDDING_NORMALIZE switched
+        # the collection to inner product) can not serve the ORDER BY, every search would scan
+        index_opclass = stats.info.get("index_opclass") if stats.info else None
+        expected_opclass = self.index_manager.index_opclass()
+        if index_opclass and index_opclass != expected_opclass:
+            raise ValueError(f"The vector index of collection {collection_name} uses {index_opclass}, "
+                             f"the provider is configured for {expected_opclass}; "
+                             f"rebuild it with reset_vector_index")
 
-        return record
+    async def is_collection_existed(self, collection_name: str) -> bool:
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        return stats.existed
     
     async def list_all_collections(self) -> List:
         records = []
@@ -72,46 +232,71 @@ class PGVectorProvider(VectorDBInterface):
         return records
     
     async def get_collection_info(self, collection_name: str) -> dict:
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        if not stats.existed:
+            return None
+
+        return {
+            "table_info": stats.info,
+            "embedding_size": stats.embedding_size,
+            "record_count": stats.record_count,
+        }
+            
+    def partition_parent_name(self, collection_name: str):
+        # collection names end with the project id: collection_{size}_{project_id}
+        parent_name, partition_key = collection_name.rsplit("_", 1)
+        return parent_name, int(partition_key)
+
+    async def is_partition(self, collection_name: str) -> bool:
         async with self.db_client() as session:
             async with session.begin():
-                
-                table_info_sql = sql_text(f'''
-                    SELECT schemaname, tablename, tableowner, tablespace, hasindexes 
-                    FROM pg_tables 
-                    WHERE tablename = :collection_name
-                ''')
+                check_sql = sql_text('SELECT relispartition FROM pg_class WHERE relname = :collection_name')
+                results = await session.execute(check_sql, {"collection_name": collection_name})
+                return bool(results.scalar_one_or_none())
 
-                count_sql = sql_text(f'SELECT COUNT(*) FROM {collection_name}')
+    async def delete_collection(self, collection_name: str):
+        self.logger.info(f"Deleting collection: {collection_name}")
 
-                table_info = await session.execute(table_info_sql, {"collection_name": collection_name})
-                record_count = await session.execute(count_sql)
+        if self.layout == PgVectorLayoutEnums.PARTITIONED.value and await self.is_partition(collection_name):
+            parent_name, _ = self.partition_parent_name(collection_name)
+            async with self.db_client() as session:
+                # DETACH CONCURRENTLY can not run inside a transaction block, and it does not
+                # block the searches of the other courses on the parent table
+                connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+                await connection.execute(sql_text(
+                    f'ALTER TABLE {parent_name} DETACH PARTITION {collection_name} CONCURRENTLY'
+                ))
 
-                table_data = table_info.fetchone()
-                if not table_data:
-                    return None
-                
-                return {
-                    "table_info": {
-                        "schemaname": table_data[0],
-                        "tablename": table_data[1],
-                        "tableowner": table_data[2],
-                        "tablespace": table_data[3],
-                        "hasindexes": table_data[4],
-                    },
-                    "record_count": record_count.scalar_one(),
-                }
-            
-    async def delete_collection(self, collection_name: str):
         async with self.db_client() as session:
             async with session.begin():
-                self.logger.info(f"Deleting collection: {collection_name}")
-
                 delete_sql = sql_text(f'DROP TABLE IF EXISTS {collection_name}')
                 await session.execute(delete_sql)
                 await session.commit()
+
+        self.catalog.invalidate(collection_name)
         
         return True
 
+    def build_columns_sql(self, embedding_size: int):
+
+        # binary quantization keeps the full precision column for re-ranking
+        # and only quantizes inside the index expression
+        vector_type = "vector"
+        if self.storage_type == PgVectorStorageTypeEnums.HALFVEC.value:
+            vector_type = "halfvec"
+
+        return (
+            f'{PgVectorTableSchemeEnums.TEXT.value} text, '
+            f'{PgVectorTableSchemeEnums.VECTOR.value} {vector_type}({embedding_size}), '
+            f'{PgVectorTableSchemeEnums.METADATA.value} jsonb DEFAULT \'{{}}\', '
+            f'{PgVectorTableSchemeEnums.CHUNK_ID.value} integer, '
+            # generated column, so both INSERT and COPY fill it at insert time
+            f'{PgVectorTableSchemeEnums.TEXT_SEARCH.value} tsvector GENERATED ALWAYS AS '
+            f'(to_tsvector(\'{self.text_search_config}\'::regconfig, '
+            f'coalesce({PgVectorTableSchemeEnums.TEXT.value}, \'\'))) STORED, '
+            f'FOREIGN KEY ({PgVectorTableSchemeEnums.CHUNK_ID.value}) REFERENCES chunks(chunk_id)'
+        )
+
     async def create_collection(self, collection_name: str,
                                       embedding_size: int,
                                       do_reset: bool = False):
@@ -121,75 +306,142 @@ class PGVectorProvider(VectorDBInterface):
 
         is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
         if not is_collection_existed:
-            self.logger.info(f"Creating collection: {collection_name}")
+            self.logger.info(f"Creating collection: {collection_name} "
+                             f"({self.storage_type} storage, {self.layout} layout)")
             async with self.db_client() as session:
                 async with session.begin():
-                    create_sql = sql_text(
-                        f'CREATE TABLE {collection_name} ('
-                            f'{PgVectorTableSchemeEnums.ID.value} bigserial PRIMARY KEY,'
-                            f'{PgVectorTableSchemeEnums.TEXT.value} text, '
-                            f'{PgVectorTableSchemeEnums.VECTOR.value} vector({embedding_size}), '
-                            f'{PgVectorTableSchemeEnums.METADATA.value} jsonb DEFAULT \'{{}}\', '
-                            f'{PgVectorTableSchemeEnums.CHUNK_ID.value} integer, '
-                            f'FOREIGN KEY ({PgVectorTableSchemeEnums.CHUNK_ID.value}) REFERENCES chunks(chunk_id)'
-                        ')'
-                    )
+                    if self.layout == PgVectorLayoutEnums.PARTITIONED.value:
+                        # one parent table per embedding size, one partition per project;
+                        # the partition keeps the collection name, so every other query is unchanged
+                        parent_name, partition_key = self.partition_parent_name(collection_name)
+                        parent_sql = sql_text(
+                            f'CREATE TABLE IF NOT EXISTS {parent_name} ('
+                                f'{PgVectorTableSchemeEnums.ID.value} bigserial, '
+                                f'{PgVectorTableSchemeEnums.PROJECT_ID.value} integer NOT NULL, '
+                                f'{self.build_columns_sql(embedding_size=embedding_size)}, '
+                                f'PRIMARY KEY ({PgVectorTableSchemeEnums.ID.value}, '
+                                f'{PgVectorTableSchemeEnums.PROJECT_ID.value})'
+                            f') PARTITION BY LIST ({PgVectorTableSchemeEnums.PROJECT_ID.value})'
+                        )
+                        await session.execute(parent_sql)
+
+                        create_sql = sql_text(
+                            f'CREATE TABLE {collection_name} PARTITION OF {parent_name} '
+                            f'({PgVectorTableSchemeEnums.PROJECT_ID.value} DEFAULT {partition_key}) '
+                            f'FOR VALUES IN ({partition_key})'
+                        )
+                    else:
+                        create_sql = sql_text(
+                            f'CREATE TABLE {collection_name} ('
+                                f'{PgVectorTableSchemeEnums.ID.value} bigserial PRIMARY KEY,'
+                                f'{self.build_columns_sql(embedding_size=embedding_size)}'
+                            ')'
+                        )
                     await session.execute(create_sql)
+
+                    text_search_idx_sql = sql_text(
+                        f'CREATE INDEX {collection_name}_text_search_idx ON {collection_name} '
+                        f'USING gin ({PgVectorTableSchemeEnums.TEXT_SEARCH.value})'
+                    )
+                    await session.execute(text_search_idx_sql)
+
+                    # get_vectors looks the stored vectors up by chunk id
+                    chunk_id_idx_sql = sql_text(
+                        f'CREATE INDEX {collection_name}_chunk_id_idx ON {collection_name} '
+                        f'({PgVectorTableSchemeEnums.CHUNK_ID.value})'
+                    )
+                    await session.execute(chunk_id_idx_sql)
                     await session.commit()
+
+            self.catalog.invalidate(collection_name)
             
             return True
 
         return False
+
+    async def maintain_collections(self, prewarm: bool = True):
+
+        start_time = time.perf_counter()
+
+        async with self.db_client() as session:
+            # VACUUM can not run inside a transaction block
+            connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+
+            # partitioned parents cover all of their partitions in a single statement
+            tables_sql = sql_text(r"""
+                                  SELECT relname FROM pg_class
+                                  WHERE relname LIKE 'collection\_%'
+                                  AND relkind IN ('r', 'p')
+                                  AND NOT relispartition
+                                  """)
+            results = await connection.execute(tables_sql)
+            tables = results.scalars().all()
+
+            if tables:
+                await connection.execute(sql_text(f'VACUUM (ANALYZE) {", ".join(tables)}'))
+
+            prewarmed_blocks = None
+            if prewarm:
+                try:
+                    await connection.execute(sql_text('CREATE EXTENSION IF NOT EXISTS pg_prewarm'))
+                    prewarm_sql = sql_text(r"""
+                                           SELECT COALESCE(SUM(pg_prewarm(oid)), 0) FROM pg_class
+                                           WHERE relkind = 'i'
+                                           AND relname LIKE 'collection\_%\_vector\_idx'
+                                           """)
+                    results = await connection.execute(prewarm_sql)
+                    prewarmed_blocks = results.scalar_one()
+                except Exception as e:
+                    self.logger.warning(f"Vector index prewarm skipped: {e}")
+
+        self.catalog.invalidate()
+
+        return {
+            "vacuumed_tables": list(tables),
+            "prewarmed_blocks": prewarmed_blocks,
+            "duration": round(time.perf_counter() - start_time, 3),
+        }
     
     async def is_index_existed(self, collection_name: str) -> bool:
-        index_name = self.default_index_name(collection_name)
+        return await self.index_manager.is_index_existed(collection_name=collection_name)
+            
+    async def create_vector_index(self, collection_name: str, index_type: str = None):
+
+        # refresh the planner statistics after the load, this also makes reltuples exact
+        # for small tables, so the index parameters are sized from the real row count
         async with self.db_client() as session:
             async with session.begin():
-                check_sql = sql_text(f""" 
-                                    SELECT 1 
-                                    FROM pg_indexes 
-                                    WHERE tablename = :collection_name
-                                    AND indexname = :index_name
-                                    """)
-                results = await session.execute(check_sql, {"index_name": index_name, "collection_name": collection_name})
-                
-                return bool(results.scalar_one_or_none())
-            
-    async def create_vector_index(self, collection_name: str,
-                                        index_type: str = PgVectorIndexTypeEnums.HNSW.value):
+                await session.execute(sql_text(f'ANALYZE {collection_name}'))
+
+        self.catalog.invalidate(collection_name)
+
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        if not stats.existed:
+            return None
+
+        # filtered searches need the metadata index regardless of the collection size
+        _ = await self.index_manager.build_metadata_index(collection_name=collection_name)
+
+        if stats.record_count < self.index_threshold:
+            return None
+
         is_index_existed = await self.is_index_existed(collection_name=collection_name)
         if is_index_existed:
-            return False
-        
-        async with self.db_client() as session:
-            async with session.begin():
-                count_sql = sql_text(f'SELECT COUNT(*) FROM {collection_name}')
-                result = await session.execute(count_sql)
-                records_count = result.scalar_one()
+            self.check_index_opclass(collection_name=collection_name, stats=stats)
+            return None
 
-                if records_count < self.index_threshold:
-                    return False
-                
-                self.logger.info(f"START: Creating vector index for collection: {collection_name}")
-                
-                index_name = self.default_index_name(collection_name)
-                create_idx_sql = sql_text(
-                                            f'CREATE INDEX {index_name} ON {collection_name} '
-                                            f'USING {index_type} ({PgVectorTableSchemeEnums.VECTOR.value} {self.distance_method})'
-                                          )
+        index_report = await self.index_manager.build_index(collection_name=collection_name,
+                                                            records_count=stats.record_count,
+                                                            index_type=index_type,
+                                                            embedding_size=stats.embedding_size)
 
-                await session.execute(create_idx_sql)
+        self.catalog.invalidate(collection_name)
 
-                self.logger.info(f"END: Created vector index for collection: {collection_name}")
+        return index_report
 
-    async def reset_vector_index(self, collection_name: str, 
-                                       index_type: str = PgVectorIndexTypeEnums.HNSW.value) -> bool:
+    async def reset_vector_index(self, collection_name: str, index_type: str = None):
         
-        index_name = self.default_index_name(collection_name)
-        async with self.db_client() as session:
-            async with session.begin():
-                drop_sql = sql_text(f'DROP INDEX IF EXISTS {index_name}')
-                await session.execute(drop_sql)
+        _ = await self.index_manager.drop_index(collection_name=collection_name)
         
         return await self.create_vector_index(collection_name=collection_name, index_type=index_type)
 
@@ -223,7 +475,7 @@ class PGVectorProvider(VectorDBInterface):
                 })
                 await session.commit()
 
-                await self.create_vector_index(collection_name=collection_name)
+        self.catalog.add_records(collection_name, 1)
         
         return True
     
@@ -243,6 +495,11 @@ class PGVectorProvider(VectorDBInterface):
         
         if not metadata or len(metadata) == 0:
             metadata = [None] * len(texts)
+
+        if self.insert_mode == PgVectorInsertModeEnums.COPY.value:
+            return await self.copy_many(collection_name=collection_name, texts=texts,
+                                        vectors=vectors, metadata=metadata,
+                                        record_ids=record_ids)
         
         async with self.db_client() as session:
             async with session.begin():
@@ -273,39 +530,437 @@ class PGVectorProvider(VectorDBInterface):
                     
                     await session.execute(batch_insert_sql, values)
 
-        await self.create_vector_index(collection_name=collection_name)
+        self.catalog.add_records(collection_name, len(texts))
+
+        return True
+
+    def build_copy_payload(self, texts: list, vectors, metadata: list, record_ids: list) -> bytes:
+
+        # one astype call converts the whole batch to the big-endian float4 layout of
+        # the pgvector binary format: int16 dim, int16 unused, dim * float4
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2:
+            raise ValueError(f"Expected a 2D vectors array, got shape {vectors.shape}")
+
+        vectors_count, dim = vectors.shape
+        if self.storage_type == PgVectorStorageTypeEnums.HALFVEC.value:
+            # halfvec uses the same layout with big-endian float2 elements
+            vector_rows = vectors.astype('>f2')
+        else:
+            vector_rows = vectors.astype('>f4')
+        vector_prefix = struct.pack('>iHH', 4 + vector_rows.itemsize * dim, dim, 0)
+
+        payload = bytearray(PGCOPY_HEADER)
+        for i in range(vectors_count):
+            # tuple field count: text, vector, metadata, chunk_id
+            payload += struct.pack('>h', 4)
+
+            if texts[i] is None:
+                payload += struct.pack('>i', -1)
+            else:
+                text_bytes = texts[i].encode('utf-8')
+                payload += struct.pack('>i', len(text_bytes))
+                payload += text_bytes
+
+            payload += vector_prefix
+            payload += vector_rows[i].tobytes()
+
+            # jsonb binary format is a version byte followed by the json text
+            metadata_json = json.dumps(metadata[i], ensure_ascii=False) if metadata[i] is not None else "{}"
+            metadata_bytes = b'\x01' + metadata_json.encode('utf-8')
+            payload += struct.pack('>i', len(metadata_bytes))
+            payload += metadata_bytes
+
+            if record_ids[i] is None:
+                payload += struct.pack('>i', -1)
+            else:
+                payload += struct.pack('>ii', 4, int(record_ids[i]))
+
+        payload += PGCOPY_TRAILER
+
+        return bytes(payload)
+
+    async def copy_many(self, collection_name: str, texts: list, vectors,
+                              metadata: list, record_ids: list):
+
+        payload = self.build_copy_payload(texts=texts, vectors=vectors,
+                                          metadata=metadata, record_ids=record_ids)
+
+        async with self.db_client() as session:
+            async with session.begin():
+                connection = await session.connection()
+                raw_connection = await connection.get_raw_connection()
+
+                # stream the rows with binary COPY on the underlying asyncpg connection
+                _ = await raw_connection.driver_connection.copy_to_table(
+                    collection_name,
+                    source=io.BytesIO(payload),
+                    columns=[
+                        PgVectorTableSchemeEnums.TEXT.value,
+                        PgVectorTableSchemeEnums.VECTOR.value,
+                        PgVectorTableSchemeEnums.METADATA.value,
+                        PgVectorTableSchemeEnums.CHUNK_ID.value,
+                    ],
+                    format='binary',
+                )
+
+        self.catalog.add_records(collection_name, len(texts))
 
         return True
     
-    async def search_by_vector(self, collection_name: str, vector: list, limit: int):
+    def build_filter_sql(self, metadata_filter: dict = None):
+
+        if not metadata_filter:
+            return "", {}
+
+        # every condition is a jsonb containment test, so the GIN index on metadata can serve it;
+        # a list value matches any of its items
+        conditions = []
+        params = {}
+        for key_idx, (key, value) in enumerate(metadata_filter.items()):
+            values = value if isinstance(value, list) else [value]
+
+            alternatives = []
+            for value_idx, _value in enumerate(values):
+                param_name = f"filter_{key_idx}_{value_idx}"
+                params[param_name] = json.dumps({key: _value}, ensure_ascii=False)
+                alternatives.append(f'{PgVectorTableSchemeEnums.METADATA.value} @> CAST(:{param_name} AS jsonb)')
+
+            conditions.append("(" + " OR ".join(alternatives) + ")")
+
+        return " AND ".join(conditions), params
+
+    def build_search_sql(self, collection_name: str, limit: int, embedding_size: int = None,
+                               filter_sql: str = ""):
+
+        vector_column = PgVectorTableSchemeEnums.VECTOR.value
+        where_sql = f' WHERE {filter_sql}' if filter_sql else ''
+
+        if self.storage_type == PgVectorStorageTypeEnums.BINARY.value:
+            # hamming distance over the binary index picks the candidates,
+            # then they are re-scored with the full precision vectors
+            candidates_limit = self.get_rerank_candidates_limit(limit=limit)
+            return sql_text(f'SELECT text, chunk_id, metadata, '
+                            f'1 - ({vector_column} <=> CAST(:vector AS vector)) as score'
+                            ' FROM ('
+                                f'SELECT {PgVectorTableSchemeEnums.TEXT.value} as text, '
+                                f'{PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id, '
+                                f'{PgVectorTableSchemeEnums.METADATA.value} as metadata, '
+                                f'{vector_column}'
+                                f' FROM {collection_name}'
+                                f'{where_sql}'
+                                f' ORDER BY binary_quantize({vector_column})::bit({int(embedding_size)}) '
+                                f'<~> binary_quantize(CAST(:vector AS vector)) '
+                                f'LIMIT {candidates_limit}'
+                            ') candidates'
+                            f' ORDER BY {vector_column} {self.distance_operator} CAST(:vector AS vector) '
+                            f'LIMIT {int(limit)}'
+                            )
+
+        if self.search_mode == PgVectorSearchModeEnums.SCORED.value:
+            order_by = 'score DESC'
+        else:
+            # order by the raw distance expression so the HNSW/IVFFlat index is used
+            order_by = f'{vector_column} {self.distance_operator} :vector'
+
+        return sql_text(f'SELECT {PgVectorTableSchemeEnums.TEXT.value} as text, '
+                        f'{PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id, '
+                        f'{PgVectorTableSchemeEnums.METADATA.value} as metadata, '
+                        f'1 - ({vector_column} <=> :vector) as score'
+                        f' FROM {collection_name}'
+                        f'{where_sql}'
+                        f' ORDER BY {order_by} '
+                        f'LIMIT {int(limit)}'
+                        )
+
+    def get_rerank_candidates_limit(self, limit: int):
+        # the candidates come out of one HNSW scan, which returns at most ef_search rows
+        return max(int(limit), min(int(limit) * self.rerank_factor, self.HNSW_MAX_EF_SEARCH))
+
+    async def set_search_params(self, session, limit: int, ef_search: int = None, probes: int = None,
+                                      is_filtered: bool = False):
+
+        # an HNSW scan returns at most ef_search rows, which must cover the re-rank candidates
+        if self.storage_type == PgVectorStorageTypeEnums.BINARY.value:
+            ef_search = max(ef_search or 0, self.get_rerank_candidates_limit(limit=limit))
+
+        if ef_search:
+            ef_search = min(int(ef_search), self.HNSW_MAX_EF_SEARCH)
+
+        # SET LOCAL only lives until the end of the current transaction
+        if ef_search:
+            await session.execute(sql_text(f'SET LOCAL hnsw.ef_search = {int(ef_search)}'))
+
+        if probes:
+            await session.execute(sql_text(f'SET LOCAL ivfflat.probes = {int(probes)}'))
+
+        # with a filter, keep scanning the index until `limit` rows pass it, the settings
+        # do not exist before pgvector 0.8 and setting them there fails the search
+        if is_filtered and self.iterative_scan != PgVectorIterativeScanEnums.OFF.value \
+                and self.supports_iterative_scan():
+            await session.execute(sql_text(f"SET LOCAL hnsw.iterative_scan = '{self.iterative_scan}'"))
+            # ivfflat only supports the relaxed order
+            await session.execute(sql_text(
+                f"SET LOCAL ivfflat.iterative_scan = '{PgVectorIterativeScanEnums.RELAXED_ORDER.value}'"
+            ))
+
+    async def explain_search_by_vector(self, collection_name: str, vector: list, limit: int,
+                                             ef_search: int = None, probes: int = None,
+                                             metadata_filter: dict = None) -> dict:
+
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        filter_sql, filter_params = self.build_filter_sql(metadata_filter=metadata_filter)
 
-        is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
-        if not is_collection_existed:
+        vector = "[" + ",".join([ str(v) for v in vector ]) + "]"
+        async with self.db_client() as session:
+            async with session.begin():
+                await self.set_search_params(session=session, limit=limit,
+                                             ef_search=ef_search, probes=probes,
+                                             is_filtered=bool(filter_sql))
+
+                search_sql = self.build_search_sql(collection_name=collection_name, limit=limit,
+                                                   embedding_size=stats.embedding_size,
+                                                   filter_sql=filter_sql)
+                explain_sql = sql_text(f'EXPLAIN {search_sql.text}')
+
+                result = await session.execute(explain_sql, {"vector": vector, **filter_params})
+                plan = [ record[0] for record in result.fetchall() ]
+
+        index_name = self.default_index_name(collection_name)
+
+        return {
+            "plan": plan,
+            "uses_index": any(index_name in line for line in plan),
+        }
+    
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int,
+                                     ef_search: int = None, probes: int = None,
+                                     metadata_filter: dict = None):
+
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        if not stats.existed:
             self.logger.error(f"Can not search for records in a non-existed collection: {collection_name}")
             return False
+
+        self.check_index_opclass(collection_name=collection_name, stats=stats)
+
+        filter_sql, filter_params = self.build_filter_sql(metadata_filter=metadata_filter)
         
         vector = "[" + ",".join([ str(v) for v in vector ]) + "]"
         async with self.db_client() as session:
             async with session.begin():
-                search_sql = sql_text(f'SELECT {PgVectorTableSchemeEnums.TEXT.value} as text, '
-                                      f'{PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id, '
-                                      f'{PgVectorTableSchemeEnums.METADATA.value} as metadata, '
-                                      f'1 - ({PgVectorTableSchemeEnums.VECTOR.value} <=> :vector) as score'
-                                      f' FROM {collection_name}'
-                                      ' ORDER BY score DESC '
-                                      f'LIMIT {limit}'
-                                      )
+                await self.set_search_params(session=session, limit=limit,
+                                             ef_search=ef_search, probes=probes,
+                                             is_filtered=bool(filter_sql))
+
+                search_sql = self.build_search_sql(collection_name=collection_name, limit=limit,
+                                                   embedding_size=stats.embedding_size,
+                                                   filter_sql=filter_sql)
                 
-                result = await session.execute(search_sql, {"vector": vector})
+                result = await session.execute(search_sql, {"vector": vector, **filter_params})
 
                 records = result.fetchall()
 
-                return [
-                    RetrievedDocument(
-                        text=record.text,
-                        score=record.score,
-                        chunk_id=record.chunk_id,
-                        metadata=record.metadata if record.metadata else {}
-                    )
-                    for record in records
-                ]
+        results = [
+            RetrievedDocument(
+                text=record.text,
+                score=record.score,
+                chunk_id=record.chunk_id,
+                metadata=record.metadata if record.metadata else {}
+            )
+            for record in records
+        ]
+
+        # relaxed iterative scans may return the rows slightly out of order
+        if filter_sql and self.iterative_scan == PgVectorIterativeScanEnums.RELAXED_ORDER.value:
+            results.sort(key=lambda doc: doc.score, reverse=True)
+
+        return results
+
+    async def get_vectors(self, collection_name: str, chunk_ids: list) -> dict:
+
+        if not chunk_ids:
+            return {}
+
+        async with self.db_client() as session:
+            async with session.begin():
+                # the text form '[x,y,...]' is valid JSON for both vector and halfvec
+                vectors_sql = sql_text(f'SELECT {PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id, '
+                                       f'CAST({PgVectorTableSchemeEnums.VECTOR.value} AS text) as vector'
+                                       f' FROM {collection_name}'
+                                       f' WHERE {PgVectorTableSchemeEnums.CHUNK_ID.value} = ANY(:chunk_ids)')
+                result = await session.execute(vectors_sql, {"chunk_ids": list(chunk_ids)})
+                records = result.fetchall()
+
+        return {
+            record.chunk_id: json.loads(record.vector)
+            for record in records
+        }
+
+    def build_search_many_sql(self, collection_name: str, limit: int, filter_sql: str = ""):
+
+        vector_column = PgVectorTableSchemeEnums.VECTOR.value
+        where_sql = f' WHERE {filter_sql}' if filter_sql else ''
+
+        query_vector_type = "vector"
+        if self.storage_type == PgVectorStorageTypeEnums.HALFVEC.value:
+            query_vector_type = "halfvec"
+
+        if self.search_mode == PgVectorSearchModeEnums.SCORED.value:
+            order_by = 'score DESC'
+        else:
+            order_by = f'{vector_column} {self.distance_operator} queries.query_vector'
+
+        # one round trip for all the queries: each query vector drives its own
+        # index ordered scan through the LATERAL join
+        return sql_text(f'SELECT queries.query_idx, results.text, results.chunk_id, '
+                        f'results.metadata, results.score'
+                        f' FROM unnest(CAST(CAST(:vectors AS text[]) AS {query_vector_type}[])) '
+                        f'WITH ORDINALITY AS queries(query_vector, query_idx)'
+                        ' CROSS JOIN LATERAL ('
+                            f'SELECT {PgVectorTableSchemeEnums.TEXT.value} as text, '
+                            f'{PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id, '
+                            f'{PgVectorTableSchemeEnums.METADATA.value} as metadata, '
+                            f'1 - ({vector_column} <=> queries.query_vector) as score'
+                            f' FROM {collection_name}'
+                            f'{where_sql}'
+                            f' ORDER BY {order_by} '
+                            f'LIMIT {int(limit)}'
+                        ') results'
+                        ' ORDER BY queries.query_idx, results.score DESC'
+                        )
+
+    async def search_many(self, collection_name: str, vectors: list, limit: int,
+                                ef_search: int = None, probes: int = None,
+                                metadata_filter: dict = None):
+
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        if not stats.existed:
+            self.logger.error(f"Can not search for records in a non-existed collection: {collection_name}")
+            return False
+
+        self.check_index_opclass(collection_name=collection_name, stats=stats)
+
+        if self.storage_type == PgVectorStorageTypeEnums.BINARY.value:
+            # the binary re-rank query does not fit in a LATERAL join, run the searches concurrently
+            return list(await asyncio.gather(*[
+                self.search_by_vector(collection_name=collection_name, vector=vector, limit=limit,
+                                      ef_search=ef_search, probes=probes, metadata_filter=metadata_filter)
+                for vector in vectors
+            ]))
+
+        filter_sql, filter_params = self.build_filter_sql(metadata_filter=metadata_filter)
+
+        vectors = [ "[" + ",".join([ str(v) for v in vector ]) + "]" for vector in vectors ]
+        async with self.db_client() as session:
+            async with session.begin():
+                await self.set_search_params(session=session, limit=limit,
+                                             ef_search=ef_search, probes=probes,
+                                             is_filtered=bool(filter_sql))
+
+                search_sql = self.build_search_many_sql(collection_name=collection_name, limit=limit,
+                                                        filter_sql=filter_sql)
+
+                result = await session.execute(search_sql, {"vectors": vectors, **filter_params})
+
+                records = result.fetchall()
+
+        results = [ [] for _ in vectors ]
+        for record in records:
+            results[record.query_idx - 1].append(
+                RetrievedDocument(
+                    text=record.text,
+                    score=record.score,
+                    chunk_id=record.chunk_id,
+                    metadata=record.metadata if record.metadata else {}
+                )
+            )
+
+        return results
+
+    def build_lexical_search_sql(self, collection_name: str, limit: int, filter_sql: str = ""):
+
+        text_search_column = PgVectorTableSchemeEnums.TEXT_SEARCH.value
+        where_sql = f' AND {filter_sql}' if filter_sql else ''
+
+        # websearch_to_tsquery accepts raw student input (quotes, OR, -term) without syntax errors
+        return sql_text(f'SELECT {PgVectorTableSchemeEnums.TEXT.value} as text, '
+                        f'{PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id, '
+                        f'{PgVectorTableSchemeEnums.METADATA.value} as metadata, '
+                        f'ts_rank_cd({text_search_column}, query) as score'
+                        f' FROM {collection_name}, '
+                        f'websearch_to_tsquery(\'{self.text_search_config}\'::regconfig, :query) query'
+                        f' WHERE {text_search_column} @@ query'
+                        f'{where_sql}'
+                        ' ORDER BY score DESC '
+                        f'LIMIT {int(limit)}'
+                        )
+
+    async def search_by_text(self, collection_name: str, text: str, limit: int,
+                                   metadata_filter: dict = None):
+
+        filter_sql, filter_params = self.build_filter_sql(metadata_filter=metadata_filter)
+
+        async with self.db_client() as session:
+            async with session.begin():
+                search_sql = self.build_lexical_search_sql(collection_name=collection_name, limit=limit,
+                                                           filter_sql=filter_sql)
+
+                result = await session.execute(search_sql, {"query": text, **filter_params})
+
+                records = result.fetchall()
+
+        return [
+            RetrievedDocument(
+                text=record.text,
+                score=record.score,
+                chunk_id=record.chunk_id,
+                metadata=record.metadata if record.metadata else {}
+            )
+            for record in records
+        ]
+
+    def fuse_rankings(self, rankings: List[List[RetrievedDocument]], limit: int):
+
+        # reciprocal rank fusion: score = sum(1 / (k + rank)) over every ranking the chunk is in
+        fused_scores = {}
+        fused_documents = {}
+        for ranking in rankings:
+            for rank, document in enumerate(ranking, start=1):
+                fused_scores[document.chunk_id] = fused_scores.get(document.chunk_id, 0.0) + 1.0 / (self.rrf_k + rank)
+                fused_documents.setdefault(document.chunk_id, document)
+
+        ranked_ids = sorted(fused_scores, key=fused_scores.get, reverse=True)[:limit]
+
+        return [
+            fused_documents[chunk_id].model_copy(update={"score": fused_scores[chunk_id]})
+            for chunk_id in ranked_ids
+        ]
+
+    async def search_hybrid(self, collection_name: str, text: str, vector: list, limit: int,
+                                  ef_search: int = None, probes: int = None,
+                                  metadata_filter: dict = None):
+
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        if not stats.existed:
+            self.logger.error(f"Can not search for records in a non-existed collection: {collection_name}")
+            return False
+
+        if not stats.info.get("has_text_search"):
+            self.logger.warning(f"Collection {collection_name} has no text search column, "
+                                "falling back to vector search")
+            return await self.search_by_vector(collection_name=collection_name, vector=vector, limit=limit,
+                                               ef_search=ef_search, probes=probes,
+                                               metadata_filter=metadata_filter)
+
+        # both rankings are fetched deeper than limit, so the fusion has overlap to work with
+        candidates_limit = int(limit) * self.rerank_factor
+
+        vector_results, lexical_results = await asyncio.gather(
+            self.search_by_vector(collection_name=collection_name, vector=vector, limit=candidates_limit,
+                                  ef_search=ef_search, probes=probes, metadata_filter=metadata_filter),
+            self.search_by_text(collection_name=collection_name, text=text, limit=candidates_limit,
+                                metadata_filter=metadata_filter),
+        )
+
+        return self.fuse_rankings(rankings=[vector_results or [], lexical_results or []], limit=limit)
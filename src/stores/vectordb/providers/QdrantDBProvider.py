@@ -1,17 +1,36 @@
-from qdrant_client import models, QdrantClient
+from qdrant_client import models, AsyncQdrantClient
 from ..VectorDBInterface import VectorDBInterface
-from ..VectorDBEnums import DistanceMethodEnums
+from ..CollectionCatalog import CollectionCatalog, CollectionStats
+from ..VectorDBEnums import DistanceMethodEnums, MetadataIndexedFieldEnums
 import logging
+import asyncio
 from typing import List
 from models.db_schemes import RetrievedDocument
 
 class QdrantDBProvider(VectorDBInterface):
 
     def __init__(self, db_client: str, default_vector_size: int = 786,
-                                     distance_method: str = None, index_threshold: int=100):
+                                     distance_method: str = None, index_threshold: int=100,
+                                     catalog_ttl: int = 60,
+                                     url: str = None, api_key: str = None,
+                                     prefer_grpc: bool = False, upload_parallel: int = 4,
+                                     hnsw_m: int = None, hnsw_ef_construct: int = None,
+                                     scalar_quantization: bool = False, on_disk: bool = False,
+                                     oversampling: float = 2.0):
 
         self.client = None
         self.db_client = db_client
+        self.url = url
+        self.api_key = api_key
+        self.prefer_grpc = prefer_grpc
+        self.upload_parallel = upload_parallel
+
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+        self.scalar_quantization = scalar_quantization
+        self.on_disk = on_disk
+        self.oversampling = oversampling
+        self.catalog = CollectionCatalog(ttl_seconds=catalog_ttl)
         self.distance_method = None
         self.default_vector_size = default_vector_size
 
@@ -23,71 +42,158 @@ class QdrantDBProvider(VectorDBInterface):
         self.logger = logging.getLogger('uvicorn')
 
     async def connect(self):
-        self.client = QdrantClient(path=self.db_client)
+        if self.url:
+            # server mode can be shared by all the uvicorn workers
+            self.client = AsyncQdrantClient(url=self.url, api_key=self.api_key or None,
+                                            prefer_grpc=self.prefer_grpc)
+        else:
+            # embedded mode holds a file lock, so it only fits a single worker
+            self.client = AsyncQdrantClient(path=self.db_client)
 
     async def disconnect(self):
+        if self.client:
+            await self.client.close()
         self.client = None
 
+    async def load_collection_stats(self, collection_name: str) -> CollectionStats:
+
+        stats = self.catalog.get(collection_name)
+        if stats is not None:
+            return stats
+
+        if not await self.client.collection_exists(collection_name=collection_name):
+            return self.catalog.set(collection_name, existed=False)
+
+        collection_info = await self.client.get_collection(collection_name=collection_name)
+        vectors_config = collection_info.config.params.vectors
+
+        return self.catalog.set(
+            collection_name,
+            existed=True,
+            embedding_size=getattr(vectors_config, "size", None),
+            record_count=collection_info.points_count,
+            info={
+                "status": str(collection_info.status),
+                "indexed_vectors_count": collection_info.indexed_vectors_count,
+            },
+        )
+
     async def is_collection_existed(self, collection_name: str) -> bool:
-        return self.client.collection_exists(collection_name=collection_name)
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        return stats.existed
     
     async def list_all_collections(self) -> List:
-        return self.client.get_collections()
+        return await self.client.get_collections()
     
-    def get_collection_info(self, collection_name: str) -> dict:
-        return self.client.get_collection(collection_name=collection_name)
+    async def get_collection_info(self, collection_name: str) -> dict:
+        stats = await self.load_collection_stats(collection_name=collection_name)
+        if not stats.existed:
+            return None
+
+        return {
+            "collection_info": stats.info,
+            "embedding_size": stats.embedding_size,
+            "record_count": stats.record_count,
+        }
     
     async def delete_collection(self, collection_name: str):
-        if self.is_collection_existed(collection_name):
+        if await self.is_collection_existed(collection_name):
             self.logger.info(f"Deleting collection: {collection_name}")
-            return self.client.delete_collection(collection_name=collection_name)
+            result = await self.client.delete_collection(collection_name=collection_name)
+            self.catalog.invalidate(collection_name)
+            return result
         
     async def create_collection(self, collection_name: str, 
                                 embedding_size: int,
                                 do_reset: bool = False):
         if do_reset:
-            _ = self.delete_collection(collection_name=collection_name)
+            _ = await self.delete_collection(collection_name=collection_name)
         
-        if not self.is_collection_existed(collection_name):
+        if not await self.is_collection_existed(collection_name):
             self.logger.info(f"Creating new Qdrant collection: {collection_name}")
+
+            hnsw_config = None
+            if self.hnsw_m or self.hnsw_ef_construct:
+                hnsw_config = models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+            # int8 copies stay in RAM for the search while the original vectors
+            # can live on disk and are only read to rescore the top candidates
+            quantization_config = None
+            if self.scalar_quantization:
+                quantization_config = models.ScalarQuantization(
+                    scalar=models.ScalarQuantizationConfig(
+                        type=models.ScalarType.INT8,
+                        always_ram=True,
+                    )
+                )
             
-            _ = self.client.create_collection(
+            _ = await self.client.create_collection(
                 collection_name=collection_name,
                 vectors_config=models.VectorParams(
                     size=embedding_size,
-                    distance=self.distance_method
-                )
+                    distance=self.distance_method,
+                    on_disk=self.on_disk,
+                ),
+                hnsw_config=hnsw_config,
+                quantization_config=quantization_config,
             )
 
+            # payload indexes let filtered searches skip non matching points
+            for field in MetadataIndexedFieldEnums:
+                field_schema = models.PayloadSchemaType.KEYWORD
+                if field == MetadataIndexedFieldEnums.PAGE_NUMBER:
+                    field_schema = models.PayloadSchemaType.INTEGER
+
+                _ = await self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=f"metadata.{field.value}",
+                    field_schema=field_schema,
+                )
+
+            self.catalog.invalidate(collection_name)
+
             return True
         
         return False
     
+    async def create_vector_index(self, collection_name: str, index_type: str = None):
+        # qdrant maintains its HNSW graph in the background while points are uploaded
+        return None
+
+    async def maintain_collections(self, prewarm: bool = True):
+        # segment vacuuming and optimization are handled by the qdrant optimizers
+        return None
+    
+    def build_point(self, record_id: int, text: str, vector: list, metadata: dict = None):
+        return models.PointStruct(
+            id=record_id,
+            vector=vector,
+            payload={
+                "text": text, "metadata": metadata
+            }
+        )
+
     async def insert_one(self, collection_name: str, text: str, vector: list,
                          metadata: dict = None, 
                          record_id: str = None):
         
-        if not self.is_collection_existed(collection_name):
+        if not await self.is_collection_existed(collection_name):
             self.logger.error(f"Can not insert new record to non-existed collection: {collection_name}")
             return False
         
         try:
-            _ = self.client.upload_records(
+            _ = await self.client.upsert(
                 collection_name=collection_name,
-                records=[
-                    models.Record(
-                        id=[record_id],
-                        vector=vector,
-                        payload={
-                            "text": text, "metadata": metadata
-                        }
-                    )
-                ]
+                points=[
+                    self.build_point(record_id=record_id, text=text, vector=vector, metadata=metadata)
+                ],
             )
         except Exception as e:
             self.logger.error(f"Error while inserting batch: {e}")
             return False
 
+        self.catalog.add_records(collection_name, 1)
+
         return True
     
     async def insert_many(self, collection_name: str, texts: list, 
@@ -100,53 +206,137 @@ class QdrantDBProvider(VectorDBInterface):
         if record_ids is None:
             record_ids = list(range(0, len(texts)))
 
-        for i in range(0, len(texts), batch_size):
-            batch_end = i + batch_size
-
-            batch_texts = texts[i:batch_end]
-            batch_vectors = vectors[i:batch_end]
-            batch_metadata = metadata[i:batch_end]
-            batch_record_ids = record_ids[i:batch_end]
-
-            batch_records = [
-                models.Record(
-                    id=batch_record_ids[x],
-                    vector=batch_vectors[x],
-                    payload={
-                        "text": batch_texts[x], "metadata": batch_metadata[x]
-                    }
-                )
+        # upload the batches concurrently, bounded by upload_parallel
+        semaphore = asyncio.Semaphore(self.upload_parallel)
 
-                for x in range(len(batch_texts))
+        async def upload_batch(batch_start: int):
+            batch_end = batch_start + batch_size
+            batch_points = [
+                self.build_point(record_id=record_id, text=text, vector=vector, metadata=_metadata)
+                for text, vector, _metadata, record_id in zip(texts[batch_start:batch_end],
+                                                              vectors[batch_start:batch_end],
+                                                              metadata[batch_start:batch_end],
+                                                              record_ids[batch_start:batch_end])
             ]
 
-            try:
-                _ = self.client.upload_records(
+            async with semaphore:
+                _ = await self.client.upsert(
                     collection_name=collection_name,
-                    records=batch_records,
+                    points=batch_points,
                 )
-            except Exception as e:
-                self.logger.error(f"Error while inserting batch: {e}")
-                return False
+
+        try:
+            await asyncio.gather(*[
+                upload_batch(batch_start) for batch_start in range(0, len(texts), batch_size)
+            ])
+        except Exception as e:
+            self.logger.error(f"Error while inserting batch: {e}")
+            return False
+
+        self.catalog.add_records(collection_name, len(texts))
 
         return True
         
-    async def search_by_vector(self, collection_name: str, vector: list, limit: int = 5):
+    def build_filter(self, metadata_filter: dict = None):
+
+        if not metadata_filter:
+            return None
+
+        conditions = []
+        for key, value in metadata_filter.items():
+            if isinstance(value, list):
+                match = models.MatchAny(any=value)
+            else:
+                match = models.MatchValue(value=value)
+
+            conditions.append(models.FieldCondition(key=f"metadata.{key}", match=match))
+
+        return models.Filter(must=conditions)
 
-        results = self.client.search(
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int = 5,
+                                     ef_search: int = None, probes: int = None,
+                                     metadata_filter: dict = None):
+
+        results = await self.client.search(
             collection_name=collection_name,
             query_vector=vector,
-            limit=limit
+            query_filter=self.build_filter(metadata_filter=metadata_filter),
+            limit=limit,
+            search_params=self.build_search_params(ef_search=ef_search),
         )
 
         if not results or len(results) == 0:
             return None
         
+        return self.to_retrieved_documents(results)
+
+    async def search_many(self, collection_name: str, vectors: list, limit: int = 5,
+                                ef_search: int = None, probes: int = None,
+                                metadata_filter: dict = None):
+
+        query_filter = self.build_filter(metadata_filter=metadata_filter)
+        search_params = self.build_search_params(ef_search=ef_search)
+
+        batch_results = await self.client.search_batch(
+            collection_name=collection_name,
+            requests=[
+                models.SearchRequest(
+                    vector=vector,
+                    filter=query_filter,
+                    limit=limit,
+                    params=search_params,
+                    with_payload=True,
+                )
+                for vector in vectors
+            ],
+        )
+
+        return [ self.to_retrieved_documents(results) for results in batch_results ]
+
+    def build_search_params(self, ef_search: int = None):
+
+        # qdrant has no ivfflat, so probes is ignored
+        if not ef_search and not self.scalar_quantization:
+            return None
+
+        quantization_params = None
+        if self.scalar_quantization:
+            quantization_params = models.QuantizationSearchParams(
+                rescore=True,
+                oversampling=self.oversampling,
+            )
+
+        return models.SearchParams(hnsw_ef=ef_search, quantization=quantization_params)
+
+    def to_retrieved_documents(self, results: list):
         return [
             RetrievedDocument(**{
                 "score": result.score,
                 "text": result.payload["text"],
+                "chunk_id": result.id,
+                "metadata": result.payload.get("metadata") or {},
             })
             for result in results
         ]
 
+    async def get_vectors(self, collection_name: str, chunk_ids: list) -> dict:
+
+        if not chunk_ids:
+            return {}
+
+        points = await self.client.retrieve(
+            collection_name=collection_name,
+            ids=list(chunk_ids),
+            with_payload=False,
+            with_vectors=True,
+        )
+
+        return { point.id: point.vector for point in points }
+
+    async def search_hybrid(self, collection_name: str, text: str, vector: list, limit: int = 5,
+                                  ef_search: int = None, probes: int = None,
+                                  metadata_filter: dict = None):
+        # the qdrant collections carry no lexical index, so hybrid search is vector only
+        return await self.search_by_vector(collection_name=collection_name, vector=vector, limit=limit,
+                                           ef_search=ef_search, probes=probes,
+                                           metadata_filter=metadata_filter)
@@ -0,0 +1,127 @@
+"""
+A local HTTP server that stands in for Ollama in the provider tests. Every request is held
+for `response_delay` plus `item_delay` per embedded text, so serialized or unbatched requests
+show up in the elapsed time. The first request for a model also pays `load_delay`, like
+Ollama loading it into memory. Streaming chats are answered with one NDJSON line per word.
+It records the request bodies and counts the connections it accepted, to check keep-alive reuse.
+
+Use it with `async with OllamaStub() as stub:` from async tests, or `with OllamaStub() as stub:`
+for the synchronous provider, which runs the server loop in a background thread.
+"""
+import asyncio
+import json
+import threading
+
+class OllamaStub:
+
+    def __init__(self, response_delay: float = 0.0, item_delay: float = 0.0, load_delay: float = 0.0,
+                       answer: str = "ok"):
+        self.response_delay = response_delay
+        self.item_delay = item_delay
+        self.load_delay = load_delay
+        self.answer = answer
+
+        self.requests = []
+        self.loaded_models = set()
+        self.connections_count = 0
+        self.writers = set()
+
+        self.server = None
+        self.url = None
+
+        self.loop = None
+        self.thread = None
+
+    async def handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections_count += 1
+        self.writers.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                headers = dict(
+                    line.lower().split(": ", 1) for line in head.decode("latin-1").split("\r\n")[1:] if ": " in line
+                )
+                request = json.loads(await reader.readexactly(int(headers.get("content-length", 0))) or b"{}")
+                self.requests.append(request)
+
+                delay = self.response_delay + self.item_delay * len(request.get("input", []))
+                if request.get("model") not in self.loaded_models:
+                    self.loaded_models.add(request.get("model"))
+                    delay += self.load_delay
+                await asyncio.sleep(delay)
+
+                if request.get("stream"):
+                    await self.stream_answer(writer)
+                    continue
+
+                if "input" in request:
+                    result = {"embeddings": [ [float(len(text)), 1.0] for text in request["input"] ]}
+                else:
+                    result = {"message": {"role": "assistant", "content": self.answer}, "done": True}
+
+                body = json.dumps(result).encode("utf-8")
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             + f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def stream_answer(self, writer: asyncio.StreamWriter):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\n\r\n")
+
+        words = self.answer.split(" ")
+        lines = [ {"message": {"role": "assistant", "content": word if i == 0 else " " + word}, "done": False}
+                  for i, word in enumerate(words) ] + [ {"message": {"role": "assistant", "content": ""}, "done": True} ]
+
+        for line in lines:
+            chunk = json.dumps(line).encode("utf-8") + b"\n"
+            writer.write(f"{len(chunk):x}\r\n".encode("latin-1") + chunk + b"\r\n")
+            await writer.drain()
+            await asyncio.sleep(self.item_delay)
+
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_request, "127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+        return self
+
+    async def stop(self):
+        self.server.close()
+        # keep-alive clients hold their connections open, newer Pythons wait for them on close
+        for writer in list(self.writers):
+            writer.close()
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def __enter__(self):
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def serve():
+            self.loop.run_until_complete(self.start())
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=serve, daemon=True)
+        self.thread.start()
+        started.wait()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
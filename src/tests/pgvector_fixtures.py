@@ -0,0 +1,73 @@
+"""
+Shared setup of the pgvector tests. They run against the database in PGVECTOR_TEST_URL
+(a postgresql+asyncpg URL) and are skipped when it is not set.
+Collection rows reference chunks(chunk_id), so the tests create the minirag tables and
+a throwaway project whose chunks back the inserted records.
+"""
+import os
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy import delete, text
+from models.db_schemes import Project, Asset, DataChunk
+from models.db_schemes.minirag.schemes.minirag_base import SQLAlchemyBase
+
+PGVECTOR_TEST_URL = os.environ.get("PGVECTOR_TEST_URL")
+
+requires_pgvector = pytest.mark.skipif(not PGVECTOR_TEST_URL, reason="PGVECTOR_TEST_URL is not set")
+
+def create_db_client(server_settings: dict = None):
+    engine = create_async_engine(PGVECTOR_TEST_URL,
+                                 connect_args={"server_settings": server_settings or {}})
+    db_client = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    return engine, db_client
+
+async def create_chunks(engine, db_client, count: int):
+
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLAlchemyBase.metadata.create_all)
+
+    async with db_client() as session:
+        async with session.begin():
+            project = Project()
+            session.add(project)
+            await session.flush()
+
+            asset = Asset(asset_type="file", asset_name="test", asset_size=0,
+                          asset_project_id=project.project_id)
+            session.add(asset)
+            await session.flush()
+
+            chunks = [
+                DataChunk(chunk_text=f"text {i}", chunk_order=i,
+                          chunk_project_id=project.project_id, chunk_asset_id=asset.asset_id)
+                for i in range(count)
+            ]
+            session.add_all(chunks)
+            await session.flush()
+
+            return project.project_id, [ chunk.chunk_id for chunk in chunks ]
+
+async def delete_chunks(db_client, project_id: int):
+
+    async with db_client() as session:
+        async with session.begin():
+            await session.execute(delete(DataChunk).where(DataChunk.chunk_project_id == project_id))
+            await session.execute(delete(Asset).where(Asset.asset_project_id == project_id))
+            await session.execute(delete(Project).where(Project.project_id == project_id))
+
+async def get_vector_version(engine) -> tuple:
+
+    async with engine.connect() as connection:
+        result = await connection.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+        version = result.scalar_one_or_none()
+
+    if not version:
+        return ()
+
+    return tuple(int(part) for part in version.split(".") if part.isdigit())
@@ -0,0 +1,107 @@
+"""
+LocalProvider against a tiny ONNX model built on the fly: a word level tokenizer and a
+model that looks the token ids up in a fixed embedding table. The expected embeddings are
+the masked mean of the table rows, L2-normalized, computed with NumPy.
+"""
+import asyncio
+import json
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+onnx = pytest.importorskip("onnx")
+
+from onnx import helper, TensorProto, numpy_helper
+from stores.llm.providers.LocalProvider import LocalProvider
+from stores.llm.LLMEnums import DocumentTypeEnum
+
+VOCAB = ["[PAD]", "[UNK]", "query:", "passage:", "hello", "world", "local", "embedding", "model", "test"]
+EMBEDDING_SIZE = 6
+
+EMBEDDING_TABLE = np.random.default_rng(0).normal(size=(len(VOCAB), EMBEDDING_SIZE)).astype(np.float32)
+
+def write_model(model_dir):
+
+    # token embeddings only: input_ids -> Gather(table) -> [batch, tokens, dim]
+    graph = helper.make_graph(
+        nodes=[ helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"]) ],
+        name="tiny_embedding",
+        inputs=[
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "tokens"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "tokens"]),
+        ],
+        outputs=[
+            helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT,
+                                          ["batch", "tokens", EMBEDDING_SIZE]),
+        ],
+        initializer=[ numpy_helper.from_array(EMBEDDING_TABLE, name="table") ],
+    )
+    model = helper.make_model(graph, opset_imports=[ helper.make_opsetid("", 13) ])
+    model.ir_version = 8
+    onnx.save(model, str(model_dir / "model.onnx"))
+
+    tokenizer = {
+        "version": "1.0",
+        "truncation": None,
+        "padding": None,
+        "added_tokens": [],
+        "normalizer": {"type": "Lowercase"},
+        "pre_tokenizer": {"type": "WhitespaceSplit"},
+        "post_processor": None,
+        "decoder": None,
+        "model": {
+            "type": "WordLevel",
+            "vocab": { token: idx for idx, token in enumerate(VOCAB) },
+            "unk_token": "[UNK]",
+        },
+    }
+    (model_dir / "tokenizer.json").write_text(json.dumps(tokenizer))
+
+def expected_embedding(text: str, max_length: int = 512):
+    ids = [ VOCAB.index(token) if token in VOCAB else VOCAB.index("[UNK]")
+            for token in text.lower().split() ][:max_length]
+    embedding = EMBEDDING_TABLE[ids].mean(axis=0)
+    return embedding / np.linalg.norm(embedding)
+
+@pytest.fixture
+def provider(tmp_path):
+    write_model(tmp_path)
+
+    provider = LocalProvider(models_dir=str(tmp_path.parent), embedding_batch_size=3,
+                             embedding_max_length=4, embedding_threads=2,
+                             query_prefix="query: ", document_prefix="passage: ")
+    provider.set_embedding_model(model_id=tmp_path.name, embedding_size=EMBEDDING_SIZE)
+
+    yield provider
+
+    asyncio.run(provider.aclose())
+
+def test_mean_pooling_and_normalization(provider):
+
+    # texts of different lengths are padded in the same batch, the padding must not count
+    texts = ["hello", "world local", "model", "embedding test", "hello unknown world"]
+    embeddings = provider.embed_text(texts, document_type=DocumentTypeEnum.DOCUMENT.value)
+
+    assert len(embeddings) == len(texts)
+    for text, embedding in zip(texts, embeddings):
+        # the document prefix is one more token, truncation keeps the first four
+        assert np.allclose(embedding, expected_embedding("passage: " + text, max_length=4), atol=1e-5)
+        assert np.linalg.norm(embedding) == pytest.approx(1.0, abs=1e-5)
+
+def test_query_prefix_and_truncation(provider):
+
+    embedding = provider.embed_text("hello world local embedding model",
+                                    document_type=DocumentTypeEnum.QUERY.value)[0]
+
+    # "query: hello world local embedding model" is cut to its first four tokens
+    assert np.allclose(embedding, expected_embedding("query: hello world local", max_length=4), atol=1e-5)
+
+def test_async_matches_sync(provider):
+
+    texts = [ " ".join(VOCAB[4:4 + n % 5 + 1]) for n in range(9) ]
+
+    sync_embeddings = provider.embed_text(texts)
+    async_embeddings = asyncio.run(provider.aembed_text(texts))
+
+    assert np.allclose(sync_embeddings, async_embeddings, atol=1e-6)
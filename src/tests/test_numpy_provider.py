@@ -0,0 +1,91 @@
+"""
+NumpyDBProvider exact search over memory-mapped collections, and the rollback of a failed
+append: a half written batch must not shift the rows of the next one.
+"""
+import asyncio
+import os
+import numpy as np
+import pytest
+
+from stores.vectordb.providers.NumpyDBProvider import NumpyDBProvider
+from stores.vectordb.VectorDBEnums import DistanceMethodEnums, NumpyFileEnums
+
+EMBEDDING_SIZE = 8
+COLLECTION_NAME = "collection_8_test"
+
+def create_provider(path: str):
+    return NumpyDBProvider(db_client=path, default_vector_size=EMBEDDING_SIZE,
+                           distance_method=DistanceMethodEnums.COSINE.value)
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> list:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return np.argsort(-scores)[:k].tolist()
+
+async def insert_and_search(path: str, vectors: np.ndarray, queries: np.ndarray):
+
+    provider = create_provider(path)
+    await provider.connect()
+    await provider.create_collection(collection_name=COLLECTION_NAME, embedding_size=EMBEDDING_SIZE)
+
+    for start in range(0, len(vectors), 40):
+        assert await provider.insert_many(collection_name=COLLECTION_NAME,
+                                          texts=[ f"text {i}" for i in range(start, start + 40) ],
+                                          vectors=vectors[start:start + 40].tolist(),
+                                          metadata=[ {"order": i} for i in range(start, start + 40) ],
+                                          record_ids=list(range(start, start + 40)))
+
+    # concurrent searches load the collection from several worker threads at once
+    return await asyncio.gather(*[
+        provider.search_by_vector(collection_name=COLLECTION_NAME, vector=query.tolist(), limit=5)
+        for query in queries
+    ])
+
+def test_exact_search(tmp_path):
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, EMBEDDING_SIZE)).astype(np.float32)
+    queries = rng.normal(size=(8, EMBEDDING_SIZE)).astype(np.float32)
+
+    results = asyncio.run(insert_and_search(str(tmp_path), vectors, queries))
+
+    for query, documents in zip(queries, results):
+        expected = exact_top_k(vectors, query, 5)
+        assert [ document.chunk_id for document in documents ] == expected
+        assert [ document.metadata["order"] for document in documents ] == expected
+
+async def insert_after_failed_append(path: str, vectors: np.ndarray):
+
+    provider = create_provider(path)
+    await provider.connect()
+    await provider.create_collection(collection_name=COLLECTION_NAME, embedding_size=EMBEDDING_SIZE)
+
+    assert await provider.insert_many(collection_name=COLLECTION_NAME, texts=["first"],
+                                      vectors=[vectors[0].tolist()], record_ids=[0])
+
+    sizes = [ os.path.getsize(provider.collection_path(COLLECTION_NAME, file_enum.value))
+              for file_enum in (NumpyFileEnums.VECTORS, NumpyFileEnums.RECORDS) ]
+
+    # the vectors land on disk, then the side file write fails on an unencodable record
+    with pytest.raises(UnicodeEncodeError):
+        provider.append_records(COLLECTION_NAME, '{"text": "\ud800"}\n',
+                                provider.prepare_vectors([vectors[1].tolist()]))
+
+    assert sizes == [ os.path.getsize(provider.collection_path(COLLECTION_NAME, file_enum.value))
+                      for file_enum in (NumpyFileEnums.VECTORS, NumpyFileEnums.RECORDS) ]
+
+    assert await provider.insert_many(collection_name=COLLECTION_NAME, texts=["second"],
+                                      vectors=[vectors[2].tolist()], record_ids=[2])
+
+    return await provider.search_by_vector(collection_name=COLLECTION_NAME,
+                                           vector=vectors[2].tolist(), limit=2)
+
+def test_failed_append_is_rolled_back(tmp_path):
+
+    vectors = np.random.default_rng(1).normal(size=(3, EMBEDDING_SIZE)).astype(np.float32)
+
+    documents = asyncio.run(insert_after_failed_append(str(tmp_path), vectors))
+
+    assert [ document.chunk_id for document in documents ] == [2, 0]
+    assert documents[0].text == "second"
+    assert documents[0].score == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,54 @@
+"""
+Concurrency check for the async Ollama provider: answers must not queue behind each
+other or behind embedding batches. The stub server holds every request for a fixed
+delay, so serialized requests show up in the elapsed time.
+"""
+import asyncio
+import time
+import pytest
+
+pytest.importorskip("httpx")
+
+from ollama_stub import OllamaStub
+from stores.llm.providers.OllamaProvider import OllamaProvider
+
+RESPONSE_DELAY = 0.3
+
+async def run_concurrent_requests(answers_count: int, embeddings_count: int):
+
+    async with OllamaStub(response_delay=RESPONSE_DELAY) as stub:
+        provider = OllamaProvider(api_url=stub.url, embedding_batch_size=1,
+                                  embedding_concurrency=2, generation_concurrency=answers_count)
+        provider.set_generation_model("test-model")
+        provider.set_embedding_model("test-embedding", embedding_size=2)
+
+        try:
+            # the embedding batches keep their whole pool busy while the answers run
+            embedding_task = asyncio.ensure_future(
+                provider.aembed_text([ f"text {i}" for i in range(embeddings_count) ])
+            )
+            await asyncio.sleep(0)
+
+            start_time = time.perf_counter()
+            answers = await asyncio.gather(*[
+                provider.agenerate_text(prompt=f"question {i}") for i in range(answers_count)
+            ])
+            elapsed = time.perf_counter() - start_time
+
+            embeddings = await embedding_task
+        finally:
+            await provider.aclose()
+
+    return embeddings, answers, elapsed
+
+def test_answers_run_concurrently_with_embeddings():
+
+    answers_count = 12
+    embeddings, answers, elapsed = asyncio.run(run_concurrent_requests(answers_count=answers_count,
+                                                                       embeddings_count=8))
+
+    assert len(embeddings) == 8
+    assert answers == ["ok"] * answers_count
+
+    # all answers share one round of the delay, on the shared 3 connection pool they took four
+    assert elapsed < RESPONSE_DELAY * 2.5
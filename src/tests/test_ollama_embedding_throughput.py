@@ -0,0 +1,59 @@
+"""
+Throughput of the Ollama embedding path against the stub server: one text per request on a
+single connection, batched requests, and batched requests on the pooled session. The stub
+charges a fixed overhead per request plus a small cost per text, like a model call that pays
+for the HTTP round trip and the scheduling of every forward pass (run with -s to see the rates).
+"""
+import time
+import pytest
+
+pytest.importorskip("requests")
+
+from ollama_stub import OllamaStub
+from stores.llm.providers.OllamaProvider import OllamaProvider
+
+TEXTS_COUNT = 64
+RESPONSE_DELAY = 0.02
+ITEM_DELAY = 0.001
+
+def embed_with(embedding_batch_size: int, embedding_concurrency: int):
+
+    with OllamaStub(response_delay=RESPONSE_DELAY, item_delay=ITEM_DELAY) as stub:
+        provider = OllamaProvider(api_url=stub.url, embedding_batch_size=embedding_batch_size,
+                                  embedding_concurrency=embedding_concurrency)
+        provider.set_embedding_model("test-embedding", embedding_size=2)
+        texts = [ "x" * (i + 1) for i in range(TEXTS_COUNT) ]
+
+        started_at = time.perf_counter()
+        if embedding_batch_size == 1 and embedding_concurrency == 1:
+            # the previous behaviour: one request per text, one after the other
+            embeddings = [ provider.embed_text(text)[0] for text in texts ]
+        else:
+            embeddings = provider.embed_text(texts)
+        elapsed = time.perf_counter() - started_at
+
+        provider.session.close()
+
+    # the stub answers with the text length, so the order is checked too
+    assert [ embedding[0] for embedding in embeddings ] == [ float(i + 1) for i in range(TEXTS_COUNT) ]
+
+    return TEXTS_COUNT / elapsed, len(stub.requests), stub.connections_count
+
+def test_batched_pooled_embedding_throughput():
+
+    sequential_rate, sequential_requests, sequential_connections = embed_with(1, 1)
+    batched_rate, batched_requests, _ = embed_with(16, 1)
+    pooled_rate, pooled_requests, pooled_connections = embed_with(16, 4)
+
+    print(f"\n{TEXTS_COUNT} texts: sequential {sequential_rate:,.0f} texts/sec, "
+          f"batched {batched_rate:,.0f} texts/sec, pooled {pooled_rate:,.0f} texts/sec")
+
+    assert sequential_requests == TEXTS_COUNT
+    assert batched_requests == pooled_requests == TEXTS_COUNT // 16
+
+    # keep-alive: the sequential requests reuse one connection, the pool opens one per worker
+    assert sequential_connections == 1
+    assert pooled_connections <= 4
+
+    assert batched_rate > sequential_rate * 3
+    assert pooled_rate > batched_rate * 2
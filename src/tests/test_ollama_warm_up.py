@@ -0,0 +1,69 @@
+"""
+Time to first token of the streaming Ollama path, cold and after awarm_up. The stub charges
+a model load delay on the first request for each model, like Ollama loading it into memory,
+so a cold provider pays it on the user's first answer and a warmed one does not (run with
+-s to see the numbers). The warm up must also send keep_alive and the system prompt as a
+system message, so the model stays loaded and the prefix matches the RAG requests.
+"""
+import asyncio
+import time
+import pytest
+
+pytest.importorskip("httpx")
+
+from ollama_stub import OllamaStub
+from stores.llm.providers.OllamaProvider import OllamaProvider
+from stores.llm.LLMEnums import OllamaEnums
+
+LOAD_DELAY = 0.5
+RESPONSE_DELAY = 0.01
+SYSTEM_PROMPT = "You are an assistant that answers from the provided documents."
+ANSWER = "the answer is in the second document"
+
+async def time_to_first_token(warm_up: bool):
+
+    async with OllamaStub(response_delay=RESPONSE_DELAY, load_delay=LOAD_DELAY, answer=ANSWER) as stub:
+        provider = OllamaProvider(api_url=stub.url, keep_alive="-1")
+        provider.set_generation_model("test-model")
+        provider.set_embedding_model("test-embedding", embedding_size=2)
+
+        try:
+            if warm_up:
+                assert await provider.awarm_up(system_prompt=SYSTEM_PROMPT)
+
+            chat_history = [ provider.construct_prompt(prompt=SYSTEM_PROMPT, role=OllamaEnums.SYSTEM.value) ]
+
+            start_time = time.perf_counter()
+            first_token_at = None
+            tokens = []
+            async for token in provider.astream_text(prompt="question", chat_history=chat_history):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                tokens.append(token)
+        finally:
+            await provider.aclose()
+
+    return first_token_at - start_time, "".join(tokens), stub.requests
+
+def test_warm_up_removes_model_load_from_first_token():
+
+    cold_ttft, cold_answer, cold_requests = asyncio.run(time_to_first_token(warm_up=False))
+    warm_ttft, warm_answer, warm_requests = asyncio.run(time_to_first_token(warm_up=True))
+
+    print(f"\ntime to first token: cold {1000 * cold_ttft:.0f} ms, warm {1000 * warm_ttft:.0f} ms")
+
+    assert cold_answer == warm_answer == ANSWER
+
+    assert cold_ttft >= LOAD_DELAY
+    assert warm_ttft < LOAD_DELAY / 2
+
+    # the warm up loads both models, the chat one over the system prompt alone
+    embed_request, chat_request, stream_request = warm_requests
+    assert embed_request["model"] == "test-embedding"
+    assert chat_request["model"] == "test-model"
+    assert chat_request["messages"] == [ {"role": OllamaEnums.SYSTEM.value, "content": SYSTEM_PROMPT} ]
+    assert chat_request["options"]["num_predict"] == 1
+
+    # the streamed request starts with the same prefix, every request keeps the model loaded
+    assert stream_request["messages"][0] == chat_request["messages"][0]
+    assert all(request["keep_alive"] == -1 for request in cold_requests + warm_requests)
@@ -0,0 +1,86 @@
+"""
+Collection catalog behaviour of the pgvector provider: only existing collections are
+cached, and a collection dropped behind the provider's back is evicted on the first
+undefined-table error instead of living on until the TTL runs out.
+"""
+import asyncio
+import uuid
+import pytest
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql import text as sql_text
+
+from pgvector_fixtures import requires_pgvector, create_db_client, create_chunks, delete_chunks
+from stores.vectordb.providers.PGVectorProvider import PGVectorProvider
+from stores.vectordb.VectorDBEnums import DistanceMethodEnums
+
+pytestmark = requires_pgvector
+
+EMBEDDING_SIZE = 4
+
+def create_provider(db_client):
+    return PGVectorProvider(db_client=db_client, default_vector_size=EMBEDDING_SIZE,
+                            distance_method=DistanceMethodEnums.COSINE.value,
+                            index_threshold=1000, catalog_ttl=3600)
+
+async def check_missing_collection_is_not_cached():
+
+    engine, db_client = create_db_client()
+    provider = create_provider(db_client)
+    collection_name = f"collection_{EMBEDDING_SIZE}_test_{uuid.uuid4().hex[:8]}"
+
+    project_id = None
+    try:
+        await provider.connect()
+        project_id, _ = await create_chunks(engine=engine, db_client=db_client, count=1)
+
+        assert not await provider.is_collection_existed(collection_name=collection_name)
+        assert provider.catalog.get(collection_name) is None
+
+        # created by another worker, the next probe must see it
+        other = create_provider(db_client)
+        await other.create_collection(collection_name=collection_name, embedding_size=EMBEDDING_SIZE)
+
+        assert await provider.is_collection_existed(collection_name=collection_name)
+    finally:
+        await provider.delete_collection(collection_name=collection_name)
+        if project_id is not None:
+            await delete_chunks(db_client=db_client, project_id=project_id)
+        await engine.dispose()
+
+async def check_dropped_collection_is_invalidated():
+
+    engine, db_client = create_db_client()
+    provider = create_provider(db_client)
+    collection_name = f"collection_{EMBEDDING_SIZE}_test_{uuid.uuid4().hex[:8]}"
+
+    project_id = None
+    try:
+        await provider.connect()
+        project_id, chunk_ids = await create_chunks(engine=engine, db_client=db_client, count=1)
+
+        await provider.create_collection(collection_name=collection_name, embedding_size=EMBEDDING_SIZE)
+        await provider.insert_many(collection_name=collection_name, texts=["text"],
+                                   vectors=[[0.1, 0.2, 0.3, 0.4]], record_ids=chunk_ids)
+        assert provider.catalog.get(collection_name).existed
+
+        # dropped behind the provider's back, the cached entry is now stale
+        async with engine.begin() as connection:
+            await connection.execute(sql_text(f"DROP TABLE {collection_name}"))
+
+        with pytest.raises(DBAPIError):
+            await provider.search_by_vector(collection_name=collection_name,
+                                            vector=[0.1, 0.2, 0.3, 0.4], limit=1)
+
+        assert provider.catalog.get(collection_name) is None
+        assert not await provider.is_collection_existed(collection_name=collection_name)
+    finally:
+        await provider.delete_collection(collection_name=collection_name)
+        if project_id is not None:
+            await delete_chunks(db_client=db_client, project_id=project_id)
+        await engine.dispose()
+
+def test_missing_collection_is_not_cached():
+    asyncio.run(check_missing_collection_is_not_cached())
+
+def test_dropped_collection_is_invalidated():
+    asyncio.run(check_dropped_collection_is_invalidated())
@@ -0,0 +1,87 @@
+"""
+Binary COPY ingest of pgvector collections: the rows written by COPY must read back the
+same as the ones written by the batched INSERT path, and the rows/sec of both modes are
+reported (run with -s to see them).
+"""
+import asyncio
+import time
+import uuid
+import numpy as np
+
+from pgvector_fixtures import requires_pgvector, create_db_client, create_chunks, delete_chunks
+from sqlalchemy.sql import text as sql_text
+from stores.vectordb.providers.PGVectorProvider import PGVectorProvider
+from stores.vectordb.VectorDBEnums import DistanceMethodEnums, PgVectorInsertModeEnums
+
+pytestmark = requires_pgvector
+
+EMBEDDING_SIZE = 384
+RECORDS_COUNT = 2000
+
+async def ingest(insert_mode: str, engine, db_client, chunk_ids: list, vectors: np.ndarray):
+
+    # a high threshold keeps index builds out of the timing
+    provider = PGVectorProvider(db_client=db_client, default_vector_size=EMBEDDING_SIZE,
+                                distance_method=DistanceMethodEnums.COSINE.value,
+                                index_threshold=RECORDS_COUNT * 10, insert_mode=insert_mode)
+    collection_name = f"collection_{EMBEDDING_SIZE}_test_{uuid.uuid4().hex[:8]}"
+
+    try:
+        await provider.create_collection(collection_name=collection_name, embedding_size=EMBEDDING_SIZE)
+
+        started_at = time.perf_counter()
+        inserted = await provider.insert_many(collection_name=collection_name,
+                                              texts=[ f"text {i}" for i in range(RECORDS_COUNT) ],
+                                              vectors=vectors.tolist(),
+                                              metadata=[ {"order": i} for i in range(RECORDS_COUNT) ],
+                                              record_ids=chunk_ids,
+                                              batch_size=500)
+        elapsed = time.perf_counter() - started_at
+        assert inserted
+
+        async with engine.connect() as connection:
+            result = await connection.execute(sql_text(
+                f"SELECT text, vector::text AS vector, metadata, chunk_id FROM {collection_name} ORDER BY chunk_id"
+            ))
+            rows = result.fetchall()
+
+        return rows, RECORDS_COUNT / elapsed
+    finally:
+        await provider.delete_collection(collection_name=collection_name)
+
+async def compare_insert_modes():
+
+    engine, db_client = create_db_client()
+
+    project_id = None
+    try:
+        await PGVectorProvider(db_client=db_client).connect()
+        project_id, chunk_ids = await create_chunks(engine=engine, db_client=db_client, count=RECORDS_COUNT)
+
+        vectors = np.random.default_rng(0).uniform(-1, 1, (RECORDS_COUNT, EMBEDDING_SIZE)).astype(np.float32)
+
+        insert_rows, insert_rate = await ingest(PgVectorInsertModeEnums.INSERT.value, engine, db_client, chunk_ids, vectors)
+        copy_rows, copy_rate = await ingest(PgVectorInsertModeEnums.COPY.value, engine, db_client, chunk_ids, vectors)
+
+        return insert_rows, insert_rate, copy_rows, copy_rate
+    finally:
+        if project_id is not None:
+            await delete_chunks(db_client=db_client, project_id=project_id)
+        await engine.dispose()
+
+def parse_vector(value: str) -> np.ndarray:
+    return np.array([ float(v) for v in value.strip("[]").split(",") ], dtype=np.float32)
+
+def test_copy_matches_insert():
+
+    insert_rows, insert_rate, copy_rows, copy_rate = asyncio.run(compare_insert_modes())
+    print(f"\n{RECORDS_COUNT} rows x {EMBEDDING_SIZE} dims: "
+          f"insert {insert_rate:,.0f} rows/sec, copy {copy_rate:,.0f} rows/sec "
+          f"({copy_rate / insert_rate:.1f}x)")
+
+    assert len(copy_rows) == len(insert_rows) == RECORDS_COUNT
+    for insert_row, copy_row in zip(insert_rows, copy_rows):
+        assert copy_row.text == insert_row.text
+        assert copy_row.metadata == insert_row.metadata
+        assert copy_row.chunk_id == insert_row.chunk_id
+        assert np.allclose(parse_vector(copy_row.vector), parse_vector(insert_row.vector))
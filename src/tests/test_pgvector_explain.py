@@ -0,0 +1,67 @@
+"""
+Plan checks for the pgvector search SQL: the ORDER BY operator has to match the index
+operator class, otherwise the planner falls back to a full scan and sort.
+"""
+import asyncio
+import random
+import uuid
+import pytest
+
+from pgvector_fixtures import requires_pgvector, create_db_client, create_chunks, delete_chunks
+from stores.vectordb.providers.PGVectorProvider import PGVectorProvider
+from stores.vectordb.VectorDBEnums import DistanceMethodEnums, PgVectorIndexTypeEnums
+
+pytestmark = requires_pgvector
+
+EMBEDDING_SIZE = 16
+RECORDS_COUNT = 2000
+
+async def explain_indexed_search(index_type: str, distance_method: str):
+
+    # seq scans are disabled so the plan shows whether the index is usable at all,
+    # not whether the planner prefers it on a tiny table
+    engine, db_client = create_db_client(server_settings={"enable_seqscan": "off"})
+
+    provider = PGVectorProvider(db_client=db_client, default_vector_size=EMBEDDING_SIZE,
+                                distance_method=distance_method, index_threshold=1)
+    collection_name = f"collection_{EMBEDDING_SIZE}_test_{uuid.uuid4().hex[:8]}"
+
+    project_id = None
+    try:
+        await provider.connect()
+        project_id, chunk_ids = await create_chunks(engine=engine, db_client=db_client, count=RECORDS_COUNT)
+
+        await provider.create_collection(collection_name=collection_name, embedding_size=EMBEDDING_SIZE)
+
+        vectors = [ [ random.uniform(-1, 1) for _ in range(EMBEDDING_SIZE) ] for _ in range(RECORDS_COUNT) ]
+        await provider.insert_many(collection_name=collection_name,
+                                   texts=[ f"text {i}" for i in range(RECORDS_COUNT) ],
+                                   vectors=vectors,
+                                   record_ids=chunk_ids,
+                                   batch_size=500)
+
+        await provider.create_vector_index(collection_name=collection_name, index_type=index_type)
+
+        return await provider.explain_search_by_vector(collection_name=collection_name,
+                                                       vector=vectors[0], limit=5)
+    finally:
+        await provider.delete_collection(collection_name=collection_name)
+        if project_id is not None:
+            await delete_chunks(db_client=db_client, project_id=project_id)
+        await engine.dispose()
+
+@pytest.mark.parametrize("index_type", [
+    PgVectorIndexTypeEnums.HNSW.value,
+    PgVectorIndexTypeEnums.IVFFLAT.value,
+])
+@pytest.mark.parametrize("distance_method", [
+    DistanceMethodEnums.COSINE.value,
+    DistanceMethodEnums.DOT.value,
+])
+def test_search_uses_vector_index(index_type, distance_method):
+
+    explain = asyncio.run(explain_indexed_search(index_type=index_type, distance_method=distance_method))
+
+    plan = "\n".join(explain["plan"])
+    assert explain["uses_index"], plan
+    assert "Index Scan" in plan, plan
@@ -0,0 +1,81 @@
+"""
+Normalized vector storage of the pgvector provider: with unit length vectors a cosine
+collection is searched with inner product (<#>, vector_ip_ops). A collection indexed with
+vector_cosine_ops before the switch can not use its index any more, so searching it must
+fail loudly until reset_vector_index rebuilds the index with the new operator class.
+"""
+import asyncio
+import uuid
+import numpy as np
+import pytest
+
+from pgvector_fixtures import requires_pgvector, create_db_client, create_chunks, delete_chunks
+from stores.vectordb.providers.PGVectorProvider import PGVectorProvider
+from stores.vectordb.VectorDBEnums import DistanceMethodEnums, PgVectorDistanceMethodEnums
+
+pytestmark = requires_pgvector
+
+EMBEDDING_SIZE = 16
+RECORDS_COUNT = 50
+TOP_K = 5
+
+def create_provider(db_client, normalized_vectors: bool):
+    return PGVectorProvider(db_client=db_client, default_vector_size=EMBEDDING_SIZE,
+                            distance_method=DistanceMethodEnums.COSINE.value,
+                            index_threshold=1, normalized_vectors=normalized_vectors)
+
+async def switch_to_normalized(vectors: np.ndarray, query: np.ndarray):
+
+    engine, db_client = create_db_client()
+    cosine_provider = create_provider(db_client, normalized_vectors=False)
+    collection_name = f"collection_{EMBEDDING_SIZE}_test_{uuid.uuid4().hex[:8]}"
+
+    project_id = None
+    try:
+        await cosine_provider.connect()
+        project_id, chunk_ids = await create_chunks(engine=engine, db_client=db_client, count=RECORDS_COUNT)
+        await cosine_provider.create_collection(collection_name=collection_name, embedding_size=EMBEDDING_SIZE)
+        await cosine_provider.insert_many(collection_name=collection_name,
+                                          texts=[ f"text {i}" for i in range(RECORDS_COUNT) ],
+                                          vectors=vectors.tolist(),
+                                          record_ids=chunk_ids)
+        assert await cosine_provider.create_vector_index(collection_name=collection_name)
+
+        normalized_provider = create_provider(db_client, normalized_vectors=True)
+
+        with pytest.raises(ValueError, match=PgVectorDistanceMethodEnums.COSINE.value):
+            await normalized_provider.search_by_vector(collection_name=collection_name,
+                                                       vector=query.tolist(), limit=TOP_K)
+
+        # creating the index again does not hide the mismatch either
+        with pytest.raises(ValueError, match="reset_vector_index"):
+            await normalized_provider.create_vector_index(collection_name=collection_name)
+
+        index_report = await normalized_provider.reset_vector_index(collection_name=collection_name)
+        assert index_report["index_name"] == normalized_provider.default_index_name(collection_name)
+
+        stats = await normalized_provider.load_collection_stats(collection_name=collection_name)
+        assert stats.info["index_opclass"] == PgVectorDistanceMethodEnums.INNER_PRODUCT.value
+
+        documents = await normalized_provider.search_by_vector(collection_name=collection_name,
+                                                               vector=query.tolist(), limit=TOP_K)
+
+        positions = { chunk_id: position for position, chunk_id in enumerate(chunk_ids) }
+        return [ positions[document.chunk_id] for document in documents ]
+    finally:
+        await cosine_provider.delete_collection(collection_name=collection_name)
+        if project_id is not None:
+            await delete_chunks(db_client=db_client, project_id=project_id)
+        await engine.dispose()
+
+def test_opclass_mismatch_fails_until_reindexed():
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(RECORDS_COUNT, EMBEDDING_SIZE)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query = vectors[7]
+
+    result = asyncio.run(switch_to_normalized(vectors, query))
+
+    # the search is exact on 50 rows, inner product ranks unit vectors like cosine
+    assert result == np.argsort(-(vectors @ query))[:TOP_K].tolist()
@@ -0,0 +1,109 @@
+"""
+halfvec and binary-quantized pgvector storage. The binary Hamming scan plus full precision
+re-rank must return the exact top-k when the candidates cover the table, and recall@k and
+latency of each storage type are reported against exact search (run with -s to see them).
+halfvec, binary_quantize and bit_hamming_ops need pgvector 0.7 or newer.
+"""
+import asyncio
+import time
+import uuid
+import numpy as np
+import pytest
+
+from pgvector_fixtures import (requires_pgvector, create_db_client, create_chunks,
+                               delete_chunks, get_vector_version)
+from stores.vectordb.providers.PGVectorProvider import PGVectorProvider
+from stores.vectordb.VectorDBEnums import DistanceMethodEnums, PgVectorStorageTypeEnums
+
+pytestmark = requires_pgvector
+
+QUANTIZATION_MIN_VERSION = (0, 7)
+TOP_K = 10
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> list:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return np.argsort(-scores)[:k].tolist()
+
+async def search_storage_type(storage_type: str, vectors: np.ndarray, queries: np.ndarray,
+                              rerank_factor: int, ef_search: int = None):
+
+    engine, db_client = create_db_client()
+    records_count, embedding_size = vectors.shape
+
+    provider = PGVectorProvider(db_client=db_client, default_vector_size=embedding_size,
+                                distance_method=DistanceMethodEnums.COSINE.value,
+                                index_threshold=1, storage_type=storage_type,
+                                rerank_factor=rerank_factor)
+    collection_name = f"collection_{embedding_size}_test_{uuid.uuid4().hex[:8]}"
+
+    project_id = None
+    try:
+        await provider.connect()
+        if await get_vector_version(engine) < QUANTIZATION_MIN_VERSION:
+            pytest.skip(f"{storage_type} storage needs pgvector {QUANTIZATION_MIN_VERSION} or newer")
+
+        project_id, chunk_ids = await create_chunks(engine=engine, db_client=db_client, count=records_count)
+        await provider.create_collection(collection_name=collection_name, embedding_size=embedding_size)
+        await provider.insert_many(collection_name=collection_name,
+                                   texts=[ f"text {i}" for i in range(records_count) ],
+                                   vectors=vectors.tolist(),
+                                   record_ids=chunk_ids,
+                                   batch_size=500)
+        assert await provider.create_vector_index(collection_name=collection_name)
+
+        positions = { chunk_id: position for position, chunk_id in enumerate(chunk_ids) }
+        results, latencies = [], []
+        for query in queries:
+            started_at = time.perf_counter()
+            documents = await provider.search_by_vector(collection_name=collection_name,
+                                                        vector=query.tolist(), limit=TOP_K,
+                                                        ef_search=ef_search)
+            latencies.append(time.perf_counter() - started_at)
+            results.append([ positions[document.chunk_id] for document in documents ])
+
+        return results, latencies
+    finally:
+        await provider.delete_collection(collection_name=collection_name)
+        if project_id is not None:
+            await delete_chunks(db_client=db_client, project_id=project_id)
+        await engine.dispose()
+
+def test_binary_rerank_matches_exact_search():
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 64)).astype(np.float32)
+    queries = rng.normal(size=(5, 64)).astype(np.float32)
+
+    # 10 * 20 candidates cover all 200 rows, so the re-rank sees every row
+    results, _ = asyncio.run(search_storage_type(PgVectorStorageTypeEnums.BINARY.value,
+                                                 vectors=vectors, queries=queries,
+                                                 rerank_factor=20))
+
+    for query, result in zip(queries, results):
+        assert result == exact_top_k(vectors, query, TOP_K)
+
+def test_storage_types_recall_and_latency():
+
+    rng = np.random.default_rng(1)
+    # clustered data, closer to real embeddings than uniform noise
+    centers = rng.normal(size=(20, 128))
+    vectors = (centers[rng.integers(0, 20, 2000)] + 0.5 * rng.normal(size=(2000, 128))).astype(np.float32)
+    queries = (centers[rng.integers(0, 20, 20)] + 0.5 * rng.normal(size=(20, 128))).astype(np.float32)
+
+    expected = [ exact_top_k(vectors, query, TOP_K) for query in queries ]
+
+    report = {}
+    for storage_type in PgVectorStorageTypeEnums:
+        results, latencies = asyncio.run(search_storage_type(storage_type.value,
+                                                             vectors=vectors, queries=queries,
+                                                             rerank_factor=10, ef_search=100))
+        recall = np.mean([ len(set(result) & set(exact)) / TOP_K
+                           for result, exact in zip(results, expected) ])
+        report[storage_type.value] = recall
+        print(f"\n{storage_type.value}: recall@{TOP_K} {recall:.3f}, "
+              f"mean latency {1000 * np.mean(latencies):.2f} ms")
+
+    assert report[PgVectorStorageTypeEnums.VECTOR.value] >= 0.9
+    assert report[PgVectorStorageTypeEnums.HALFVEC.value] >= report[PgVectorStorageTypeEnums.VECTOR.value] - 0.05
+    assert report[PgVectorStorageTypeEnums.BINARY.value] >= 0.8
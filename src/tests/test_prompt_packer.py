@@ -0,0 +1,80 @@
+"""
+PromptPacker budgets: the packed prompt never exceeds max_input_tokens, the chunks keep
+their retrieval order, and the first chunk that does not fit whole is cut rather than
+dropped when enough room is left. Runs with the tiktoken encoding when its BPE file can be
+loaded, and always with the character estimate used offline.
+"""
+import pytest
+
+from stores.llm.PromptPacker import PromptPacker
+
+SYSTEM_PROMPT = "Answer the question using the documents below."
+FOOTER_PROMPT = "Question: what do the documents say?\nAnswer:"
+
+CHUNKS = [ f"chunk {i} " + "lorem ipsum dolor sit amet " * 20 for i in range(10) ]
+
+def render_chunk(index: int, chunk: str):
+    return f"## Document No: {index}\n### Content: {chunk}"
+
+@pytest.fixture(params=[None, "cl100k_base"])
+def encoding_name(request):
+    return request.param
+
+def create_packer(encoding_name: str, max_input_tokens: int = None, min_chunk_tokens: int = 64):
+
+    packer = PromptPacker(max_input_tokens=max_input_tokens, encoding_name=encoding_name,
+                          min_chunk_tokens=min_chunk_tokens)
+    if encoding_name and packer.encoding is None:
+        pytest.skip(f"The {encoding_name} encoding can not be loaded")
+
+    return packer
+
+def assemble(packed):
+    return "\n".join([ SYSTEM_PROMPT, "\n".join(packed.documents_prompts), "", FOOTER_PROMPT ])
+
+def test_everything_fits_without_a_budget(encoding_name):
+
+    packer = create_packer(encoding_name)
+    packed = packer.pack(SYSTEM_PROMPT, FOOTER_PROMPT, CHUNKS, render_chunk)
+
+    assert packed.documents_prompts == [ render_chunk(i + 1, chunk) for i, chunk in enumerate(CHUNKS) ]
+    assert packed.packed_chunks == len(CHUNKS)
+    assert packed.dropped_chunks == 0
+
+def test_budget_truncates_and_keeps_order(encoding_name):
+
+    full_tokens = create_packer(encoding_name).pack(SYSTEM_PROMPT, FOOTER_PROMPT, CHUNKS, render_chunk).prompt_tokens
+
+    for max_input_tokens in (full_tokens // 4, full_tokens // 2, full_tokens - 10):
+        packer = create_packer(encoding_name, max_input_tokens=max_input_tokens, min_chunk_tokens=8)
+        packed = packer.pack(SYSTEM_PROMPT, FOOTER_PROMPT, CHUNKS, render_chunk)
+
+        assert packed.packed_chunks > 0
+        assert packed.packed_chunks + packed.dropped_chunks == len(CHUNKS)
+        assert packed.prompt_tokens <= max_input_tokens
+        assert packer.count_tokens(assemble(packed)) <= max_input_tokens
+
+        # best chunks first, numbered in retrieval order; only the last one may be cut
+        for i, chunk_prompt in enumerate(packed.documents_prompts[:-1]):
+            assert chunk_prompt == render_chunk(i + 1, CHUNKS[i])
+
+        last = packed.packed_chunks - 1
+        last_prompt = packed.documents_prompts[-1]
+        assert last_prompt.startswith(render_chunk(last + 1, CHUNKS[last][:8]))
+        assert CHUNKS[last].startswith(last_prompt[len(render_chunk(last + 1, "")):])
+
+        # something had to give: the last chunk is cut, or the tail is dropped
+        assert packed.dropped_chunks > 0 or last_prompt != render_chunk(last + 1, CHUNKS[last])
+
+def test_small_remainder_is_dropped(encoding_name):
+
+    packer = create_packer(encoding_name)
+    first_chunk_tokens = packer.count_tokens(render_chunk(1, CHUNKS[0]) + "\n")
+    base_tokens = packer.pack(SYSTEM_PROMPT, FOOTER_PROMPT, [], render_chunk).prompt_tokens
+
+    # the first chunk fits whole, the room left for the second is below min_chunk_tokens
+    packer = create_packer(encoding_name, max_input_tokens=base_tokens + first_chunk_tokens + 20)
+    packed = packer.pack(SYSTEM_PROMPT, FOOTER_PROMPT, CHUNKS, render_chunk)
+
+    assert packed.documents_prompts == [ render_chunk(1, CHUNKS[0]) ]
+    assert packed.dropped_chunks == len(CHUNKS) - 1
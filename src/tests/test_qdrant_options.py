@@ -0,0 +1,101 @@
+"""
+Benchmark of the Qdrant collection options: HNSW m / ef_construct, int8 scalar quantization
+and on-disk original vectors. Each configuration gets its own collection, and the upload
+time, search latency and recall@k against exact search are reported (run with -s to see them).
+
+The embedded mode searches by brute force and ignores the index options, so it only checks
+that the options are accepted and keep recall. Point QDRANT_TEST_URL at a Qdrant server to
+get meaningful latency numbers.
+"""
+import asyncio
+import os
+import time
+import uuid
+import numpy as np
+import pytest
+
+pytest.importorskip("qdrant_client")
+
+from stores.vectordb.providers.QdrantDBProvider import QdrantDBProvider
+from stores.vectordb.VectorDBEnums import DistanceMethodEnums
+
+QDRANT_TEST_URL = os.environ.get("QDRANT_TEST_URL")
+
+EMBEDDING_SIZE = 128
+RECORDS_COUNT = int(os.environ.get("QDRANT_BENCHMARK_RECORDS", 5000))
+QUERIES_COUNT = 50
+TOP_K = 10
+
+CONFIGURATIONS = {
+    "default": {},
+    "hnsw_m32": {"hnsw_m": 32, "hnsw_ef_construct": 200},
+    "int8": {"scalar_quantization": True},
+    "int8_on_disk": {"scalar_quantization": True, "on_disk": True},
+}
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> list:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return np.argsort(-scores)[:k].tolist()
+
+async def benchmark_configuration(path: str, options: dict, vectors: np.ndarray, queries: np.ndarray):
+
+    provider = QdrantDBProvider(db_client=None if QDRANT_TEST_URL else path, url=QDRANT_TEST_URL,
+                                default_vector_size=EMBEDDING_SIZE,
+                                distance_method=DistanceMethodEnums.COSINE.value, **options)
+    collection_name = f"collection_{EMBEDDING_SIZE}_test_{uuid.uuid4().hex[:8]}"
+
+    await provider.connect()
+    try:
+        await provider.create_collection(collection_name=collection_name, embedding_size=EMBEDDING_SIZE)
+
+        started_at = time.perf_counter()
+        assert await provider.insert_many(collection_name=collection_name,
+                                          texts=[ f"text {i}" for i in range(len(vectors)) ],
+                                          vectors=vectors.tolist(),
+                                          record_ids=list(range(len(vectors))),
+                                          batch_size=256)
+        upload_duration = time.perf_counter() - started_at
+
+        results, latencies = [], []
+        for query in queries:
+            started_at = time.perf_counter()
+            documents = await provider.search_by_vector(collection_name=collection_name,
+                                                        vector=query.tolist(), limit=TOP_K)
+            latencies.append(time.perf_counter() - started_at)
+            results.append([ document.chunk_id for document in documents ])
+
+        return upload_duration, results, latencies
+    finally:
+        await provider.delete_collection(collection_name=collection_name)
+        await provider.disconnect()
+
+def test_collection_options_benchmark(tmp_path):
+
+    rng = np.random.default_rng(0)
+    # clustered data, closer to real embeddings than uniform noise
+    centers = rng.normal(size=(50, EMBEDDING_SIZE))
+    vectors = (centers[rng.integers(0, 50, RECORDS_COUNT)]
+               + 0.5 * rng.normal(size=(RECORDS_COUNT, EMBEDDING_SIZE))).astype(np.float32)
+    queries = (centers[rng.integers(0, 50, QUERIES_COUNT)]
+               + 0.5 * rng.normal(size=(QUERIES_COUNT, EMBEDDING_SIZE))).astype(np.float32)
+
+    expected = [ exact_top_k(vectors, query, TOP_K) for query in queries ]
+
+    print(f"\n{RECORDS_COUNT} x {EMBEDDING_SIZE} vectors, "
+          f"{'server ' + QDRANT_TEST_URL if QDRANT_TEST_URL else 'embedded mode'}")
+
+    for name, options in CONFIGURATIONS.items():
+        upload_duration, results, latencies = asyncio.run(benchmark_configuration(
+            str(tmp_path / name), options=options, vectors=vectors, queries=queries,
+        ))
+        recall = np.mean([ len(set(result) & set(exact)) / TOP_K
+                           for result, exact in zip(results, expected) ])
+
+        print(f"{name}: upload {RECORDS_COUNT / upload_duration:,.0f} points/sec, "
+              f"recall@{TOP_K} {recall:.3f}, "
+              f"p50 latency {1000 * np.percentile(latencies, 50):.2f} ms, "
+              f"p95 latency {1000 * np.percentile(latencies, 95):.2f} ms")
+
+        # rescoring with the original vectors keeps int8 recall close to full precision
+        assert recall >= 0.9, name
@@ -0,0 +1,73 @@
+"""
+QdrantDBProvider on the AsyncQdrantClient. The tests use the embedded on-disk mode under
+a temporary path, or the server in QDRANT_TEST_URL when it is set.
+"""
+import asyncio
+import os
+import uuid
+import numpy as np
+import pytest
+
+pytest.importorskip("qdrant_client")
+
+from stores.vectordb.providers.QdrantDBProvider import QdrantDBProvider
+from stores.vectordb.VectorDBEnums import DistanceMethodEnums
+
+QDRANT_TEST_URL = os.environ.get("QDRANT_TEST_URL")
+
+EMBEDDING_SIZE = 16
+RECORDS_COUNT = 230
+
+def create_provider(path: str, **kwargs):
+    return QdrantDBProvider(db_client=None if QDRANT_TEST_URL else path, url=QDRANT_TEST_URL,
+                            default_vector_size=EMBEDDING_SIZE,
+                            distance_method=DistanceMethodEnums.COSINE.value, **kwargs)
+
+async def create_upsert_search(path: str):
+
+    provider = create_provider(path, upload_parallel=3)
+    collection_name = f"collection_{EMBEDDING_SIZE}_test_{uuid.uuid4().hex[:8]}"
+
+    vectors = np.random.default_rng(0).normal(size=(RECORDS_COUNT, EMBEDDING_SIZE)).astype(np.float32)
+
+    await provider.connect()
+    try:
+        assert await provider.create_collection(collection_name=collection_name, embedding_size=EMBEDDING_SIZE)
+        assert not await provider.create_collection(collection_name=collection_name, embedding_size=EMBEDDING_SIZE)
+
+        # several batches, uploaded concurrently
+        assert await provider.insert_many(collection_name=collection_name,
+                                          texts=[ f"text {i}" for i in range(RECORDS_COUNT) ],
+                                          vectors=vectors.tolist(),
+                                          metadata=[ {"order": i} for i in range(RECORDS_COUNT) ],
+                                          record_ids=list(range(RECORDS_COUNT)),
+                                          batch_size=50)
+        assert await provider.insert_one(collection_name=collection_name, text="extra",
+                                         vector=(-vectors[0]).tolist(), record_id=RECORDS_COUNT)
+
+        # the catalog counts the local inserts, the collection info reflects the upserts
+        provider.catalog.invalidate(collection_name)
+        info = await provider.get_collection_info(collection_name=collection_name)
+
+        results = await provider.search_by_vector(collection_name=collection_name,
+                                                  vector=vectors[7].tolist(), limit=3)
+
+        return info, results
+    finally:
+        await provider.delete_collection(collection_name=collection_name)
+        assert not await provider.is_collection_existed(collection_name=collection_name)
+        await provider.disconnect()
+
+def test_create_upsert_search(tmp_path):
+
+    info, results = asyncio.run(create_upsert_search(str(tmp_path / "qdrant")))
+
+    assert info["embedding_size"] == EMBEDDING_SIZE
+    assert info["record_count"] == RECORDS_COUNT + 1
+
+    assert len(results) == 3
+    assert results[0].chunk_id == 7
+    assert results[0].text == "text 7"
+    assert results[0].metadata == {"order": 7}
+    assert results[0].score == pytest.approx(1.0, abs=1e-4)
+    assert results[0].score >= results[1].score >= results[2].score
@@ -0,0 +1,109 @@
+"""
+RequestCoalescer single-flight: identical concurrent requests share one call and its
+result, different requests do not, and nothing is kept once the call is done. A caller
+going away must not cancel the call the others are waiting on.
+"""
+import asyncio
+import pytest
+
+pytest.importorskip("prometheus_client")
+pytest.importorskip("fastapi")
+
+from stores.llm.RequestCoalescer import RequestCoalescer
+from utils.metrics import COALESCED_REQUESTS
+
+class CountingCall:
+
+    def __init__(self, result: str = "answer", delay: float = 0.05, error: Exception = None):
+        self.result = result
+        self.delay = delay
+        self.error = error
+        self.calls_count = 0
+
+    async def __call__(self):
+        self.calls_count += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+
+        return self.result
+
+def build_key(coalescer: RequestCoalescer, text: str, **params):
+    return coalescer.build_key(project_id=1, index_version=3, text=text, limit=5,
+                               model_id="test-model", **params)
+
+async def run_identical_requests(requests_count: int):
+
+    coalescer = RequestCoalescer()
+    call = CountingCall()
+
+    # the question differs only in case and spacing, the key is the same
+    texts = [ "What is  RAG?" if i % 2 else "what is rag?" for i in range(requests_count) ]
+    results = await asyncio.gather(*[
+        coalescer.run(build_key(coalescer, text), call) for text in texts
+    ])
+
+    return results, call.calls_count, coalescer.in_flight
+
+def test_identical_concurrent_requests_share_one_call():
+
+    coalesced_before = COALESCED_REQUESTS._value.get()
+
+    results, calls_count, in_flight = asyncio.run(run_identical_requests(requests_count=8))
+
+    assert results == ["answer"] * 8
+    assert calls_count == 1
+    assert COALESCED_REQUESTS._value.get() - coalesced_before == 7
+    assert in_flight == {}
+
+async def run_different_and_sequential_requests():
+
+    coalescer = RequestCoalescer()
+    call = CountingCall()
+
+    await asyncio.gather(
+        coalescer.run(build_key(coalescer, "what is rag?"), call),
+        coalescer.run(build_key(coalescer, "what is rag?", temperature=0.7), call),
+        coalescer.run(build_key(coalescer, "what is a vector index?"), call),
+    )
+    concurrent_calls = call.calls_count
+
+    # the finished call is not kept, the same question asked again runs again
+    await coalescer.run(build_key(coalescer, "what is rag?"), call)
+
+    return concurrent_calls, call.calls_count
+
+def test_different_or_later_requests_are_not_coalesced():
+
+    concurrent_calls, total_calls = asyncio.run(run_different_and_sequential_requests())
+
+    assert concurrent_calls == 3
+    assert total_calls == 4
+
+async def run_with_failure_and_cancellation():
+
+    coalescer = RequestCoalescer()
+    key = build_key(coalescer, "what is rag?")
+
+    failing_call = CountingCall(error=RuntimeError("model is down"))
+    failures = await asyncio.gather(*[ coalescer.run(key, failing_call) for _ in range(3) ],
+                                    return_exceptions=True)
+
+    call = CountingCall()
+    leaving = asyncio.ensure_future(coalescer.run(key, call))
+    staying = asyncio.ensure_future(coalescer.run(key, call))
+    await asyncio.sleep(0.01)
+    leaving.cancel()
+
+    return failures, failing_call.calls_count, await staying, leaving.cancelled(), call.calls_count
+
+def test_errors_are_shared_and_cancellation_is_isolated():
+
+    failures, failing_calls, result, leaving_cancelled, calls_count = asyncio.run(run_with_failure_and_cancellation())
+
+    assert failing_calls == 1
+    assert all(isinstance(failure, RuntimeError) for failure in failures)
+
+    assert leaving_cancelled
+    assert result == "answer"
+    assert calls_count == 1
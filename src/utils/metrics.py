@@ -6,6 +6,20 @@ import time
 # Define metrics
 REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP Requests', ['method', 'endpoint', 'status'])
 REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP Request Latency', ['method', 'endpoint'])
+RETRIEVAL_CACHE_HITS = Counter('retrieval_cache_hits_total', 'Retrieval cache hits')
+RETRIEVAL_CACHE_MISSES = Counter('retrieval_cache_misses_total', 'Retrieval cache misses')
+ANSWER_CACHE_HITS = Counter('answer_cache_hits_total', 'Semantic answer cache hits')
+ANSWER_CACHE_MISSES = Counter('answer_cache_misses_total', 'Semantic answer cache misses')
+LLM_TIME_TO_FIRST_TOKEN = Histogram('llm_time_to_first_token_seconds', 'Time from the generation request to the first streamed token',
+                                    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64))
+LLM_TOKENS_PER_SECOND = Histogram('llm_tokens_per_second', 'Streamed generation speed after the first token',
+                                  buckets=(1, 2, 5, 10, 20, 40, 80, 160))
+LLM_PROMPT_TOKENS = Histogram('llm_prompt_tokens', 'Input tokens of a generation request after prompt packing', ['model'],
+                              buckets=(256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072))
+LLM_COMPLETION_TOKENS = Histogram('llm_completion_tokens', 'Output tokens of a generation request', ['model'],
+                                  buckets=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096))
+COALESCED_REQUESTS = Counter('rag_coalesced_requests_total', 'RAG answer requests served by an identical in-flight request')
+RAG_CHUNKS_DROPPED = Counter('rag_chunks_dropped_total', 'Retrieved chunks left out of the prompt by the token budget')
 
 class PrometheusMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):